@@ -18,8 +18,8 @@ app.use(cors());
 app.use(express.json());
 
 // Service URLs 
+// Graph signals come through ml-service's /compute-trust/combined (ml-service reads GRAPH_SERVICE_URL)
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
-const GRAPH_SERVICE_URL = process.env.GRAPH_SERVICE_URL || 'http://localhost:8001';
 
 // Routes
 app.get('/', (req, res) => {
@@ -42,19 +42,14 @@ app.get('/api/trust/:sellerId', async (req, res) => {
   const { sellerId } = req.params;
 
   try {
-    // 1. Get Trust Data from ML Service (Data is now in-memory there)
-    const mlResponse = await axios.post(`${ML_SERVICE_URL}/compute-trust`, {
+    // Trust and graph signals in one call: the ML service reads graph signals itself
+    // (in-process or from the Graph Service) and folds collusion risk into the score
+    const mlResponse = await axios.post(`${ML_SERVICE_URL}/compute-trust/combined`, {
       seller_id: sellerId
     });
-
-    // 2. Get Graph Data from Graph Service (Data is now in-memory there)
-    // We try/catch this separately so graph failure doesn't block main trust data
-    let graphData = {};
-    try {
-      const graphResponse = await axios.get(`${GRAPH_SERVICE_URL}/graph/${sellerId}`);
-      graphData = graphResponse.data;
-    } catch (err) {
-      console.warn("Graph service unavailable:", err.message);
+    const graphData = mlResponse.data.graph || {};
+    if (!mlResponse.data.graph) {
+      console.warn("Graph signals unavailable:", mlResponse.data.graph_status);
     }
 
     const responseData = {
@@ -77,24 +72,53 @@ app.get('/api/trust/:sellerId', async (req, res) => {
 io.on('connection', (socket) => {
   console.log('Client connected:', socket.id);
 
-  // Emit mock real-time updates
-  const interval = setInterval(() => {
-    const randomChange = Math.floor(Math.random() * 10) - 5;
-    // We can't know valid IDs easily here without fetching, so we broadcast generally
-    // In a real app, we'd subscribe to specific IDs. 
-    // For demo, just emit for the currently viewed seller if possible, or broadcast generic event
-    socket.emit('trust_update', {
-      sellerId: '76293524-7b94-4366-963d-4299446d7904', // Example ID
-      change: randomChange
-    });
-  }, 5000);
-
   socket.on('disconnect', () => {
-    clearInterval(interval);
     console.log('Client disconnected:', socket.id);
   });
 });
 
+// Relay score updates streamed by the ML service (one JSON object per line)
+function subscribeTrustUpdates() {
+  let retried = false;
+  const retry = (error) => {
+    if (retried) return;
+    retried = true;
+    if (error) console.log('Trust update stream unavailable:', error.message);
+    setTimeout(subscribeTrustUpdates, 5000);
+  };
+
+  axios.get(`${ML_SERVICE_URL}/events/trust`, { responseType: 'stream', timeout: 0 })
+    .then((response) => {
+      let buffer = '';
+      response.data.on('data', (chunk) => {
+        buffer += chunk.toString();
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          let update;
+          try {
+            update = JSON.parse(line);
+          } catch (error) {
+            console.log('Skipping malformed trust update:', line.slice(0, 200));
+            continue;
+          }
+          io.emit('trust_update', {
+            sellerId: update.seller_id,
+            change: update.change,
+            trustScore: update.trust_score,
+            riskLevel: update.risk_level
+          });
+        }
+      });
+      response.data.on('end', () => retry());
+      response.data.on('error', retry);
+    })
+    .catch(retry);
+}
+
+subscribeTrustUpdates();
+
 const PORT = 5000;
 server.listen(PORT, () => {
   console.log(`Server running on port ${PORT}`);
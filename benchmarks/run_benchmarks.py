@@ -0,0 +1,350 @@
+"""
+TRUSTRA - Benchmark harness
+Runs timed scenarios against both services in-process (offline mode, no
+network) and writes machine-readable JSON, so runs can be compared across
+commits.
+
+Scenarios:
+  ml_startup, compute_trust (cold/warm)  - ml-service /compute-trust
+  ml_lazy_startup                        - ML_LAZY_INIT=1: until /health/live, then until /health/ready
+  compute_trust_combined                 - /compute-trust/combined with an in-process graph, per component
+  detect_bursts, check_text_similarity   - AuthenticityModel on the largest sellers
+  graph_load                             - GraphEngine build per backend
+  graph_startup, graph_lookup            - graph-service /graph/{id} (index warm)
+  graph_signals_compute                  - per-seller signals without the index
+  graph_batch, graph_batch_compute       - POST /graph/batch, and the batched signals without the index
+  detect_collusion                       - background detection time + endpoint latency
+
+Usage:
+    python data-simulation/generate_scaled.py --transactions 1000000 --sellers 20000 --buyers 100000 --out /tmp/trustra-1m
+    python benchmarks/run_benchmarks.py --data /tmp/trustra-1m --out results.json --append benchmarks/history.jsonl
+    python benchmarks/run_benchmarks.py --data /tmp/trustra-1m --compare results.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_DIR = os.path.join(ROOT, "ml-service")
+GRAPH_DIR = os.path.join(ROOT, "graph-service")
+SCENARIOS = ("ml_startup", "ml_lazy_startup", "compute_trust", "compute_trust_combined", "detect_bursts", "check_text_similarity",
+             "graph_load", "graph_startup", "graph_lookup", "graph_signals_compute",
+             "graph_batch", "graph_batch_compute", "detect_collusion")
+
+def summarize(name, samples_s, **extra):
+    """Latency stats in milliseconds for a list of durations in seconds."""
+    ms = np.asarray(samples_s, dtype=float) * 1000
+    return {
+        "name": name,
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        **extra,
+    }
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def load_service(service_dir, module_name):
+    """Import a service's main.py under a unique module name (both are called main)."""
+    if service_dir not in sys.path:
+        sys.path.insert(0, service_dir)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(service_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def wait_for(condition, timeout):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def sample(rng, values, n):
+    values = list(values)
+    if not values:
+        return []
+    return [values[i] for i in rng.choice(len(values), size=min(n, len(values)), replace=False)]
+
+class Benchmarks:
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.results = []
+        self._reviews = None
+
+    def add(self, result):
+        print(f"  {result['name']}: {json.dumps({k: v for k, v in result.items() if k != 'name'})}", flush=True)
+        self.results.append(result)
+
+    def reviews(self):
+        if self._reviews is None:
+            self._reviews = pd.read_csv(os.path.join(self.args.data, "reviews.csv"),
+                                        usecols=['id', 'seller_id', 'text', 'timestamp'])
+        return self._reviews
+
+    def largest_sellers(self, n):
+        counts = self.reviews()['seller_id'].value_counts()
+        return list(counts.index[:n])
+
+    # --- ml-service ---
+
+    def ml_service(self):
+        from fastapi.testclient import TestClient
+        wanted = set(self.args.scenarios)
+        if not wanted & {"ml_startup", "compute_trust", "compute_trust_combined"}:
+            return
+        if "compute_trust_combined" in wanted:
+            os.environ.setdefault("GRAPH_MODE", "local")
+        start = time.perf_counter()
+        ml = load_service(ML_DIR, "trustra_ml_main")
+        with TestClient(ml.app) as client:
+            self.add(summarize("ml_startup", [time.perf_counter() - start], import_ms=ml.startup_state["import_ms"],
+                               phases_ms=ml.startup_state["phases_ms"]))
+            # A local graph loads in the background; keep it out of the scoring timings
+            graph_ready = wait_for(lambda: ml.graph_features.status in ("ready", "failed", "remote", "off"),
+                                   self.args.timeout)
+            sellers = sample(self.rng, ml.sellers_df['id'], self.args.requests)
+            if "compute_trust" in wanted:
+                cold, warm = [], []
+                for seller_id in sellers:
+                    ml.trust_cache.invalidate([seller_id])
+                    elapsed, response = timed(client.post, "/compute-trust", json={"seller_id": seller_id})
+                    response.raise_for_status()
+                    cold.append(elapsed)
+                    warm.append(timed(client.post, "/compute-trust", json={"seller_id": seller_id})[0])
+                self.add(summarize("compute_trust.cold", cold))
+                self.add(summarize("compute_trust.warm", warm))
+            if "compute_trust_combined" in wanted:
+                samples, components = [], {}
+                for seller_id in sellers:
+                    ml.trust_cache.invalidate([seller_id])
+                    elapsed, response = timed(client.post, "/compute-trust/combined", json={"seller_id": seller_id})
+                    response.raise_for_status()
+                    samples.append(elapsed)
+                    for stage, ms in response.json()["latency_ms"].items():
+                        components.setdefault(stage, []).append(ms)
+                self.add(summarize("compute_trust_combined", samples, graph_mode=ml.graph_features.mode,
+                                   graph_ready=graph_ready,
+                                   components_mean_ms={k: round(float(np.mean(v)), 3) for k, v in components.items()}))
+
+    def ml_lazy_startup(self):
+        from fastapi.testclient import TestClient
+        overrides = {"ML_LAZY_INIT": "1", "GRAPH_MODE": "off"}
+        previous = {k: os.environ.get(k) for k in overrides}
+        os.environ.update(overrides)
+        try:
+            start = time.perf_counter()
+            ml = load_service(ML_DIR, "trustra_ml_lazy")
+            with TestClient(ml.app) as client:
+                client.get("/health/live").raise_for_status()
+                live = time.perf_counter() - start
+                ready = wait_for(lambda: client.get("/health/ready").status_code == 200, self.args.timeout)
+                self.add(summarize("ml_lazy_startup", [time.perf_counter() - start], live_ms=round(live * 1000, 3),
+                                   ready=ready, import_ms=ml.startup_state["import_ms"],
+                                   phases_ms=ml.startup_state["phases_ms"]))
+        finally:
+            for k, v in previous.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+    def authenticity(self):
+        from models.authenticity_model import AuthenticityModel
+        wanted = set(self.args.scenarios)
+        reviews = self.reviews()
+        groups = {s: g.to_dict('records') for s, g in reviews[reviews['seller_id'].isin(
+            self.largest_sellers(self.args.top_sellers))].groupby('seller_id')}
+        sizes = [len(g) for g in groups.values()]
+        if "detect_bursts" in wanted:
+            model = AuthenticityModel()
+            samples = [timed(model.detect_bursts, g)[0] for _ in range(self.args.repeat) for g in groups.values()]
+            self.add(summarize("detect_bursts", samples, sellers=len(groups), max_reviews=max(sizes, default=0)))
+        if "check_text_similarity" in wanted:
+            samples = []
+            for _ in range(self.args.repeat):
+                for g in groups.values():
+                    # Fresh model each call: signatures are computed, not reused from an index
+                    model = AuthenticityModel()
+                    samples.append(timed(model.check_text_similarity, g)[0])
+            self.add(summarize("check_text_similarity", samples, sellers=len(groups), max_reviews=max(sizes, default=0)))
+
+    # --- graph-service ---
+
+    def graph_load(self):
+        from graph_engine import GraphEngine
+        for backend in self.args.backends:
+            elapsed, engine = timed(GraphEngine, self.args.data, backend)
+            stats = engine.stats()
+            self.add(summarize(f"graph_load.{backend}", [elapsed], nodes=stats["nodes"], edges=stats["edges"]))
+
+    def graph_service(self):
+        from fastapi.testclient import TestClient
+        wanted = set(self.args.scenarios)
+        if not wanted & {"graph_startup", "graph_lookup", "graph_signals_compute", "graph_batch",
+                         "graph_batch_compute", "detect_collusion"}:
+            return
+        start = time.perf_counter()
+        graph = load_service(GRAPH_DIR, "trustra_graph_main")
+        engine = graph.graph_engine
+        with TestClient(graph.app) as client:
+            indexed = wait_for(lambda: engine.index.version > 0, self.args.timeout)
+            self.add(summarize("graph_startup", [time.perf_counter() - start], index_ready=indexed,
+                               backend=engine.backend, nodes=engine.stats()["nodes"]))
+            # Warm-up runs detection right after the index; let it finish so lookups are not contended
+            ready = wait_for(lambda: engine.communities.get() is not None, self.args.timeout)
+            sellers = sample(self.rng, engine.seller_ids(), self.args.requests)
+            if "graph_lookup" in wanted:
+                samples = []
+                for seller_id in sellers:
+                    elapsed, response = timed(client.get, f"/graph/{seller_id}")
+                    response.raise_for_status()
+                    samples.append(elapsed)
+                self.add(summarize("graph_lookup", samples, index_ready=indexed))
+            if "graph_signals_compute" in wanted:
+                samples = [timed(engine.compute_seller_signals, s)[0] for s in sellers]
+                self.add(summarize("graph_signals_compute", samples))
+            if "graph_batch" in wanted:
+                samples = []
+                for _ in range(self.args.repeat):
+                    elapsed, response = timed(client.post, "/graph/batch", json={"seller_ids": sellers})
+                    response.raise_for_status()
+                    samples.append(elapsed)
+                self.add(summarize("graph_batch", samples, sellers=len(sellers)))
+            if "graph_batch_compute" in wanted:
+                samples = [timed(engine.compute_seller_signals_many, sellers)[0] for _ in range(self.args.repeat)]
+                self.add(summarize("graph_batch_compute", samples, sellers=len(sellers)))
+            if "detect_collusion" in wanted:
+                result = engine.communities.get() or {}
+                samples = [timed(client.get, "/detect-collusion")[0] for _ in range(self.args.repeat)]
+                self.add(summarize("detect_collusion", samples, ready=ready,
+                                   detection_ms=result.get("duration_ms"), algorithm=result.get("algorithm"),
+                                   communities=len(result.get("communities", []))))
+
+    def run(self):
+        wanted = set(self.args.scenarios)
+        self.ml_service()
+        if "ml_lazy_startup" in wanted:
+            self.ml_lazy_startup()
+        if wanted & {"detect_bursts", "check_text_similarity"}:
+            self.authenticity()
+        if "graph_load" in wanted:
+            self.graph_load()
+        self.graph_service()
+        return self.results
+
+def dataset_info(path):
+    info = {"path": os.path.abspath(path)}
+    for table in ("sellers", "buyers", "transactions", "reviews"):
+        csv_path = os.path.join(path, f"{table}.csv")
+        if os.path.exists(csv_path):
+            with open(csv_path, "rb") as f:
+                info[table] = sum(1 for _ in f) - 1
+    info["columnar"] = os.path.exists(os.path.join(path, "columnar", "transactions.arrow"))
+    return info
+
+def git_info():
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True, timeout=10).stdout.strip()
+        except Exception:
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def compare(current, baseline, tolerance):
+    """Print mean-latency ratios against a previous run; returns names that regressed."""
+    before = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if not old or not old["mean_ms"]:
+            continue
+        ratio = result["mean_ms"] / old["mean_ms"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        if flag:
+            regressions.append(result["name"])
+        print(f"  {result['name']:<28} {old['mean_ms']:>12.3f} -> {result['mean_ms']:>12.3f} ms  x{ratio:.2f} {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run TRUSTRA performance scenarios")
+    parser.add_argument("--data", default=os.path.join(ROOT, "data-simulation"))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--backends", default="networkx,csr")
+    parser.add_argument("--requests", type=int, default=200, help="sellers sampled per endpoint scenario")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top-sellers", type=int, default=20, help="sellers with the most reviews, for model scenarios")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for background index/detection")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--append", help="append the results as one line to this JSONL history")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging a regression")
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    args.backends = [b for b in args.backends.split(",") if b]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Offline mode against the chosen dataset; background loops off so timings are stable
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ["DATA_PATH"] = os.path.abspath(args.data)
+    os.environ.setdefault("COLUMNAR_PATH", os.path.join(os.path.abspath(args.data), "columnar"))
+    os.environ.setdefault("COMMUNITY_REFRESH_SECONDS", "0")
+    os.environ.setdefault("GRAPH_REFRESH_SECONDS", "0")
+    # graph_startup measures a cold load, not a snapshot restore
+    os.environ.setdefault("GRAPH_SNAPSHOT_PATH", "")
+    for path in (ML_DIR, GRAPH_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    print(f"Running {len(args.scenarios)} scenarios on {args.data}")
+    started = time.time()
+    results = Benchmarks(args).run()
+    report = {
+        **git_info(),
+        "timestamp": started,
+        "duration_s": round(time.time() - started, 1),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "dataset": dataset_info(args.data),
+        "params": {"requests": args.requests, "repeat": args.repeat, "top_sellers": args.top_sellers,
+                   "seed": args.seed, "backends": args.backends},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.append:
+        with open(args.append, "a") as f:
+            f.write(json.dumps(report) + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+    if not args.out and not args.append:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+TRUSTRA - Scalable synthetic data generator
+Same CSV layout as generator.py, but vectorised with NumPy and written in
+chunks, so 10^7 transactions fit in bounded memory. A fixed seed and a fixed
+reference date make every run reproducible.
+
+Usage:
+    python data-simulation/generate_scaled.py --transactions 1000000 --out /tmp/trustra-1m
+    python data-simulation/generate_scaled.py --transactions 10000000 --sellers 100000 --buyers 500000 --columnar
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+STATUSES = np.array(['completed', 'refunded', 'cancelled', 'disputed'])
+STATUS_WEIGHTS = [0.85, 0.05, 0.05, 0.05]
+RATING_WEIGHTS = [0.05, 0.05, 0.1, 0.3, 0.5]
+WORDS = np.array((
+    "quick delivery great product quality seller packaging arrived broken late excellent service "
+    "recommend value price cheap fast slow refund support friendly rude item described works "
+    "perfectly damaged order again happy disappointed box fresh original fake size color fits "
+    "battery charger cable phone shirt shoes bag book kitchen toy gift wrapped tracking courier"
+).split())
+DAY = 86400
+
+def uuids(rng, n):
+    """n random UUID4-formatted strings, vectorised."""
+    hex_chars = np.frombuffer(rng.bytes(16 * n).hex().encode("ascii"), dtype=np.uint8).reshape(n, 32)
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    out[:, 0:8], out[:, 9:13], out[:, 14:18] = hex_chars[:, 0:8], hex_chars[:, 8:12], hex_chars[:, 12:16]
+    out[:, 19:23], out[:, 24:36] = hex_chars[:, 16:20], hex_chars[:, 20:32]
+    out[:, 14] = ord("4")
+    return out.view("S36").ravel().astype(str)
+
+def iso(epochs):
+    return np.datetime_as_string(np.asarray(epochs, dtype="int64").astype("datetime64[s]"), unit="s")
+
+def sentences(rng, n, min_words=5, max_words=10):
+    lengths = rng.integers(min_words, max_words + 1, size=n)
+    picks = WORDS[rng.integers(0, len(WORDS), size=(n, max_words))]
+    return [" ".join(row[:k]).capitalize() + "." for row, k in zip(picks, lengths)]
+
+def generate(out_dir, num_sellers=1000, num_buyers=5000, num_transactions=20000, review_rate=0.4,
+             fraud_sellers=1, burst_size=50, rings=5, seed=42, reference="2026-03-01T00:00:00",
+             chunk_size=1_000_000):
+    """Write sellers/buyers/transactions/reviews CSVs to out_dir. Returns row counts."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    now = int(np.datetime64(reference, "s").astype("int64"))
+    start_2022 = int(np.datetime64("2022-01-01T00:00:00", "s").astype("int64"))
+    start_2023 = int(np.datetime64("2023-01-01T00:00:00", "s").astype("int64"))
+
+    seller_ids = uuids(rng, num_sellers)
+    seller_joined = rng.integers(start_2022, now, size=num_sellers)
+    sellers = pd.DataFrame({
+        "id": seller_ids,
+        "name": np.char.add("Seller ", np.arange(num_sellers).astype(str)),
+        "joined_at": iso(seller_joined),
+        "baseline_trust_score": rng.uniform(400, 800, size=num_sellers),
+    })
+    fraud = rng.choice(num_sellers, size=min(fraud_sellers, num_sellers), replace=False)
+    sellers.loc[fraud, "name"] = "FRAUD_SUSPECT_LTD"
+    sellers.to_csv(os.path.join(out_dir, "sellers.csv"), index=False)
+
+    buyer_ids = uuids(rng, num_buyers)
+    pd.DataFrame({
+        "id": buyer_ids,
+        "name": np.char.add("Buyer ", np.arange(num_buyers).astype(str)),
+        "joined_at": iso(rng.integers(start_2023, now, size=num_buyers)),
+    }).to_csv(os.path.join(out_dir, "buyers.csv"), index=False)
+
+    tx_path = os.path.join(out_dir, "transactions.csv")
+    rv_path = os.path.join(out_dir, "reviews.csv")
+    counts = {"sellers": num_sellers, "buyers": num_buyers, "transactions": 0, "reviews": 0}
+    first = True
+
+    def write(tx, rv):
+        nonlocal first
+        tx.to_csv(tx_path, index=False, mode="w" if first else "a", header=first)
+        rv.to_csv(rv_path, index=False, mode="w" if first else "a", header=first)
+        counts["transactions"] += len(tx)
+        counts["reviews"] += len(rv)
+        first = False
+
+    for offset in range(0, num_transactions, chunk_size):
+        n = min(chunk_size, num_transactions - offset)
+        s = rng.integers(0, num_sellers, size=n)
+        b = rng.integers(0, num_buyers, size=n)
+        # After the seller joined, whole days as in generator.py
+        days = (rng.random(n) * ((now - seller_joined[s]) // DAY + 1)).astype(np.int64)
+        timestamps = seller_joined[s] + days * DAY
+        tx_ids = uuids(rng, n)
+        tx = pd.DataFrame({
+            "id": tx_ids,
+            "seller_id": seller_ids[s],
+            "buyer_id": buyer_ids[b],
+            "amount": np.round(rng.uniform(10, 500, size=n), 2),
+            "status": STATUSES[rng.choice(4, size=n, p=STATUS_WEIGHTS)],
+            "timestamp": iso(timestamps),
+            "delivery_time_days": rng.integers(1, 15, size=n),
+        })
+        reviewed = np.flatnonzero(rng.random(n) < review_rate)
+        rv = pd.DataFrame({
+            "id": uuids(rng, len(reviewed)),
+            "seller_id": seller_ids[s[reviewed]],
+            "buyer_id": buyer_ids[b[reviewed]],
+            "transaction_id": tx_ids[reviewed],
+            "rating": rng.choice(np.arange(1, 6), size=len(reviewed), p=RATING_WEIGHTS),
+            "text": sentences(rng, len(reviewed)),
+            "timestamp": iso(timestamps[reviewed] + rng.integers(0, 6, size=len(reviewed)) * DAY),
+        })
+        write(tx, rv)
+        print(f"  transactions: {counts['transactions']}/{num_transactions}", flush=True)
+
+    # Review bursts: burst_size identical 5-star reviews at one instant per fraud seller
+    burst_at = now - 2 * DAY
+    for f in fraud:
+        tx_ids = uuids(rng, burst_size)
+        buyers = buyer_ids[rng.integers(0, num_buyers, size=burst_size)]
+        stamp = iso(np.full(burst_size, burst_at))
+        write(
+            pd.DataFrame({"id": tx_ids, "seller_id": seller_ids[f], "buyer_id": buyers, "amount": 99.99,
+                          "status": "completed", "timestamp": stamp, "delivery_time_days": 1}),
+            pd.DataFrame({"id": uuids(rng, burst_size), "seller_id": seller_ids[f], "buyer_id": buyers,
+                          "transaction_id": tx_ids, "rating": 5, "text": "Amazing service! Best seller ever!",
+                          "timestamp": stamp}),
+        )
+
+    # Collusion rings: a few buyers buying repeatedly from the same few sellers
+    for _ in range(rings):
+        ring_sellers = rng.choice(num_sellers, size=min(3, num_sellers), replace=False)
+        ring_buyers = rng.choice(num_buyers, size=min(5, num_buyers), replace=False)
+        pairs = np.array([(s, b) for s in ring_sellers for b in ring_buyers for _ in range(4)])
+        write(
+            pd.DataFrame({"id": uuids(rng, len(pairs)), "seller_id": seller_ids[pairs[:, 0]],
+                          "buyer_id": buyer_ids[pairs[:, 1]], "amount": 49.99, "status": "completed",
+                          "timestamp": iso(now - rng.integers(1, 30, size=len(pairs)) * DAY),
+                          "delivery_time_days": 2}),
+            pd.DataFrame(columns=["id", "seller_id", "buyer_id", "transaction_id", "rating", "text", "timestamp"]),
+        )
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic TRUSTRA dataset")
+    parser.add_argument("--out", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--sellers", type=int, default=1000)
+    parser.add_argument("--buyers", type=int, default=5000)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--review-rate", type=float, default=0.4)
+    parser.add_argument("--fraud-sellers", type=int, default=1)
+    parser.add_argument("--rings", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reference", default="2026-03-01T00:00:00", help="'now' for generated timestamps")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--columnar", action="store_true", help="also write the Arrow snapshot to <out>/columnar")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.out, args.sellers, args.buyers, args.transactions, args.review_rate,
+                      args.fraud_sellers, rings=args.rings, seed=args.seed, reference=args.reference,
+                      chunk_size=args.chunk_size)
+    print(f"Generated {counts} in {time.perf_counter() - start:.1f}s -> {args.out}")
+    if args.columnar:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+        from shared.columnar_store import convert_csv_dir
+        convert_csv_dir(args.out, os.path.join(args.out, "columnar"))
+        print(f"Columnar snapshot written to {os.path.join(args.out, 'columnar')}")
+
+if __name__ == "__main__":
+    main()
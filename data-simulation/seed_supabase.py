@@ -1,73 +1,207 @@
 """
 TRUSTRA - Supabase Data Seeder (REST API)
-Reads CSV files and uploads them to Supabase PostgreSQL via the REST API.
-No SDK required — uses the 'requests' library directly.
+Streams CSV files into Supabase PostgreSQL via the REST API.
+
+Rows are read and uploaded batch by batch (never a whole file in memory) by
+concurrent workers sharing one pooled keep-alive session. Batch size adapts to
+request latency, a checkpoint file records how far each table got so an
+interrupted load resumes where it stopped, and a batch the server rejects is
+bisected to isolate the bad rows (written to a rejects file) instead of
+falling back to row-by-row uploads.
+
+Usage:
+    python data-simulation/seed_supabase.py --workers 8
+    python data-simulation/seed_supabase.py --data /tmp/trustra-1m --restart
+    SUPABASE_URL=http://127.0.0.1:54321 python data-simulation/seed_supabase.py   # shared/mock_postgrest.py
 """
+import argparse
 import csv
+import itertools
 import json
 import os
-import requests
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.supabase_client import RETRY_STATUSES, SupabaseClient
 
 # --- Configuration ---
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://gpdhyiohcagqydhhjzrz.supabase.co")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "sb_publishable_DixO3g1pvbB4aRuaTXh4Mw_5miq-nXW")
 
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
-BATCH_SIZE = 200  # Supabase REST API works well with smaller batches
+BATCH_SIZE = 200  # starting size; adapted to request latency while loading
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 5000
+TARGET_SECONDS = 1.0  # aim for requests around this long
+WORKERS = 8
+OK_STATUSES = (200, 201, 204)
+TABLES = ("sellers", "buyers", "transactions", "reviews")
+
+class LoadAborted(Exception):
+    """The server is unreachable or failing; stop and keep the checkpoint."""
+
+class BatchSizer:
+    """Grows the batch size while requests are fast, halves it when they are slow."""
+
+    def __init__(self, initial=BATCH_SIZE, minimum=MIN_BATCH_SIZE, maximum=MAX_BATCH_SIZE, target=TARGET_SECONDS):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self._lock = threading.Lock()
+
+    def observe(self, rows, seconds):
+        with self._lock:
+            if seconds > self.target:
+                self.size = max(self.minimum, self.size // 2)
+            elif seconds < self.target / 2 and rows >= self.size:
+                self.size = min(self.maximum, int(self.size * 1.5))
+
+    def shrink(self):
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
+class Checkpoint:
+    """
+    Per-table progress in a JSON file: `rows` is how many leading CSV rows are
+    fully handled (uploaded or rejected), so a resumed load skips exactly those.
+    Batches finishing out of order only advance it once everything before them is done.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.state = {}
+        self._last_save = 0.0
+        if not restart and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
 
-HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "resolution=merge-duplicates"  # UPSERT behavior
-}
+    def table(self, name):
+        return self.state.setdefault(name, {"rows": 0, "uploaded": 0, "rejected": 0, "complete": False})
 
-REST_URL = f"{SUPABASE_URL}/rest/v1"
+    def save(self, force=False):
+        if not force and time.time() - self._last_save < 1.0:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)  # never leave a half-written checkpoint
+        self._last_save = time.time()
+
+class Rejects:
+    """Appends rows the server refused to a JSONL file for inspection."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
 
-def read_csv_file(filename: str) -> list:
-    filepath = os.path.join(DATA_DIR, filename)
+    def write(self, table, row, status):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"table": table, "status": status, "row": row}) + "\n")
+            self.count += 1
+
+def read_csv_rows(filename: str, data_dir=DATA_DIR):
+    """Yield CSV rows as dicts without loading the file."""
+    filepath = os.path.join(data_dir, filename)
     if not os.path.exists(filepath):
         print(f"  WARNING: File not found: {filepath}")
-        return []
-    with open(filepath, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
-
-def upsert_batch(table_name: str, rows: list) -> bool:
-    """Upload a batch of rows to Supabase via REST API."""
-    url = f"{REST_URL}/{table_name}"
+        return
+    with open(filepath, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+def iter_batches(rows, skip, sizer):
+    """Yield (start_row, batch) after skipping the first `skip` rows, sized by the sizer."""
+    start = skip
+    rows = itertools.islice(rows, skip, None)
+    while True:
+        batch = list(itertools.islice(rows, sizer.size))
+        if not batch:
+            return
+        yield start, batch
+        start += len(batch)
+
+def upload(client, table, rows, sizer, rejects):
+    """
+    Upsert a batch. If the server rejects it, bisect to find the bad rows and
+    upload the rest. Returns (uploaded, rejected).
+    """
+    start = time.perf_counter()
+    status = client.upsert_status(table, rows)
+    if status in OK_STATUSES:
+        sizer.observe(len(rows), time.perf_counter() - start)
+        return len(rows), 0
+    if status is None or status in RETRY_STATUSES:
+        # Retries already exhausted in the client: splitting would not help
+        raise LoadAborted(f"{table}: server unavailable (status {status})")
+    if status == 413:
+        sizer.shrink()
+    if len(rows) == 1:
+        rejects.write(table, rows[0], status)
+        return 0, 1
+    mid = len(rows) // 2
+    left = upload(client, table, rows[:mid], sizer, rejects)
+    right = upload(client, table, rows[mid:], sizer, rejects)
+    return left[0] + right[0], left[1] + right[1]
+
+def seed_table(client, table_name, rows, checkpoint, sizer, rejects, workers=WORKERS):
+    """Stream rows into a table with concurrent batch uploads. Returns rows uploaded."""
+    state = checkpoint.table(table_name)
+    if state["complete"]:
+        print(f"  '{table_name}' already loaded ({state['uploaded']} rows), skipping.")
+        return state["uploaded"]
+    if state["rows"]:
+        print(f"  Resuming '{table_name}' after row {state['rows']}")
+
+    finished = {}  # start_row -> (count, uploaded, rejected), done but not yet contiguous
+    in_flight = {}
+    started = time.time()
+    last_report = started
+    loaded_now = 0
+
+    def collect(done):
+        nonlocal last_report, loaded_now
+        for future in done:
+            start, count = in_flight.pop(future)
+            uploaded, rejected = future.result()  # LoadAborted propagates
+            finished[start] = (count, uploaded, rejected)
+            loaded_now += count
+        while state["rows"] in finished:
+            count, uploaded, rejected = finished.pop(state["rows"])
+            state["rows"] += count
+            state["uploaded"] += uploaded
+            state["rejected"] += rejected
+        checkpoint.save()
+        if time.time() - last_report >= 2:
+            rate = loaded_now / (time.time() - started)
+            print(f"  {table_name}: {state['rows']} rows ({rate:,.0f} rows/s, batch {sizer.size}, "
+                  f"{state['rejected']} rejected)", flush=True)
+            last_report = time.time()
+
+    pool = ThreadPoolExecutor(max_workers=workers)
     try:
-        resp = requests.post(url, headers=HEADERS, json=rows, timeout=30)
-        if resp.status_code in (200, 201):
-            return True
-        else:
-            print(f"    Error {resp.status_code}: {resp.text[:200]}")
-            return False
-    except Exception as e:
-        print(f"    Request error: {e}")
-        return False
-
-def seed_table(table_name: str, rows: list):
-    if not rows:
-        print(f"  No data for '{table_name}', skipping.")
-        return 0
-    
-    total = len(rows)
-    uploaded = 0
-    
-    for i in range(0, total, BATCH_SIZE):
-        batch = rows[i : i + BATCH_SIZE]
-        if upsert_batch(table_name, batch):
-            uploaded += len(batch)
-            pct = int((uploaded / total) * 100)
-            print(f"  [{pct:3d}%] {table_name}: {uploaded}/{total} rows")
-        else:
-            print(f"  FAILED at batch starting at row {i}. Trying one-by-one...")
-            for row in batch:
-                if upsert_batch(table_name, [row]):
-                    uploaded += 1
-    
-    return uploaded
+        for start, batch in iter_batches(rows, state["rows"], sizer):
+            # Bound the rows held in memory to a couple of batches per worker
+            if len(in_flight) >= workers * 2:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            in_flight[pool.submit(upload, client, table_name, batch, sizer, rejects)] = (start, len(batch))
+        while in_flight:
+            collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        checkpoint.save(force=True)
+        raise
+    pool.shutdown()
+    state["complete"] = True
+    checkpoint.save(force=True)
+    elapsed = time.time() - started
+    print(f"  [100%] {table_name}: {state['uploaded']} uploaded, {state['rejected']} rejected "
+          f"in {elapsed:.1f}s ({loaded_now / max(elapsed, 1e-9):,.0f} rows/s)")
+    return state["uploaded"]
 
 def clean_seller(row: dict) -> dict:
     return {
@@ -87,7 +221,7 @@ def clean_transaction(row: dict) -> dict:
         "amount": float(row["amount"]),
         "status": row["status"],
         "timestamp": row["timestamp"],
-        "delivery_time_days": int(dtd) if dtd and dtd.strip() else None
+        "delivery_time_days": int(float(dtd)) if dtd and dtd.strip() else None
     }
 
 def clean_review(row: dict) -> dict:
@@ -101,17 +235,57 @@ def clean_review(row: dict) -> dict:
         "timestamp": row["timestamp"]
     }
 
+def buyers_from_transactions(data_dir):
+    """Unique buyers in first-seen order (deterministic, so checkpoints stay valid)."""
+    seen = set()
+    for tx in read_csv_rows("transactions.csv", data_dir):
+        bid = tx.get("buyer_id")
+        if bid and bid not in seen:
+            seen.add(bid)
+            yield {
+                "id": bid,
+                "name": f"Buyer-{bid[:8]}",
+                "joined_at": tx.get("timestamp", "2024-01-01T00:00:00")
+            }
+
+def table_rows(table, data_dir):
+    if table == "sellers":
+        return (clean_seller(r) for r in read_csv_rows("sellers.csv", data_dir))
+    if table == "buyers":
+        if os.path.exists(os.path.join(data_dir, "buyers.csv")):
+            return read_csv_rows("buyers.csv", data_dir)
+        print("  No buyers.csv found. Extracting unique buyers from transactions...")
+        return buyers_from_transactions(data_dir)
+    if table == "transactions":
+        return (clean_transaction(r) for r in read_csv_rows("transactions.csv", data_dir))
+    return (clean_review(r) for r in read_csv_rows("reviews.csv", data_dir))
+
 def main():
+    parser = argparse.ArgumentParser(description="Load TRUSTRA CSVs into Supabase")
+    parser.add_argument("--data", default=DATA_DIR, help="directory with the CSV files")
+    parser.add_argument("--url", default=SUPABASE_URL)
+    parser.add_argument("--tables", default=",".join(TABLES))
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="initial batch size")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--target-seconds", type=float, default=TARGET_SECONDS)
+    parser.add_argument("--checkpoint", default=None, help="default: <data>/.seed_checkpoint.json")
+    parser.add_argument("--rejects", default=None, help="default: <data>/seed_rejects.jsonl")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and load everything")
+    args = parser.parse_args()
+
     print("=" * 55)
     print("  TRUSTRA Supabase Seeder (REST API)")
     print("=" * 55)
-    print(f"  Target: {SUPABASE_URL}")
+    print(f"  Target: {args.url}")
     print()
 
+    client = SupabaseClient(args.url, SUPABASE_KEY, timeout=60, pool_size=args.workers, max_retries=4)
+
     # Test connection
     print("Testing connection...")
     try:
-        resp = requests.get(f"{REST_URL}/sellers?select=id&limit=1", headers=HEADERS, timeout=10)
+        resp = client.session.get(f"{client.rest_url}/sellers", params={"select": "id", "limit": "1"}, timeout=10)
         if resp.status_code == 200:
             print("  Connection OK!")
         else:
@@ -123,56 +297,34 @@ def main():
         return
     print()
 
-    # 1. Sellers
-    print("[1/4] Seeding sellers...")
-    sellers_raw = read_csv_file("sellers.csv")
-    sellers = [clean_seller(r) for r in sellers_raw]
-    s_count = seed_table("sellers", sellers)
-    print()
-
-    # 2. Buyers (extract from transactions if no buyers.csv)
-    print("[2/4] Seeding buyers...")
-    buyers_path = os.path.join(DATA_DIR, "buyers.csv")
-    if os.path.exists(buyers_path):
-        buyers = read_csv_file("buyers.csv")
-        b_count = seed_table("buyers", buyers)
-    else:
-        print("  No buyers.csv found. Extracting unique buyers from transactions...")
-        txns_raw = read_csv_file("transactions.csv")
-        seen = set()
-        buyers = []
-        for tx in txns_raw:
-            bid = tx.get("buyer_id")
-            if bid and bid not in seen:
-                seen.add(bid)
-                buyers.append({
-                    "id": bid,
-                    "name": f"Buyer-{bid[:8]}",
-                    "joined_at": tx.get("timestamp", "2024-01-01T00:00:00")
-                })
-        b_count = seed_table("buyers", buyers)
-    print()
-
-    # 3. Transactions
-    print("[3/4] Seeding transactions...")
-    txns_raw = read_csv_file("transactions.csv")
-    txns = [clean_transaction(r) for r in txns_raw]
-    t_count = seed_table("transactions", txns)
-    print()
-
-    # 4. Reviews
-    print("[4/4] Seeding reviews...")
-    reviews_raw = read_csv_file("reviews.csv")
-    reviews = [clean_review(r) for r in reviews_raw]
-    r_count = seed_table("reviews", reviews)
-    print()
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(args.data, ".seed_checkpoint.json"), args.restart)
+    rejects = Rejects(args.rejects or os.path.join(args.data, "seed_rejects.jsonl"))
+    sizer = BatchSizer(args.batch_size, maximum=args.max_batch_size, target=args.target_seconds)
+    tables = [t for t in args.tables.split(",") if t]
+    counts = {}
+    try:
+        # Parents before children so foreign keys resolve
+        for i, table in enumerate(tables, 1):
+            print(f"[{i}/{len(tables)}] Seeding {table}...")
+            counts[table] = seed_table(client, table, table_rows(table, args.data), checkpoint, sizer,
+                                       rejects, args.workers)
+            print()
+    except LoadAborted as e:
+        print(f"\n  ABORTED: {e}")
+        print(f"  Progress saved to {checkpoint.path}; run again to resume.")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"\n  Interrupted. Progress saved to {checkpoint.path}; run again to resume.")
+        sys.exit(130)
+    finally:
+        client.close()
 
     print("=" * 55)
     print("  SEEDING COMPLETE!")
-    print(f"  Sellers:      {s_count}")
-    print(f"  Buyers:       {b_count}")
-    print(f"  Transactions: {t_count}")
-    print(f"  Reviews:      {r_count}")
+    for table in tables:
+        print(f"  {table.capitalize() + ':':<14}{counts.get(table, 0)}")
+    if rejects.count:
+        print(f"  Rejected rows: {rejects.count} (see {rejects.path})")
     print("=" * 55)
 
 if __name__ == "__main__":
@@ -29,12 +29,28 @@ CREATE TABLE IF NOT EXISTS reviews (
     transaction_id VARCHAR(50) REFERENCES transactions(id),
     rating INT NOT NULL CHECK (rating >= 1 AND rating <= 5),
     text TEXT,
-    timestamp TIMESTAMP NOT NULL
+    timestamp TIMESTAMP NOT NULL,
+    -- When the row was written; review state fetches resume from it, since
+    -- timestamp can be backdated
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS reviews_seller_created_at ON reviews (seller_id, created_at);
 
 CREATE TABLE IF NOT EXISTS trust_scores (
     id SERIAL PRIMARY KEY,
     seller_id VARCHAR(50) REFERENCES sellers(id),
     score FLOAT NOT NULL,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Events accepted by ml-service POST /events, replayed at startup until the
+-- transactions/reviews tables hold them (id: event id, or "id:status" for a
+-- status change)
+CREATE TABLE IF NOT EXISTS trust_events (
+    id VARCHAR(120) PRIMARY KEY,
+    seller_id VARCHAR(50) NOT NULL,
+    event JSONB NOT NULL,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+CREATE INDEX IF NOT EXISTS trust_events_received_at ON trust_events (received_at);
@@ -0,0 +1,23 @@
+"""
+TRUSTRA - Graph API request bodies
+Shared by main.py and router.py, so the router rejects bad input (422) itself
+instead of fanning it out to every shard.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+class EdgeEvent(BaseModel):
+    buyer_id: str
+    seller_id: str
+    count: int = Field(1, ge=1)
+    # Transaction id; required when the graph also pulls deltas from Supabase,
+    # so the pulled row is not counted a second time
+    id: Optional[str] = None
+    timestamp: Optional[str] = None
+
+class EdgeBatch(BaseModel):
+    edges: List[EdgeEvent]
+
+class SellerBatch(BaseModel):
+    seller_ids: List[str]
@@ -0,0 +1,228 @@
+"""
+TRUSTRA - Fixed-memory buyer sketches per seller
+Buyer-diversity and repeat-buyer signals without the graph or an exact
+(buyer, seller) count table:
+
+  HyperLogLog  distinct buyers per seller in 2**p one-byte registers
+               (p=10: 1 KB per seller, ~3% error, near exact below ~2.5k buyers)
+  Count-Min    (buyer, seller) transaction counts in one depth x width table
+               shared by all sellers; estimates never undercount
+  Top-k        per seller, the k buyers with the largest Count-Min estimates
+
+Configure with BUYER_SKETCH_PRECISION, BUYER_SKETCH_WIDTH (rounded up to a power
+of two), BUYER_SKETCH_DEPTH and BUYER_SKETCH_TOP_K.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Repeat-buyer risk: one buyer holds this share of a seller's transactions,
+# or distinct buyers per transaction falls to this, once the seller has enough
+REPEAT_SHARE_THRESHOLD = 0.3
+LOW_DIVERSITY_THRESHOLD = 0.2
+MIN_TRANSACTIONS = 10
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+def hash_ids(ids) -> np.ndarray:
+    """64-bit hashes, stable across processes and runs (pandas' fixed-key SipHash)."""
+    return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+def _bit_length(values) -> np.ndarray:
+    """Exact bit length of uint64 values (float log2 is exact on 32-bit halves)."""
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & _MASK32).astype(np.float64)
+    with np.errstate(divide="ignore"):
+        return np.where(hi > 0, 33 + np.floor(np.log2(hi)),
+                        np.where(lo > 0, 1 + np.floor(np.log2(lo)), 0)).astype(np.int64)
+
+def hll_estimate(registers) -> np.ndarray:
+    """HyperLogLog cardinality for each row of registers, linear counting in the small range."""
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+class BuyerSketches:
+    def __init__(self, precision=10, width=2 ** 18, depth=4, top_k=5):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision {precision} outside 4..16")
+        self.precision = precision
+        self.width_bits = max(1, int(np.ceil(np.log2(width))))
+        self.depth = depth
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._slots = {}         # seller_id -> row of registers/transactions/top
+        self.sellers = []
+        self.registers = np.zeros((0, 2 ** precision), dtype=np.uint8)
+        self.transactions = np.zeros(0, dtype=np.int64)
+        self.top = []            # per seller: {buyer_id: Count-Min estimate}, at most top_k
+        # np.zeros pages are only committed as counters are touched
+        self.counts = np.zeros((depth, 2 ** self.width_bits), dtype=np.uint32)
+        rng = np.random.default_rng(20240917)
+        self._mult = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._add = rng.integers(0, 2 ** 63, size=depth, dtype=np.uint64)
+        self.total = 0
+        # Set once a load or snapshot restore filled the sketches
+        self.loaded = False
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            precision=int(os.environ.get("BUYER_SKETCH_PRECISION", "10")),
+            width=int(os.environ.get("BUYER_SKETCH_WIDTH", str(2 ** 18))),
+            depth=int(os.environ.get("BUYER_SKETCH_DEPTH", "4")),
+            top_k=int(os.environ.get("BUYER_SKETCH_TOP_K", "5")),
+        )
+
+    def config(self) -> dict:
+        return {"precision": self.precision, "width": 2 ** self.width_bits, "depth": self.depth, "top_k": self.top_k}
+
+    def _slots_for(self, seller_ids) -> np.ndarray:
+        new = [s for s in seller_ids if s not in self._slots]
+        if new:
+            start = len(self.sellers)
+            for i, seller_id in enumerate(new):
+                self._slots[seller_id] = start + i
+            self.sellers.extend(new)
+            self.top.extend({} for _ in new)
+            if len(self.sellers) > len(self.transactions):
+                capacity = max(len(self.sellers), 2 * len(self.transactions), 1024)
+                registers = np.zeros((capacity, self.registers.shape[1]), dtype=np.uint8)
+                registers[:len(self.registers)] = self.registers
+                transactions = np.zeros(capacity, dtype=np.int64)
+                transactions[:len(self.transactions)] = self.transactions
+                self.registers, self.transactions = registers, transactions
+        return np.array([self._slots[s] for s in seller_ids], dtype=np.intp)
+
+    def _columns(self, keys) -> np.ndarray:
+        """Count-Min column of each (seller, buyer) pair key in every row: multiply-shift hashing."""
+        shift = np.uint64(64 - self.width_bits)
+        return ((keys[None, :] * self._mult[:, None] + self._add[:, None]) >> shift).astype(np.intp)
+
+    def _estimates(self, columns) -> np.ndarray:
+        return self.counts[np.arange(self.depth)[:, None], columns].min(axis=0).astype(np.int64)
+
+    def update(self, seller_ids, buyer_ids, counts=None) -> int:
+        """Add transactions (one per pair, or counts[i] each). Returns how many were added."""
+        if len(seller_ids) == 0:
+            return 0
+        buyers = np.asarray(buyer_ids, dtype=object)
+        counts = np.ones(len(buyers), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        codes, uniques = pd.factorize(np.asarray(seller_ids, dtype=object))
+        buyer_hashes = hash_ids(buyers)
+        shift = np.uint64(64 - self.precision)
+        register = (buyer_hashes >> shift).astype(np.intp)
+        rank = (64 - self.precision) + 1 - _bit_length(buyer_hashes & ((np.uint64(1) << shift) - np.uint64(1)))
+
+        # Count-Min works on distinct pairs: aggregate the batch, then update conservatively
+        keys = buyer_hashes ^ (hash_ids(uniques)[codes] * _GOLDEN)
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        pair_counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(keys)).astype(np.int64)
+        columns = self._columns(keys)
+
+        with self._lock:
+            slots = self._slots_for(list(uniques))[codes]
+            np.maximum.at(self.registers, (slots, register), rank.astype(np.uint8))
+            np.add.at(self.transactions, slots, counts)
+            # Raise each pair's counters only to its own new estimate (never undercounts)
+            estimates = self._estimates(columns) + pair_counts
+            for d in range(self.depth):
+                np.maximum.at(self.counts[d], columns[d], estimates.astype(np.uint32))
+            self.total += int(counts.sum())
+            self._update_top(slots[first], buyers[first], self._estimates(columns))
+            self.loaded = True
+        return int(counts.sum())
+
+    def _update_top(self, slots, buyers, estimates):
+        """Merge each seller's best candidates from this batch (distinct pairs) into its top-k."""
+        frame = pd.DataFrame({"slot": slots, "buyer": buyers, "estimate": estimates})
+        frame = (frame.sort_values(["slot", "estimate"], ascending=[True, False])
+                 .groupby("slot").head(self.top_k))
+        for slot, buyer, estimate in zip(frame["slot"].tolist(), frame["buyer"].tolist(), frame["estimate"].tolist()):
+            self.top[slot][buyer] = estimate
+        full = [s for s in frame["slot"].unique().tolist() if len(self.top[s]) > self.top_k]
+        if not full:
+            return
+        # Re-read older candidates too before dropping the smallest
+        pairs = [(s, b) for s in full for b in self.top[s]]
+        estimates = self._query([self.sellers[s] for s, _ in pairs], [b for _, b in pairs])
+        for s in full:
+            self.top[s] = {}
+        for (s, b), estimate in zip(pairs, estimates.tolist()):
+            self.top[s][b] = estimate
+        for s in full:
+            self.top[s] = dict(sorted(self.top[s].items(), key=lambda kv: -kv[1])[:self.top_k])
+
+    def _query(self, seller_ids, buyer_ids) -> np.ndarray:
+        if not seller_ids:
+            return np.zeros(0, dtype=np.int64)
+        return self._estimates(self._columns(hash_ids(buyer_ids) ^ (hash_ids(seller_ids) * _GOLDEN)))
+
+    def seller_stats(self, seller_id) -> dict:
+        """Buyer diversity and top repeat buyers of one seller (zeros when unseen)."""
+        with self._lock:
+            slot = self._slots.get(seller_id)
+            if slot is None:
+                transactions, distinct, top = 0, 0, []
+            else:
+                transactions = int(self.transactions[slot])
+                distinct = min(transactions, int(round(hll_estimate(self.registers[slot])[0])))
+                # A candidate's estimate is refreshed whenever a batch includes its pair
+                top = sorted(((b, min(e, transactions)) for b, e in self.top[slot].items()), key=lambda kv: -kv[1])
+        diversity = distinct / transactions if transactions else 0.0
+        top_share = top[0][1] / transactions if top else 0.0
+        high_risk = transactions >= MIN_TRANSACTIONS and (
+            top_share >= REPEAT_SHARE_THRESHOLD or diversity <= LOW_DIVERSITY_THRESHOLD)
+        return {
+            "transactions": transactions,
+            "distinct_buyers": distinct,
+            "buyer_diversity": round(diversity, 4),
+            "repeat_transactions": transactions - distinct,
+            "top_buyers": [{"buyer_id": b, "transactions": c} for b, c in top if c > 1],
+            "top_buyer_share": round(top_share, 4),
+            "repeat_buyer_risk": "High" if high_risk else "Low",
+        }
+
+    def nbytes(self) -> int:
+        """Sketch memory: the shared Count-Min table plus registers and counters per seller."""
+        per_seller = self.registers.shape[1] + 8
+        return int(self.counts.nbytes + len(self.sellers) * per_seller)
+
+    def stats(self) -> dict:
+        return {
+            "sellers": len(self.sellers),
+            "transactions": self.total,
+            "bytes": self.nbytes(),
+            "loaded": self.loaded,
+            **self.config(),
+        }
+
+    def snapshot(self):
+        """Copies of the sketch state for graph_snapshot.py: (sellers, arrays, top)."""
+        with self._lock:
+            n = len(self.sellers)
+            arrays = {
+                "registers": self.registers[:n].copy(),
+                "transactions": self.transactions[:n].copy(),
+                "counts": self.counts.copy(),
+                "total": np.array([self.total], dtype=np.int64),
+            }
+            return list(self.sellers), arrays, [list(t.items()) for t in self.top]
+
+    def restore(self, sellers, arrays, top):
+        with self._lock:
+            self.sellers = list(sellers)
+            self._slots = {s: i for i, s in enumerate(self.sellers)}
+            self.registers = np.array(arrays["registers"], dtype=np.uint8)
+            self.transactions = np.array(arrays["transactions"], dtype=np.int64)
+            self.counts = np.array(arrays["counts"], dtype=np.uint32)
+            self.total = int(arrays["total"][0])
+            self.top = [dict((b, int(e)) for b, e in t) for t in top]
+            self.loaded = True
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import numpy as np
+import networkx as nx
+
+ALGORITHMS = ("louvain", "label_propagation")
+
+def label_propagation(num_nodes, u, v, w, is_seller, max_iter=20):
+    """
+    Weighted label propagation over an undirected edge list, vectorised with NumPy.
+
+    The buyer -> seller graph is bipartite, where fully synchronous updates
+    oscillate, so sellers and buyers are updated in alternating half-steps.
+    Each node takes the label with the largest total edge weight among its
+    neighbours (ties -> smallest label). Returns an int array of labels.
+    """
+    labels = np.arange(num_nodes, dtype=np.int64)
+    if len(u) == 0:
+        return labels
+    # Both directions so every node sees all of its neighbours
+    src = np.concatenate([u, v]).astype(np.int64)
+    dst = np.concatenate([v, u]).astype(np.int64)
+    weight = np.concatenate([w, w]).astype(np.float64)
+
+    for _ in range(max_iter):
+        changed = 0
+        for side in (True, False):
+            sel = is_seller[src] == side
+            nodes, neighbour_labels, weights = src[sel], labels[dst[sel]], weight[sel]
+            if len(nodes) == 0:
+                continue
+            # Total weight per (node, label), then the best label per node
+            keys, inverse = np.unique(nodes * num_nodes + neighbour_labels, return_inverse=True)
+            totals = np.bincount(inverse, weights=weights)
+            key_nodes, key_labels = keys // num_nodes, keys % num_nodes
+            # Sort by node, then weight descending, then label ascending
+            order = np.lexsort((key_labels, -totals, key_nodes))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = key_nodes[order][1:] != key_nodes[order][:-1]
+            best_nodes = key_nodes[order][first]
+            best_labels = key_labels[order][first]
+            changed += int(np.count_nonzero(labels[best_nodes] != best_labels))
+            labels[best_nodes] = best_labels
+        if changed == 0:
+            break
+    return labels
+
+def louvain(num_nodes, u, v, w, seed=42):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_weighted_edges_from(zip(u.tolist(), v.tolist(), w.tolist()))
+    labels = np.arange(num_nodes, dtype=np.int64)
+    for i, community in enumerate(nx.community.louvain_communities(graph, seed=seed)):
+        labels[list(community)] = num_nodes + i
+    return labels
+
+def score_communities(labels, u, v, w, is_seller, names, min_size=3, max_size=10):
+    """
+    Summarise communities of size in [min_size, max_size]:
+    buyers/sellers, internal edges and weight, bipartite density
+    (edges / (buyers * sellers)) and repeat intensity (weight / edges).
+    score = density * repeat intensity; higher is more suspicious.
+    """
+    _, compact, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    keep = (sizes >= min_size) & (sizes <= max_size)
+    if not keep.any():
+        return []
+    sellers = np.bincount(compact, weights=is_seller.astype(np.int64), minlength=len(sizes)).astype(np.int64)
+
+    internal = compact[u] == compact[v]
+    edge_labels = compact[u][internal]
+    edges = np.bincount(edge_labels, minlength=len(sizes))
+    weight = np.bincount(edge_labels, weights=w[internal], minlength=len(sizes))
+
+    order = np.argsort(compact, kind="stable")
+    boundaries = np.concatenate([[0], np.cumsum(sizes)])
+    results = []
+    for c in np.flatnonzero(keep):
+        buyers = int(sizes[c] - sellers[c])
+        pairs = buyers * int(sellers[c])
+        density = edges[c] / pairs if pairs else 0.0
+        intensity = weight[c] / edges[c] if edges[c] else 0.0
+        members = order[boundaries[c] : boundaries[c + 1]]
+        results.append({
+            "members": [names[i] for i in members],
+            "size": int(sizes[c]),
+            "buyers": buyers,
+            "sellers": int(sellers[c]),
+            "edges": int(edges[c]),
+            "weight": int(weight[c]),
+            "density": round(float(density), 4),
+            "repeat_intensity": round(float(intensity), 4),
+            "score": round(float(density * intensity), 4),
+        })
+    results.sort(key=lambda r: (-r["score"], -r["size"]))
+    return results
+
+class CommunityCache:
+    """Latest community detection result, stamped with the graph version it saw."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held by the detection run in progress; a second run is skipped, not queued
+        self._run_lock = threading.Lock()
+        self.result = None
+        self.version = 0
+
+    @property
+    def running(self):
+        return self._run_lock.locked()
+
+    def try_start(self):
+        """Claim the single detection run; False if one is already running."""
+        return self._run_lock.acquire(blocking=False)
+
+    def finish(self):
+        self._run_lock.release()
+
+    def store(self, result):
+        with self._lock:
+            self.version += 1
+            self.result = {**result, "version": self.version, "computed_at": time.time()}
+
+    def restore(self, result):
+        """Adopt a result loaded from a graph snapshot (keeps its version and time)."""
+        with self._lock:
+            self.version = result["version"]
+            self.result = result
+
+    def get(self):
+        with self._lock:
+            return self.result
@@ -0,0 +1,74 @@
+"""
+TRUSTRA - Graph backend comparison
+Builds the same synthetic buyer -> seller graph with the NetworkX and CSR
+backends and reports memory, build time and per-lookup latency as JSON.
+
+Usage:
+    python compare_backends.py --edges 1000000 --sellers 50000 --buyers 500000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+
+from graph_engine import GraphEngine
+
+def synthetic_edges(num_edges, num_sellers, num_buyers, seed=7):
+    rng = np.random.default_rng(seed)
+    seller_names = [str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2**63, num_sellers)]
+    buyer_names = [str(uuid.UUID(int=int(x))) for x in rng.integers(0, 2**63, num_buyers)]
+    # Zipf-ish seller popularity so some sellers have high degree
+    seller_idx = np.minimum(rng.zipf(1.3, num_edges) - 1, num_sellers - 1)
+    buyer_idx = rng.integers(0, num_buyers, num_edges)
+    rows = [{"buyer_id": buyer_names[b], "seller_id": seller_names[s]} for b, s in zip(buyer_idx, seller_idx)]
+    return rows, seller_names
+
+def measure(backend, rows, sample):
+    tracemalloc.start()
+    start = time.perf_counter()
+    engine = GraphEngine(backend=backend, autoload=False)
+    engine._build_graph_from_rows(rows)
+    build_s = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for seller_id in sample:
+        engine.get_centrality_score(seller_id)
+    centrality_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    start = time.perf_counter()
+    for seller_id in sample:
+        engine.detect_collusion(seller_id)
+    clustering_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    return {
+        "backend": backend,
+        "nodes": engine.graph.number_of_nodes(),
+        "edges": engine.graph.number_of_edges(),
+        "build_s": round(build_s, 3),
+        "memory_mb": round(current / 2**20, 1),
+        "peak_memory_mb": round(peak / 2**20, 1),
+        "centrality_us": round(centrality_us, 2),
+        "clustering_us": round(clustering_us, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare NetworkX and CSR graph backends")
+    parser.add_argument("--edges", type=int, default=200000)
+    parser.add_argument("--sellers", type=int, default=10000)
+    parser.add_argument("--buyers", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=500, help="Sellers to look up")
+    args = parser.parse_args()
+
+    rows, sellers = synthetic_edges(args.edges, args.sellers, args.buyers)
+    # Include the most popular sellers: they dominate clustering cost
+    sample = sellers[: args.sample]
+    results = [measure(backend, rows, sample) for backend in ("networkx", "csr")]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+import numpy as np
+import networkx as nx
+
+# Node type codes stored per node in an int8 array
+NODE_TYPES = {None: 0, 'Buyer': 1, 'Seller': 2}
+TYPE_NAMES = {code: name for name, code in NODE_TYPES.items()}
+# Arrays written to (and memory-mapped from) graph snapshots
+SNAPSHOT_ARRAYS = ("indptr", "indices", "weights", "in_indptr", "in_indices", "in_weights")
+
+class CSRGraph:
+    """
+    Compact buyer -> seller graph: node ids are interned to int32 and edges are
+    kept in CSR arrays (indptr / indices / weights) for both directions.
+
+    New edges land in a small pending buffer and are merged into the CSR arrays
+    once it reaches compact_threshold (or on compact()). Weight bumps on existing
+    edges are applied in place. Implements the subset of the nx.DiGraph API that
+    GraphEngine uses.
+    """
+
+    def __init__(self, compact_threshold=100000):
+        self.compact_threshold = compact_threshold
+        self._ids = {}          # node name -> int id
+        self._names = []        # int id -> node name
+        self._types = np.zeros(0, dtype=np.int8)
+        self._in_degree = np.zeros(0, dtype=np.int32)
+        self._out_degree = np.zeros(0, dtype=np.int32)
+
+        # Out-edges (source -> target) and in-edges (target <- source)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.int32)
+        self.in_indptr = np.zeros(1, dtype=np.int64)
+        self.in_indices = np.zeros(0, dtype=np.int32)
+        self.in_weights = np.zeros(0, dtype=np.int32)
+
+        self._pending = {}      # (source, target) -> weight, not yet in CSR
+        self._pending_adj = {}  # node -> set of undirected neighbours in _pending
+
+    # --- Interning ---
+    def _intern(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = len(self._names)
+            self._ids[name] = node
+            self._names.append(name)
+            if node >= len(self._types):
+                grow = max(1024, len(self._types))
+                self._types = np.concatenate([self._types, np.zeros(grow, dtype=np.int8)])
+                self._in_degree = np.concatenate([self._in_degree, np.zeros(grow, dtype=np.int32)])
+                self._out_degree = np.concatenate([self._out_degree, np.zeros(grow, dtype=np.int32)])
+        return node
+
+    def node_id(self, name):
+        return self._ids.get(name)
+
+    def node_name(self, node):
+        return self._names[node]
+
+    # --- Mutation ---
+    def _csr_position(self, source, target):
+        """Index of source -> target in the CSR arrays, or -1."""
+        if source + 1 >= len(self.indptr):
+            return -1
+        lo, hi = self.indptr[source], self.indptr[source + 1]
+        pos = lo + np.searchsorted(self.indices[lo:hi], target)
+        if pos < hi and self.indices[pos] == target:
+            return int(pos)
+        return -1
+
+    def _csr_in_position(self, source, target):
+        """Index of source -> target in the in-edge CSR arrays, or -1."""
+        if target + 1 >= len(self.in_indptr):
+            return -1
+        lo, hi = self.in_indptr[target], self.in_indptr[target + 1]
+        pos = lo + np.searchsorted(self.in_indices[lo:hi], source)
+        if pos < hi and self.in_indices[pos] == source:
+            return int(pos)
+        return -1
+
+    def add_weighted_edges(self, edge_counts, source_type='Buyer', target_type='Seller'):
+        """Add {(source, target): count} to the graph, summing weights on existing edges."""
+        if not edge_counts:
+            return
+        intern = self._intern
+        sources = np.fromiter((intern(s) for s, _ in edge_counts), dtype=np.int32, count=len(edge_counts))
+        targets = np.fromiter((intern(t) for _, t in edge_counts), dtype=np.int32, count=len(edge_counts))
+        counts = np.fromiter(edge_counts.values(), dtype=np.int32, count=len(edge_counts))
+        self._types[sources] = NODE_TYPES[source_type]
+        self._types[targets] = NODE_TYPES[target_type]
+
+        # Large batches (initial load, bulk ingest) are merged straight into CSR
+        if len(counts) + len(self._pending) >= self.compact_threshold:
+            self._merge(sources, targets, counts)
+            return
+
+        for source, target, count in zip(sources.tolist(), targets.tolist(), counts.tolist()):
+            pos = self._csr_position(source, target)
+            if pos >= 0:
+                self.weights[pos] += count
+                self.in_weights[self._csr_in_position(source, target)] += count
+            elif (source, target) in self._pending:
+                self._pending[(source, target)] += count
+            else:
+                self._pending[(source, target)] = count
+                self._pending_adj.setdefault(source, set()).add(target)
+                self._pending_adj.setdefault(target, set()).add(source)
+                self._out_degree[source] += 1
+                self._in_degree[target] += 1
+
+    def compact(self):
+        """Merge pending edges into the CSR arrays."""
+        if self._pending or len(self.indptr) != len(self._names) + 1:
+            self._merge(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+    def _merge(self, sources, targets, counts):
+        """Rebuild the CSR arrays from the current CSR, pending edges and a new batch."""
+        n = len(self._names)
+        old_rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        if self._pending:
+            pairs = np.array(list(self._pending.keys()), dtype=np.int32).reshape(-1, 2)
+            pending_w = np.fromiter(self._pending.values(), dtype=np.int32, count=len(self._pending))
+        else:
+            pairs = np.zeros((0, 2), dtype=np.int32)
+            pending_w = np.zeros(0, dtype=np.int32)
+
+        rows = np.concatenate([old_rows, pairs[:, 0], sources]).astype(np.int64)
+        cols = np.concatenate([self.indices, pairs[:, 1], targets]).astype(np.int64)
+        weights = np.concatenate([self.weights, pending_w, counts])
+
+        # Sum weights of repeated (row, col) pairs; unique keys come back sorted
+        keys, inverse = np.unique(rows * n + cols, return_inverse=True)
+        summed = np.bincount(inverse, weights=weights, minlength=len(keys)).astype(np.int32)
+        rows = (keys // n).astype(np.int32)
+        cols = (keys % n).astype(np.int32)
+
+        self.indices = cols
+        self.weights = summed
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        out_degree = np.bincount(rows, minlength=n)
+        np.cumsum(out_degree, out=self.indptr[1:])
+
+        in_order = np.argsort(cols, kind='stable')
+        self.in_indices = rows[in_order]
+        self.in_weights = summed[in_order]
+        self.in_indptr = np.zeros(n + 1, dtype=np.int64)
+        in_degree = np.bincount(cols, minlength=n)
+        np.cumsum(in_degree, out=self.in_indptr[1:])
+
+        self._out_degree[:n] = out_degree
+        self._in_degree[:n] = in_degree
+        self._pending = {}
+        self._pending_adj = {}
+
+    # --- nx.DiGraph-compatible reads ---
+    def has_node(self, name):
+        return name in self._ids
+
+    def has_edge(self, source_name, target_name):
+        source, target = self._ids.get(source_name), self._ids.get(target_name)
+        if source is None or target is None:
+            return False
+        return self._csr_position(source, target) >= 0 or (source, target) in self._pending
+
+    def in_degree(self, name):
+        node = self._ids.get(name)
+        return int(self._in_degree[node]) if node is not None else 0
+
+    def out_degree(self, name):
+        node = self._ids.get(name)
+        return int(self._out_degree[node]) if node is not None else 0
+
+    def number_of_nodes(self):
+        return len(self._names)
+
+    def number_of_edges(self):
+        return int(self._in_degree[: len(self._names)].sum())
+
+    def node_type(self, name):
+        node = self._ids.get(name)
+        return TYPE_NAMES[int(self._types[node])] if node is not None else None
+
+    def neighbors_undirected(self, node):
+        """Sorted int32 array of in- and out-neighbours of an interned node."""
+        parts = []
+        if node + 1 < len(self.indptr):
+            parts.append(self.indices[self.indptr[node] : self.indptr[node + 1]])
+            parts.append(self.in_indices[self.in_indptr[node] : self.in_indptr[node + 1]])
+        pending = self._pending_adj.get(node)
+        if pending:
+            parts.append(np.fromiter(pending, dtype=np.int32, count=len(pending)))
+        if not parts:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate(parts))
+
+    def _gather(self, indptr, indices, nodes):
+        """Concatenate the CSR rows of many nodes in one vectorised gather."""
+        nodes = nodes[nodes + 1 < len(indptr)]
+        starts = indptr[nodes]
+        lengths = indptr[nodes + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=indices.dtype)
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        return indices[offsets + np.arange(total)]
+
+    def clustering(self, name):
+        """
+        Directed clustering coefficient, matching nx.clustering on a DiGraph
+        without reciprocal edges: triangles / (d * (d - 1)) on the undirected
+        neighbourhood.
+        """
+        node = self._ids.get(name)
+        if node is None:
+            return 0.0
+        neighbours = self.neighbors_undirected(node)
+        degree = len(neighbours)
+        if degree < 2:
+            return 0.0
+
+        mask = np.zeros(len(self._names), dtype=bool)
+        mask[neighbours] = True
+        # Count every edge between two neighbours (seen once from each end)
+        links = int(np.count_nonzero(mask[self._gather(self.indptr, self.indices, neighbours)]))
+        links += int(np.count_nonzero(mask[self._gather(self.in_indptr, self.in_indices, neighbours)]))
+        for other in neighbours[np.isin(neighbours, list(self._pending_adj))] if self._pending_adj else ():
+            links += sum(1 for v in self._pending_adj[int(other)] if mask[v])
+
+        triangles = links / 2
+        return float(triangles / (degree * (degree - 1)))
+
+    def sellers(self):
+        """Names of all nodes tagged as sellers."""
+        n = len(self._names)
+        return [self._names[i] for i in np.flatnonzero(self._types[:n] == NODE_TYPES['Seller'])]
+
+    def predecessors(self, name):
+        """Names of nodes with an edge into `name` (a seller's buyers)."""
+        node = self._ids.get(name)
+        if node is None:
+            return []
+        found = self._gather(self.in_indptr, self.in_indices, np.array([node]))
+        extra = [s for s in self._pending_adj.get(node, ()) if (s, node) in self._pending]
+        return [self._names[i] for i in np.concatenate([found, np.array(extra, dtype=np.int32)])]
+
+    def successors(self, name):
+        """Names of nodes `name` has an edge to (a buyer's sellers)."""
+        node = self._ids.get(name)
+        if node is None:
+            return []
+        found = self._gather(self.indptr, self.indices, np.array([node]))
+        extra = [t for t in self._pending_adj.get(node, ()) if (node, t) in self._pending]
+        return [self._names[i] for i in np.concatenate([found, np.array(extra, dtype=np.int32)])]
+
+    def seller_stats(self, name):
+        """
+        In-degree, weighted in-degree and buyer overlap for one seller: the other
+        seller sharing the most buyers with it (via the bipartite projection).
+        """
+        node = self._ids.get(name)
+        if node is None:
+            return {"in_degree": 0, "weighted_in_degree": 0, "shared_buyers": 0, "top_overlap_seller": None}
+
+        buyers, weights = [], []
+        if node + 1 < len(self.in_indptr):
+            lo, hi = self.in_indptr[node], self.in_indptr[node + 1]
+            buyers.append(self.in_indices[lo:hi])
+            weights.append(self.in_weights[lo:hi].astype(np.int64))
+        for source in self._pending_adj.get(node, ()):
+            if (source, node) in self._pending:
+                buyers.append(np.array([source], dtype=np.int32))
+                weights.append(np.array([self._pending[(source, node)]], dtype=np.int64))
+        buyers = np.concatenate(buyers) if buyers else np.zeros(0, dtype=np.int32)
+        weighted = int(np.concatenate(weights).sum()) if weights else 0
+
+        # Sellers reached from this seller's buyers, excluding itself
+        co_sellers = [self._gather(self.indptr, self.indices, buyers)]
+        for buyer in buyers.tolist():
+            pending = self._pending_adj.get(buyer)
+            if pending:
+                co_sellers.append(np.array([t for t in pending if (buyer, t) in self._pending], dtype=np.int32))
+        co_sellers = np.concatenate(co_sellers)
+        co_sellers = co_sellers[co_sellers != node]
+
+        shared, top = 0, None
+        if len(co_sellers):
+            values, counts = np.unique(co_sellers, return_counts=True)
+            best = int(np.argmax(counts))
+            shared, top = int(counts[best]), self._names[int(values[best])]
+        return {
+            "in_degree": int(len(buyers)),
+            "weighted_in_degree": weighted,
+            "shared_buyers": shared,
+            "top_overlap_seller": top,
+        }
+
+    def _row_lengths(self, indptr, nodes):
+        """Row lengths for many nodes (0 for nodes interned after the last compaction)."""
+        lengths = np.zeros(len(nodes), dtype=np.int64)
+        valid = nodes + 1 < len(indptr)
+        lengths[valid] = indptr[nodes[valid] + 1] - indptr[nodes[valid]]
+        return lengths
+
+    def seller_stats_many(self, names):
+        """
+        seller_stats() for many sellers in one pass. Each distinct buyer's sellers
+        are gathered once however many requested sellers share that buyer, then
+        every (seller, co-seller) overlap is counted together.
+        """
+        nodes = np.array([self._ids[n] for n in names if n in self._ids], dtype=np.int64)
+        empty = {"in_degree": 0, "weighted_in_degree": 0, "shared_buyers": 0, "top_overlap_seller": None}
+        if len(nodes) == 0:
+            return {name: dict(empty) for name in names}
+        k, n = len(nodes), len(self._names)
+
+        # Buyers of every requested seller, labelled with the seller's position
+        owner = np.repeat(np.arange(k), self._row_lengths(self.in_indptr, nodes))
+        buyers = self._gather(self.in_indptr, self.in_indices, nodes).astype(np.int64)
+        weights = self._gather(self.in_indptr, self.in_weights, nodes).astype(np.int64)
+        if self._pending:
+            extra = [(i, source, self._pending[(source, node)]) for i, node in enumerate(nodes.tolist())
+                     for source in self._pending_adj.get(node, ()) if (source, node) in self._pending]
+            if extra:
+                extra = np.array(extra, dtype=np.int64)
+                owner, buyers, weights = (np.concatenate([owner, extra[:, 0]]),
+                                          np.concatenate([buyers, extra[:, 1]]),
+                                          np.concatenate([weights, extra[:, 2]]))
+        in_degree = np.bincount(owner, minlength=k)
+        weighted = np.bincount(owner, weights=weights, minlength=k).astype(np.int64)
+
+        # Successor rows of the distinct buyers, gathered once (local CSR over `distinct`)
+        distinct, inverse = np.unique(buyers, return_inverse=True)
+        row = np.repeat(np.arange(len(distinct)), self._row_lengths(self.indptr, distinct))
+        succ = self._gather(self.indptr, self.indices, distinct).astype(np.int64)
+        if self._pending:
+            extra = [(j, t) for j, b in enumerate(distinct.tolist())
+                     for t in self._pending_adj.get(b, ()) if (b, t) in self._pending]
+            if extra:
+                extra = np.array(extra, dtype=np.int64)
+                order = np.argsort(np.concatenate([row, extra[:, 0]]), kind='stable')
+                row = np.concatenate([row, extra[:, 0]])[order]
+                succ = np.concatenate([succ, extra[:, 1]])[order]
+        local_ptr = np.zeros(len(distinct) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row, minlength=len(distinct)), out=local_ptr[1:])
+
+        # Every buyer path seller -> buyer -> co-seller, then overlap counts per pair
+        co = self._gather(local_ptr, succ, inverse)
+        label = np.repeat(owner, local_ptr[inverse + 1] - local_ptr[inverse])
+        keep = co != nodes[label]
+        pairs, counts = np.unique(label[keep] * n + co[keep], return_counts=True)
+        pair_label, pair_co = pairs // n, pairs % n
+        # Highest count per seller, lowest node id on ties (as np.argmax in seller_stats)
+        order = np.lexsort((-counts, pair_label))
+        first = order[np.unique(pair_label[order], return_index=True)[1]]
+
+        shared = np.zeros(k, dtype=np.int64)
+        top = [None] * k
+        for i in first.tolist():
+            shared[pair_label[i]] = counts[i]
+            top[pair_label[i]] = self._names[int(pair_co[i])]
+        stats = {name: dict(empty) for name in names}
+        for i, node in enumerate(nodes.tolist()):
+            stats[self._names[node]] = {
+                "in_degree": int(in_degree[i]),
+                "weighted_in_degree": int(weighted[i]),
+                "shared_buyers": int(shared[i]),
+                "top_overlap_seller": top[i],
+            }
+        return stats
+
+    def clustering_many(self, names):
+        """clustering() for many nodes, reusing one neighbour mask instead of one per node."""
+        mask = np.zeros(len(self._names), dtype=bool)
+        result = {}
+        for name in names:
+            node = self._ids.get(name)
+            neighbours = self.neighbors_undirected(node) if node is not None else ()
+            degree = len(neighbours)
+            if degree < 2:
+                result[name] = 0.0
+                continue
+            mask[neighbours] = True
+            links = int(np.count_nonzero(mask[self._gather(self.indptr, self.indices, neighbours)]))
+            links += int(np.count_nonzero(mask[self._gather(self.in_indptr, self.in_indices, neighbours)]))
+            for other in neighbours[np.isin(neighbours, list(self._pending_adj))] if self._pending_adj else ():
+                links += sum(1 for v in self._pending_adj[int(other)] if mask[v])
+            mask[neighbours] = False
+            result[name] = float(links / 2 / (degree * (degree - 1)))
+        return result
+
+    def nbytes(self):
+        """Bytes held in the NumPy arrays (excludes the id-interning dict)."""
+        arrays = (self._types, self._in_degree, self._out_degree, self.indptr, self.indices,
+                  self.weights, self.in_indptr, self.in_indices, self.in_weights)
+        return int(sum(a.nbytes for a in arrays))
+
+    # --- Snapshots ---
+    def snapshot_arrays(self):
+        """(names, arrays) copied from the compacted graph, safe to write without the graph lock."""
+        self.compact()
+        arrays = {name: getattr(self, name).copy() for name in SNAPSHOT_ARRAYS}
+        arrays["types"] = self._types[: len(self._names)].copy()
+        return list(self._names), arrays
+
+    @classmethod
+    def from_arrays(cls, names, arrays, compact_threshold=100000):
+        """
+        Rebuild from snapshot_arrays output. The CSR arrays may be memory-mapped
+        copy-on-write: in-place weight bumps stay private, merges allocate new arrays.
+        """
+        graph = cls(compact_threshold)
+        graph._names = names
+        graph._ids = {name: i for i, name in enumerate(names)}
+        for name in SNAPSHOT_ARRAYS:
+            setattr(graph, name, arrays[name])
+        graph._types = np.array(arrays["types"], dtype=np.int8)
+        graph._out_degree = np.diff(graph.indptr).astype(np.int32)
+        graph._in_degree = np.diff(graph.in_indptr).astype(np.int32)
+        return graph
+
+    @classmethod
+    def from_edges(cls, names, types, u, v, w):
+        """Build from int edge arrays (as returned by GraphEngine.edge_arrays)."""
+        graph = cls()
+        graph._names = list(names)
+        graph._ids = {name: i for i, name in enumerate(graph._names)}
+        n = len(graph._names)
+        graph._types = np.array(types, dtype=np.int8)
+        graph._in_degree = np.zeros(n, dtype=np.int32)
+        graph._out_degree = np.zeros(n, dtype=np.int32)
+        graph._merge(np.asarray(u, dtype=np.int32), np.asarray(v, dtype=np.int32), np.asarray(w, dtype=np.int32))
+        return graph
+
+    def to_digraph(self):
+        """The same graph as the nx.DiGraph GraphEngine builds for the networkx backend."""
+        self.compact()
+        graph = nx.DiGraph()
+        names = self._names
+        graph.add_nodes_from((name, {'type': TYPE_NAMES[int(t)]}) for name, t in zip(names, self._types))
+        rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        graph.add_edges_from(
+            (names[u], names[v], {'type': 'TRANSACTED_WITH', 'weight': int(w)})
+            for u, v, w in zip(rows.tolist(), self.indices.tolist(), self.weights.tolist())
+        )
+        return graph
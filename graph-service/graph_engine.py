@@ -1,40 +1,90 @@
 import networkx as nx
 import os
-import requests
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from buyer_sketch import BuyerSketches
+from csr_graph import CSRGraph
+from seller_index import SellerIndex
+import community_detector
+import graph_snapshot
+from community_detector import CommunityCache
+
+# A seller's buyers must overlap this much with one other seller to score
+COLLUSION_MIN_SHARED_BUYERS = 3
+# Rows per sketch update when a sketch-only load reads a whole frame
+SKETCH_CHUNK_ROWS = 200_000
+# Pushed event ids remembered until a delta pulls the same rows (oldest dropped first)
+PUSHED_IDS_MAX = int(os.environ.get("GRAPH_PUSHED_IDS_MAX", "100000"))
+
+def utc_instant(timestamp):
+    """An ISO timestamp as an aware UTC datetime ('Z', offsets and naive times), or None."""
+    if not timestamp or not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+# Pooled Supabase client shared with ml-service lives in ../shared
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.supabase_client import SupabaseClient, SupabaseError
+from shared.columnar_store import ColumnarStore
+from shared.metrics import registry as metrics
 
 class GraphEngine:
-    def __init__(self, data_path="../data-simulation"):
-        self.graph = nx.DiGraph()
+    def __init__(self, data_path="../data-simulation", backend=None, autoload=True, shard=None, sketch_only=None):
+        # "networkx" (default) or "csr" for the compact int32/CSR representation
+        self.backend = backend or os.environ.get("GRAPH_BACKEND", "networkx")
+        if self.backend not in ("networkx", "csr"):
+            raise ValueError(f"Unknown graph backend: {self.backend}")
+        self.graph = CSRGraph() if self.backend == "csr" else nx.DiGraph()
+        # Fixed-memory buyer diversity / repeat-buyer sketches, fed before the graph;
+        # sketch_only (GRAPH_SKETCH_ONLY=1) keeps just these and never builds the graph
+        self.sketches = BuyerSketches.from_env()
+        self.sketch_only = sketch_only if sketch_only is not None else os.environ.get("GRAPH_SKETCH_ONLY", "0") == "1"
         self.data_path = data_path
+        # ShardSpec when this instance owns one seller hash range (see sharding.py)
+        self.shard = shard
+        self._shard_buyers = set()  # buyers of owned sellers, whose other edges form the halo
+        # Where the graph came from ("supabase", "columnar", "csv" or "snapshot" sources), for snapshots
+        self.source = None
+        self.source_mtimes = {}
+        # Guards in-place graph mutation against concurrent readers
+        self._lock = threading.RLock()
+        # Latest transaction timestamp pulled (loads and deltas, never pushed events),
+        # plus the ids seen at exactly that timestamp so a `gte` delta query can skip
+        # them without losing ties
+        self.watermark = None
+        self._watermark_ids = set()
+        # Ids of pushed events (POST /graph/edges) not yet seen in a pull, so the
+        # delta that later returns their rows does not count them twice
+        self._pushed_ids = OrderedDict()
+        self.index = SellerIndex()
+        # Bumped on every edge change; community results record the version they saw
+        self.graph_version = 0
+        self.communities = CommunityCache()
         
         # Supabase Config
         self.supabase_url = os.environ.get("SUPABASE_URL", "https://gpdhyiohcagqydhhjzrz.supabase.co")
         self.supabase_key = os.environ.get("SUPABASE_KEY", "sb_publishable_DixO3g1pvbB4aRuaTXh4Mw_5miq-nXW")
-        self.rest_url = f"{self.supabase_url}/rest/v1"
-        self.headers = {
-            "apikey": self.supabase_key,
-            "Authorization": f"Bearer {self.supabase_key}",
-        }
+        self.supabase = SupabaseClient(self.supabase_url, self.supabase_key, timeout=15)
         
-        self.load_data()
+        if autoload:
+            with metrics.timer("trustra_stage_seconds", stage="graph_load"):
+                self.load_data()
 
     def sb_query(self, table: str, params: dict = None) -> list:
         """Query Supabase REST API."""
-        try:
-            resp = requests.get(
-                f"{self.rest_url}/{table}",
-                headers=self.headers,
-                params=params or {},
-                timeout=15
-            )
-            if resp.status_code == 200:
-                return resp.json()
-            else:
-                print(f"Supabase query error ({table}): {resp.status_code}")
-                return []
-        except Exception as e:
-            print(f"Supabase connection error: {e}")
-            return []
+        return self.supabase.query(table, params)
 
     def load_data(self):
         """
@@ -44,28 +94,38 @@ class GraphEngine:
         
         # Try Supabase first
         print("  Trying Supabase...")
-        # Fetch all transactions (paginated - Supabase returns max 1000 by default)
-        all_txns = []
-        offset = 0
-        page_size = 1000
-        while True:
-            rows = self.sb_query("transactions", {
-                "select": "buyer_id,seller_id",
-                "limit": str(page_size),
-                "offset": str(offset)
-            })
-            if not rows:
-                break
-            all_txns.extend(rows)
-            if len(rows) < page_size:
-                break
-            offset += page_size
+        try:
+            if self.shard is not None:
+                all_txns = self._query_shard_rows()
+            else:
+                # Fetch all transactions (paginated - Supabase returns max 1000 by default,
+                # several pages are fetched concurrently)
+                all_txns = self.supabase.query_all(
+                    "transactions", {"select": "id,buyer_id,seller_id,timestamp"}, page_size=1000
+                )
+        except SupabaseError as e:
+            # Never build from a partial page set
+            print(f"  {e}")
+            all_txns = []
         
         if all_txns:
             print(f"  Loaded {len(all_txns)} transactions from Supabase.")
             self._build_graph_from_rows(all_txns)
+            self.source = "supabase"
             return
         
+        columnar_path = os.environ.get("COLUMNAR_PATH", os.path.join(self.data_path, "columnar"))
+        if ColumnarStore.available(columnar_path):
+            print("  Supabase unavailable, mapping columnar snapshot...")
+            try:
+                # Only the four edge columns are decoded; the rest stay on disk
+                df = ColumnarStore(columnar_path).frame("transactions", columns=['id', 'buyer_id', 'seller_id', 'timestamp'])
+                self._build_from_frame(df)
+                self.source, self.source_mtimes = "columnar", self.offline_source_mtimes()
+                return
+            except Exception as e:
+                print(f"  Error reading columnar data: {e}")
+
         # CSV Fallback
         print("  Supabase unavailable, falling back to CSV...")
         try:
@@ -73,44 +133,254 @@ class GraphEngine:
             tx_path = os.path.join(self.data_path, "transactions.csv")
             if os.path.exists(tx_path):
                 df = pd.read_csv(tx_path)
-                rows = df[['buyer_id', 'seller_id']].to_dict('records')
-                self._build_graph_from_rows(rows)
+                columns = [c for c in ('id', 'buyer_id', 'seller_id', 'timestamp') if c in df.columns]
+                self._build_from_frame(df[columns])
+                self.source, self.source_mtimes = "csv", self.offline_source_mtimes()
             else:
                 print(f"  Warning: {tx_path} not found")
         except Exception as e:
             print(f"  Error loading CSV: {e}")
 
+    def offline_source_mtimes(self) -> dict:
+        """Modification times of the local files load_data can read, to detect stale snapshots."""
+        columnar_path = os.environ.get("COLUMNAR_PATH", os.path.join(self.data_path, "columnar"))
+        paths = [os.path.join(self.data_path, "transactions.csv"), os.path.join(columnar_path, "transactions.arrow")]
+        return {p: os.path.getmtime(p) for p in paths if os.path.exists(p)}
+
+    def save_snapshot(self, path) -> dict:
+        """Write the graph, seller index and communities to path (see graph_snapshot.py)."""
+        with metrics.timer("trustra_stage_seconds", stage="snapshot_save"):
+            return graph_snapshot.save(self, path)
+
+    def load_snapshot(self, path):
+        """Restore from the snapshot at path; returns its meta, or None if unusable."""
+        with metrics.timer("trustra_stage_seconds", stage="snapshot_load"):
+            return graph_snapshot.load(self, path)
+
+    def _shard_frame(self, df):
+        if self.shard is None:
+            return df
+        selected = self.shard.select_rows(df)
+        print(f"  Shard {self.shard.index}/{self.shard.count}: kept {len(selected)} of {len(df)} transactions")
+        return selected
+
+    def _query_shard_rows(self, chunk_size=200) -> list:
+        """
+        Fetch only this shard's transactions from Supabase: owned sellers' edges
+        by seller_id=in.(...), then the halo by buyer_id=in.(...).
+        """
+        select = "id,buyer_id,seller_id,timestamp"
+        sellers = [r['id'] for r in self.supabase.query_all("sellers", {"select": "id"})]
+        if not sellers:
+            return []
+        owned = [s for s in sellers if self.shard.owns(s)]
+
+        def fetch(column, ids):
+            rows = []
+            for i in range(0, len(ids), chunk_size):
+                chunk = ",".join(ids[i:i + chunk_size])
+                rows.extend(self.supabase.query_all("transactions", {"select": select, column: f"in.({chunk})"}))
+            return rows
+
+        rows = fetch("seller_id", owned)
+        if self.shard.halo and rows:
+            seen = {r['id'] for r in rows}
+            buyers = sorted({r['buyer_id'] for r in rows})
+            rows.extend(r for r in fetch("buyer_id", buyers) if r['id'] not in seen)
+        print(f"  Shard {self.shard.index}/{self.shard.count}: {len(owned)} of {len(sellers)} sellers, "
+              f"{len(rows)} transactions")
+        return rows
+
+    def _filter_shard_rows(self, rows: list) -> list:
+        """
+        Keep events for owned sellers and for buyers of owned sellers (the halo).
+        A buyer who first meets an owned seller later only brings their earlier
+        edges to other shards' sellers on the next full load.
+        """
+        owned = [self.shard.owns(row['seller_id']) for row in rows]
+        # Register this batch's buyers first so halo rows ahead of them are kept
+        self._shard_buyers.update(row['buyer_id'] for row, o in zip(rows, owned) if o)
+        if not self.shard.halo:
+            return [row for row, o in zip(rows, owned) if o]
+        return [row for row, o in zip(rows, owned) if o or row['buyer_id'] in self._shard_buyers]
+
+    def _build_from_frame(self, df):
+        """
+        Build from an offline transactions frame. Sketch-only mode feeds the
+        sketches straight from its columns, skipping the per-row dicts.
+        """
+        if not self.sketch_only:
+            self._build_graph_from_rows(self._shard_frame(df).to_dict('records'))
+            return
+        if self.shard is not None:
+            sellers = df['seller_id'].unique()
+            df = df[df['seller_id'].isin(sellers[self.shard.owned_mask(sellers)])]
+        with self._lock:
+            with metrics.timer("trustra_stage_seconds", stage="sketch_update"):
+                # Chunked so the temporary id and hash arrays stay small
+                for start in range(0, len(df), SKETCH_CHUNK_ROWS):
+                    chunk = df.iloc[start:start + SKETCH_CHUNK_ROWS]
+                    self.sketches.update(chunk['seller_id'].to_numpy(dtype=object), chunk['buyer_id'].to_numpy(dtype=object))
+            if 'timestamp' in df.columns and len(df):
+                self._advance_watermark(df[df['timestamp'] == df['timestamp'].max()].to_dict('records'))
+            self.graph_version += 1
+        sketches = self.sketches.stats()
+        print(f"  Buyer sketches: {sketches['sellers']} sellers, {sketches['bytes'] // 1024} KB.")
+
     def _build_graph_from_rows(self, rows: list):
-        """Build NetworkX graph from transaction rows."""
-        # Count edges (buyer -> seller)
-        edge_counts = {}
-        for row in rows:
-            key = (row['buyer_id'], row['seller_id'])
-            edge_counts[key] = edge_counts.get(key, 0) + 1
-        
+        """Build the graph from transaction rows."""
+        with metrics.timer("trustra_stage_seconds", stage="graph_build"):
+            self.add_edges(rows)
+        sketches = self.sketches.stats()
+        print(f"  Buyer sketches: {sketches['sellers']} sellers, {sketches['bytes'] // 1024} KB.")
+        if self.sketch_only:
+            return
+        if self.backend == "csr":
+            self.graph.compact()
+        print(f"  Graph built: {self.graph.number_of_nodes()} nodes, {self.graph.number_of_edges()} edges.")
+
+    def add_edges(self, rows: list, pushed: bool = False) -> int:
+        """
+        Apply buyer -> seller transaction events to the graph in place.
+        Each row needs buyer_id and seller_id; an optional 'count' (>= 1) adds that
+        many transactions at once. Pulled rows ('id'/'timestamp') advance the delta
+        watermark; pushed rows never do, and their ids are remembered so the pull
+        that returns the same rows skips them (a repeated push is skipped too).
+        Owned sellers' buyer sketches are updated too (only those in sketch-only mode).
+        Returns the number of distinct edges touched.
+        """
+        if self.shard is not None:
+            rows = self._filter_shard_rows(rows)
+        with self._lock:
+            if pushed:
+                rows = self._record_pushed(rows)
+            # Sketches first, so buyer signals are served while the graph is still building
+            self._update_sketches(rows)
+            if self.sketch_only:
+                if not pushed:
+                    self._advance_watermark(rows)
+                self.graph_version += 1
+                return 0
+
+            # Count edges (buyer -> seller)
+            edge_counts = {}
+            for row in rows:
+                key = (row['buyer_id'], row['seller_id'])
+                edge_counts[key] = edge_counts.get(key, 0) + int(row.get('count', 1))
+            if self.backend == "csr":
+                self.graph.add_weighted_edges(edge_counts)
+            else:
+                self._add_nx_edges(edge_counts)
+            if not pushed:
+                self._advance_watermark(rows)
+            self._mark_dirty(edge_counts)
+            self.graph_version += 1
+        return len(edge_counts)
+
+    def _update_sketches(self, rows: list):
+        if self.shard is not None:
+            rows = [row for row in rows if self.shard.owns(row['seller_id'])]
+        with metrics.timer("trustra_stage_seconds", stage="sketch_update"):
+            self.sketches.update([row['seller_id'] for row in rows], [row['buyer_id'] for row in rows],
+                                 [int(row.get('count', 1)) for row in rows])
+
+    def get_buyer_signals(self, seller_id) -> dict:
+        """Buyer diversity and repeat buyers from the sketches; needs no graph."""
+        return self.sketches.seller_stats(seller_id)
+
+    def _add_nx_edges(self, edge_counts: dict):
         for (buyer_id, seller_id), count in edge_counts.items():
-            self.graph.add_edge(
-                buyer_id, seller_id,
-                type='TRANSACTED_WITH',
-                weight=count
-            )
+            if self.graph.has_edge(buyer_id, seller_id):
+                self.graph[buyer_id][seller_id]['weight'] += count
+            else:
+                self.graph.add_edge(
+                    buyer_id, seller_id,
+                    type='TRANSACTED_WITH',
+                    weight=count
+                )
             self.graph.nodes[buyer_id]['type'] = 'Buyer'
             self.graph.nodes[seller_id]['type'] = 'Seller'
-        
-        print(f"  Graph built: {self.graph.number_of_nodes()} nodes, {self.graph.number_of_edges()} edges.")
 
-    def find_fraud_rings(self):
+    def _mark_dirty(self, edge_counts: dict):
+        """Sellers whose signals change: the ones touched and co-sellers of touched buyers."""
+        if self.index.version == 0 and not self.index.building:
+            return  # nothing indexed yet; the first build covers everything
+        sellers = {seller_id for _, seller_id in edge_counts}
+        for buyer_id in {buyer_id for buyer_id, _ in edge_counts}:
+            sellers.update(self.graph.successors(buyer_id))
+        if self.shard is not None:
+            sellers = {s for s in sellers if self.shard.owns(s)}
+        self.index.mark_dirty(sellers)
+
+    def _record_pushed(self, rows: list) -> list:
+        """Drop pushed rows whose id was already pushed; remember the rest (bounded)."""
+        fresh = []
+        for row in rows:
+            event_id = row.get('id')
+            if event_id is not None:
+                if event_id in self._pushed_ids:
+                    continue
+                self._pushed_ids[event_id] = True
+                if len(self._pushed_ids) > PUSHED_IDS_MAX:
+                    self._pushed_ids.popitem(last=False)
+            fresh.append(row)
+        return fresh
+
+    def _advance_watermark(self, rows: list):
+        """Move the watermark to the newest row, comparing timestamps as UTC instants."""
+        current = utc_instant(self.watermark)
+        for row in rows:
+            instant = utc_instant(row.get('timestamp'))
+            if instant is None:
+                continue
+            if current is None or instant > current:
+                current = instant
+                self.watermark = instant.isoformat()
+                self._watermark_ids = set()
+            if instant == current and row.get('id'):
+                self._watermark_ids.add(row['id'])
+
+    def load_delta(self) -> int:
         """
-        Detect simple cycles or dense subgraphs indicating collusion.
+        Fetch only transactions at or after the watermark from Supabase and apply
+        them. Rows already applied at the watermark timestamp are skipped.
+        Returns the number of new transactions applied; raises SupabaseError
+        (applying nothing) if a page fails.
         """
-        try:
-            undirected = self.graph.to_undirected()
-            communities = list(nx.community.louvain_communities(undirected))
-            suspicious_communities = [list(c) for c in communities if 3 <= len(c) <= 10]
-            return suspicious_communities[:5]
-        except Exception as e:
-            print(f"Error in fraud ring detection: {e}")
-            return []
+        params = {"select": "id,buyer_id,seller_id,timestamp", "order": "timestamp.asc,id.asc"}
+        if self.watermark:
+            params["timestamp"] = f"gte.{self.watermark}"
+        with metrics.timer("trustra_stage_seconds", stage="graph_delta"):
+            rows = self.supabase.query_all("transactions", params, page_size=1000)
+            current, seen = utc_instant(self.watermark), self._watermark_ids
+            new_rows = [r for r in rows
+                        if not (r.get('id') in seen and utc_instant(r.get('timestamp')) == current)]
+            with self._lock:
+                # Already applied when pushed; still moves the watermark past them
+                pushed = [r for r in new_rows if r.get('id') in self._pushed_ids]
+                if pushed:
+                    for r in pushed:
+                        self._pushed_ids.pop(r['id'], None)
+                    self._advance_watermark(pushed)
+                    pushed_ids = {r['id'] for r in pushed}
+                    new_rows = [r for r in new_rows if r.get('id') not in pushed_ids]
+            if new_rows:
+                self.add_edges(new_rows)
+        metrics.inc("trustra_graph_delta_rows_total", len(new_rows))
+        return len(new_rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nodes": self.graph.number_of_nodes(),
+                "edges": self.graph.number_of_edges(),
+                "watermark": self.watermark,
+                "backend": self.backend,
+                "index": self.index.stats(),
+                "sketches": self.sketches.stats(),
+                "sketch_only": self.sketch_only,
+                "shard": self.shard.describe() if self.shard is not None else None,
+            }
 
     def get_centrality_score(self, seller_id):
         """
@@ -129,7 +399,209 @@ class GraphEngine:
         """
         try:
             if self.graph.has_node(seller_id):
+                if self.backend == "csr":
+                    return self.graph.clustering(seller_id)
                 return nx.clustering(self.graph, seller_id)
             return 0.0
         except Exception:
             return 0.0
+
+    def seller_ids(self) -> list:
+        """Sellers served by this instance (only owned ones when sharded, not the halo)."""
+        with self._lock:
+            if self.backend == "csr":
+                sellers = self.graph.sellers()
+            else:
+                sellers = [n for n, d in self.graph.nodes(data=True) if d.get('type') == 'Seller']
+        if self.shard is not None:
+            return [s for s in sellers if self.shard.owns(s)]
+        return sellers
+
+    def owns(self, seller_id) -> bool:
+        return self.shard is None or self.shard.owns(seller_id)
+
+    def _nx_seller_stats(self, seller_id):
+        buyers = list(self.graph.predecessors(seller_id))
+        weighted = sum(self.graph[b][seller_id]['weight'] for b in buyers)
+        overlap = {}
+        for buyer_id in buyers:
+            for other in self.graph.successors(buyer_id):
+                if other != seller_id:
+                    overlap[other] = overlap.get(other, 0) + 1
+        top = max(overlap, key=overlap.get) if overlap else None
+        return {
+            "in_degree": len(buyers),
+            "weighted_in_degree": weighted,
+            "shared_buyers": overlap.get(top, 0),
+            "top_overlap_seller": top,
+        }
+
+    def compute_seller_signals(self, seller_id) -> dict:
+        """
+        Centrality, weighted degree, clustering and buyer-overlap collusion score
+        for one seller. The collusion score is the share of the seller's buyers who
+        also bought from the single most-overlapping other seller.
+        """
+        with self._lock:
+            if not self.graph.has_node(seller_id):
+                stats = {"in_degree": 0, "weighted_in_degree": 0, "shared_buyers": 0, "top_overlap_seller": None}
+            elif self.backend == "csr":
+                stats = self.graph.seller_stats(seller_id)
+            else:
+                stats = self._nx_seller_stats(seller_id)
+            clustering = self.detect_collusion(seller_id)
+        return self._signals(stats, clustering)
+
+    @staticmethod
+    def _signals(stats, clustering) -> dict:
+        shared = stats["shared_buyers"]
+        collusion = shared / stats["in_degree"] if shared >= COLLUSION_MIN_SHARED_BUYERS else 0.0
+        return {
+            "centrality": stats["in_degree"],
+            "weighted_degree": stats["weighted_in_degree"],
+            "clustering_coefficient": float(clustering),
+            "collusion_score": round(collusion, 4),
+            "shared_buyers": shared,
+            "top_overlap_seller": stats["top_overlap_seller"],
+        }
+
+    def _nx_seller_stats_many(self, seller_ids):
+        """_nx_seller_stats for many sellers, listing each shared buyer's sellers once."""
+        successors = {}
+        stats = {}
+        for seller_id in seller_ids:
+            buyers = list(self.graph.predecessors(seller_id))
+            overlap = {}
+            for buyer_id in buyers:
+                others = successors.get(buyer_id)
+                if others is None:
+                    others = successors[buyer_id] = list(self.graph.successors(buyer_id))
+                for other in others:
+                    if other != seller_id:
+                        overlap[other] = overlap.get(other, 0) + 1
+            top = max(overlap, key=overlap.get) if overlap else None
+            stats[seller_id] = {
+                "in_degree": len(buyers),
+                "weighted_in_degree": sum(self.graph[b][seller_id]['weight'] for b in buyers),
+                "shared_buyers": overlap.get(top, 0),
+                "top_overlap_seller": top,
+            }
+        return stats
+
+    def compute_seller_signals_many(self, seller_ids) -> dict:
+        """
+        compute_seller_signals for many sellers together: buyers shared between
+        them have their seller lists read once, and clustering runs as one pass.
+        """
+        empty = {"in_degree": 0, "weighted_in_degree": 0, "shared_buyers": 0, "top_overlap_seller": None}
+        with metrics.timer("trustra_stage_seconds", stage="batch_signals"), self._lock:
+            present = [s for s in dict.fromkeys(seller_ids) if self.graph.has_node(s)]
+            if self.backend == "csr":
+                stats = self.graph.seller_stats_many(present)
+                clustering = self.graph.clustering_many(present)
+            else:
+                stats = self._nx_seller_stats_many(present)
+                clustering = nx.clustering(self.graph, present) if present else {}
+        return {s: self._signals(stats.get(s, empty), clustering.get(s, 0.0)) for s in seller_ids}
+
+    def get_seller_signals_many(self, seller_ids) -> dict:
+        """Indexed signals for many sellers; misses (unknown or dirty) are computed in one batch."""
+        signals = {}
+        missing = []
+        generation = self.index.generation()
+        for seller_id in dict.fromkeys(seller_ids):
+            cached = self.index.get(seller_id)
+            if cached is None:
+                missing.append(seller_id)
+            else:
+                signals[seller_id] = cached
+        if missing:
+            computed = self.compute_seller_signals_many(missing)
+            for seller_id, value in computed.items():
+                if self.graph.has_node(seller_id):
+                    self.index.put(seller_id, value, generation)
+            signals.update(computed)
+        return signals
+
+    def get_seller_signals(self, seller_id) -> dict:
+        """Indexed signals for a seller, computed (and cached) on demand if missing or dirty."""
+        generation = self.index.generation()
+        signals = self.index.get(seller_id)
+        if signals is None:
+            signals = self.compute_seller_signals(seller_id)
+            if self.graph.has_node(seller_id):
+                self.index.put(seller_id, signals, generation)
+        return signals
+
+    def build_index(self) -> int:
+        """Compute signals for every seller (run in the background)."""
+        with metrics.timer("trustra_stage_seconds", stage="index_build"):
+            count = self.index.rebuild(self.compute_seller_signals, self.seller_ids())
+        print(f"  Seller index built: {count} sellers (version {self.index.version})")
+        return count
+
+    def refresh_index(self) -> int:
+        """Recompute sellers whose edges changed since the last build/refresh."""
+        with metrics.timer("trustra_stage_seconds", stage="index_refresh"):
+            return self.index.refresh(self.compute_seller_signals)
+
+    def edge_arrays(self):
+        """
+        Snapshot the graph as int arrays: (names, is_seller, u, v, w) where
+        u -> v are edges with weight w and names maps int id -> node id.
+        """
+        with self._lock:
+            if self.backend == "csr":
+                g = self.graph
+                g.compact()
+                n = g.number_of_nodes()
+                u = np.repeat(np.arange(n, dtype=np.int64), np.diff(g.indptr))
+                return (list(g._names), g._types[:n] == 2, u,
+                        g.indices.astype(np.int64), g.weights.astype(np.int64))
+            names = list(self.graph.nodes)
+            ids = {name: i for i, name in enumerate(names)}
+            is_seller = np.array([d.get('type') == 'Seller' for _, d in self.graph.nodes(data=True)], dtype=bool)
+            edges = self.graph.edges(data='weight', default=1)
+            m = self.graph.number_of_edges()
+            u = np.fromiter((ids[a] for a, _, _ in edges), dtype=np.int64, count=m)
+            v = np.fromiter((ids[b] for _, b, _ in edges), dtype=np.int64, count=m)
+            w = np.fromiter((wt for _, _, wt in edges), dtype=np.int64, count=m)
+            return names, is_seller, u, v, w
+
+    def detect_communities(self, algorithm="louvain", min_size=3, max_size=50):
+        """
+        Run community detection over a snapshot of the graph and cache the scored
+        communities (sizes min_size..max_size). Meant for a background job.
+        Returns None without running when another detection is in progress.
+        """
+        if algorithm not in community_detector.ALGORITHMS:
+            raise ValueError(f"Unknown community algorithm: {algorithm}")
+        if not self.communities.try_start():
+            return None
+        try:
+            start = time.perf_counter()
+            graph_version = self.graph_version
+            names, is_seller, u, v, w = self.edge_arrays()
+            if algorithm == "label_propagation":
+                labels = community_detector.label_propagation(len(names), u, v, w, is_seller)
+            else:
+                labels = community_detector.louvain(len(names), u, v, w)
+            communities = community_detector.score_communities(
+                labels, u, v, w, is_seller, names, min_size=min_size, max_size=max_size
+            )
+            if self.shard is not None:
+                # Report rings that include an owned seller; the router merges shards
+                owned = set(self.seller_ids())
+                communities = [c for c in communities if any(m in owned for m in c["members"])]
+            duration_ms = (time.perf_counter() - start) * 1000
+            metrics.observe("trustra_stage_seconds", duration_ms / 1000, stage="community_detection", algorithm=algorithm)
+            self.communities.store({
+                "algorithm": algorithm,
+                "graph_version": graph_version,
+                "duration_ms": round(duration_ms, 1),
+                "communities": communities,
+            })
+            print(f"  Communities ({algorithm}): {len(communities)} candidates in {duration_ms:.0f} ms")
+            return communities
+        finally:
+            self.communities.finish()
@@ -0,0 +1,203 @@
+"""
+TRUSTRA - Graph snapshots for warm restarts
+Writes the built graph (CSR arrays), the seller signal index and the latest
+community detection result to local files. A restart memory-maps them and
+only catches up on transactions after the snapshot's watermark instead of
+paging the whole table from Supabase.
+
+Layout:
+  <path>/CURRENT              name of the live snapshot directory (swapped atomically)
+  <path>/<id>/meta.json       watermark, graph version, shard, source, counts
+  <path>/<id>/names.bin       node ids, newline separated
+  <path>/<id>/<array>.npy     CSR arrays and node types
+  <path>/<id>/index_*.npy     seller signals, row i for the i-th line of index_sellers.bin
+  <path>/<id>/index_dirty.bin sellers whose signals predate the snapshot's edges
+  <path>/<id>/communities.json
+  <path>/<id>/sketch_*        buyer sketches (buyer_sketch.py), row i for the i-th line of sketch_sellers.bin
+"""
+import json
+import os
+import shutil
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from csr_graph import CSRGraph, SNAPSHOT_ARRAYS
+
+SNAPSHOT_FORMAT = 2
+INDEX_INT_FIELDS = ("centrality", "weighted_degree", "shared_buyers")
+INDEX_FLOAT_FIELDS = ("clustering_coefficient", "collusion_score")
+
+def _write_names(path, names):
+    with open(path, "wb") as f:
+        f.write("\n".join(names).encode("utf-8"))
+
+def _read_names(path):
+    with open(path, "rb") as f:
+        data = f.read().decode("utf-8")
+    return data.split("\n") if data else []
+
+def current(path):
+    """Directory of the live snapshot under path, or None."""
+    try:
+        with open(os.path.join(path, "CURRENT")) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    snapshot_dir = os.path.join(path, name)
+    return snapshot_dir if os.path.exists(os.path.join(snapshot_dir, "meta.json")) else None
+
+def read_meta(path):
+    snapshot_dir = current(path)
+    if snapshot_dir is None:
+        return None
+    with open(os.path.join(snapshot_dir, "meta.json")) as f:
+        return json.load(f)
+
+def save(engine, path):
+    """
+    Snapshot the engine. Arrays are copied under the graph lock and written
+    outside it; the new directory only becomes live once complete.
+    """
+    start = time.perf_counter()
+    with engine._lock:
+        if engine.backend == "csr":
+            names, arrays = engine.graph.snapshot_arrays()
+        else:
+            names, is_seller, u, v, w = engine.edge_arrays()
+            types = np.where(is_seller, 2, 1)
+            names, arrays = CSRGraph.from_edges(names, types, u, v, w).snapshot_arrays()
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": time.time(),
+            "backend": engine.backend,
+            "graph_version": engine.graph_version,
+            "watermark": engine.watermark,
+            "watermark_ids": sorted(engine._watermark_ids),
+            "pushed_ids": list(engine._pushed_ids),
+            "source": engine.source,
+            "source_mtimes": engine.source_mtimes,
+            "shard": engine.shard.describe() if engine.shard is not None else None,
+            "sketches": engine.sketches.config(),
+            "sketch_only": engine.sketch_only,
+            "nodes": len(names),
+            "edges": int(len(arrays["indices"])),
+        }
+        # Taken with the graph so both match the watermark
+        sketch_sellers, sketch_arrays, sketch_top = engine.sketches.snapshot()
+        # Sellers whose entries predate edges in this graph stay dirty after a restore
+        index_entries, index_dirty = engine.index.snapshot()
+    meta["index_version"] = engine.index.version
+    communities = engine.communities.get()
+
+    os.makedirs(path, exist_ok=True)
+    snapshot_id = f"snapshot-{int(meta['created_at'] * 1000)}"
+    snapshot_dir = os.path.join(path, snapshot_id)
+    os.makedirs(snapshot_dir)
+    _write_names(os.path.join(snapshot_dir, "names.bin"), names)
+    for name, array in arrays.items():
+        np.save(os.path.join(snapshot_dir, f"{name}.npy"), array)
+
+    sellers = list(index_entries)
+    signals = [index_entries[s] for s in sellers]
+    _write_names(os.path.join(snapshot_dir, "index_sellers.bin"), sellers)
+    _write_names(os.path.join(snapshot_dir, "index_dirty.bin"), index_dirty)
+    _write_names(os.path.join(snapshot_dir, "index_top_overlap.bin"),
+                 [s["top_overlap_seller"] or "" for s in signals])
+    for field in INDEX_INT_FIELDS:
+        np.save(os.path.join(snapshot_dir, f"index_{field}.npy"), np.array([s[field] for s in signals], dtype=np.int64))
+    for field in INDEX_FLOAT_FIELDS:
+        np.save(os.path.join(snapshot_dir, f"index_{field}.npy"), np.array([s[field] for s in signals], dtype=np.float64))
+    with open(os.path.join(snapshot_dir, "communities.json"), "w") as f:
+        json.dump(communities, f)
+    _write_names(os.path.join(snapshot_dir, "sketch_sellers.bin"), sketch_sellers)
+    for name, array in sketch_arrays.items():
+        np.save(os.path.join(snapshot_dir, f"sketch_{name}.npy"), array)
+    with open(os.path.join(snapshot_dir, "sketch_top.json"), "w") as f:
+        json.dump(sketch_top, f)
+    with open(os.path.join(snapshot_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Switch CURRENT atomically, then drop older snapshots (open mmaps keep their inodes)
+    tmp = os.path.join(path, "CURRENT.tmp")
+    with open(tmp, "w") as f:
+        f.write(snapshot_id)
+    os.replace(tmp, os.path.join(path, "CURRENT"))
+    for entry in os.listdir(path):
+        if entry.startswith("snapshot-") and entry != snapshot_id:
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    meta["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"  Graph snapshot written: {meta['nodes']} nodes, {meta['edges']} edges, "
+          f"{len(sellers)} indexed sellers in {meta['seconds']}s -> {snapshot_dir}")
+    return meta
+
+def load(engine, path):
+    """
+    Restore the engine from the live snapshot. Returns its meta, or None when
+    there is no usable snapshot (missing, other format, shard or sketch settings,
+    or offline source files changed since it was taken).
+    """
+    start = time.perf_counter()
+    meta = read_meta(path)
+    if meta is None:
+        return None
+    shard = engine.shard.describe() if engine.shard is not None else None
+    if (meta["format"] != SNAPSHOT_FORMAT or meta["shard"] != shard
+            or meta["sketches"] != engine.sketches.config() or meta["sketch_only"] != engine.sketch_only):
+        print(f"  Graph snapshot at {path} does not match this instance; ignoring it")
+        return None
+    if meta["source"] != "supabase" and meta["source_mtimes"] != engine.offline_source_mtimes():
+        print("  Graph snapshot is older than the local data files; ignoring it")
+        return None
+
+    snapshot_dir = current(path)
+    names = _read_names(os.path.join(snapshot_dir, "names.bin"))
+    arrays = {name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="c")
+              for name in SNAPSHOT_ARRAYS + ("types",)}
+    graph = CSRGraph.from_arrays(names, arrays)
+    if engine.backend != "csr":
+        graph = graph.to_digraph()
+
+    sellers = _read_names(os.path.join(snapshot_dir, "index_sellers.bin"))
+    dirty_path = os.path.join(snapshot_dir, "index_dirty.bin")
+    dirty = _read_names(dirty_path) if os.path.exists(dirty_path) else []
+    top = _read_names(os.path.join(snapshot_dir, "index_top_overlap.bin"))
+    columns = {field: np.load(os.path.join(snapshot_dir, f"index_{field}.npy")).tolist()
+               for field in INDEX_INT_FIELDS + INDEX_FLOAT_FIELDS}
+    entries = {}
+    for i, seller_id in enumerate(sellers):
+        entries[seller_id] = {
+            "centrality": columns["centrality"][i],
+            "weighted_degree": columns["weighted_degree"][i],
+            "clustering_coefficient": columns["clustering_coefficient"][i],
+            "collusion_score": columns["collusion_score"][i],
+            "shared_buyers": columns["shared_buyers"][i],
+            "top_overlap_seller": top[i] or None,
+        }
+    with open(os.path.join(snapshot_dir, "communities.json")) as f:
+        communities = json.load(f)
+    sketch_sellers = _read_names(os.path.join(snapshot_dir, "sketch_sellers.bin"))
+    sketch_arrays = {name: np.load(os.path.join(snapshot_dir, f"sketch_{name}.npy"))
+                     for name in ("registers", "transactions", "counts", "total")}
+    with open(os.path.join(snapshot_dir, "sketch_top.json")) as f:
+        sketch_top = json.load(f)
+
+    with engine._lock:
+        engine.graph = graph
+        engine.graph_version = meta["graph_version"]
+        engine.watermark = meta["watermark"]
+        engine._watermark_ids = set(meta["watermark_ids"])
+        engine._pushed_ids = OrderedDict.fromkeys(meta.get("pushed_ids", []), True)
+        engine.source = meta["source"]
+        engine.source_mtimes = meta["source_mtimes"]
+        if engine.shard is not None:
+            engine._shard_buyers = {b for s in engine.seller_ids() for b in graph.predecessors(s)}
+        engine.sketches.restore(sketch_sellers, sketch_arrays, sketch_top)
+    engine.index.restore(entries, meta["index_version"], dirty)
+    if communities is not None:
+        engine.communities.restore(communities)
+    meta["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"  Graph snapshot loaded: {meta['nodes']} nodes, {meta['edges']} edges, "
+          f"watermark {meta['watermark']} in {meta['seconds']}s")
+    return meta
@@ -1,6 +1,20 @@
-from fastapi import FastAPI
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
+import os
+import sys
+import threading
+import time
+from api_models import EdgeBatch, SellerBatch
 from graph_engine import GraphEngine
+from sharding import ShardSpec
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.supabase_client import SupabaseError
+from shared.metrics import MetricsMiddleware, register_upstream_gauges, registry as metrics
+from shared.profiler import register_routes as register_profiler_routes
 
 app = FastAPI(title="TRUSTRA Graph Service (No-Docker)")
 
@@ -11,27 +25,318 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Graph Engine (only this shard's sellers when SHARD_COUNT > 1); data loads in the background at startup.
+# GRAPH_SKETCH_ONLY=1 keeps only the fixed-memory buyer sketches and serves /graph/{seller_id}/buyers
+DATA_PATH = os.environ.get("DATA_PATH", "../data-simulation")
+graph_engine = GraphEngine(DATA_PATH, shard=ShardSpec.from_env(), autoload=False)
+
+# Warm restarts: restore the last snapshot and catch up on newer transactions ("" disables)
+_shard = graph_engine.shard
+GRAPH_SNAPSHOT_PATH = os.environ.get("GRAPH_SNAPSHOT_PATH", os.path.join(
+    DATA_PATH, "graph-snapshot" + (f"-shard{_shard.index}of{_shard.count}" if _shard else "")))
+# Also snapshot every N seconds when the graph changed (0: only after a cold load and at shutdown)
+GRAPH_SNAPSHOT_SECONDS = float(os.environ.get("GRAPH_SNAPSHOT_SECONDS", "0"))
+
+# Poll Supabase for new transactions every N seconds (0 disables)
+GRAPH_REFRESH_SECONDS = float(os.environ.get("GRAPH_REFRESH_SECONDS", "0"))
+
+# Background fraud-ring detection: "louvain", or "label_propagation" for large graphs
+COMMUNITY_ALGORITHM = os.environ.get("COMMUNITY_ALGORITHM", "louvain")
+COMMUNITY_REFRESH_SECONDS = float(os.environ.get("COMMUNITY_REFRESH_SECONDS", "300"))
+# Largest community kept in the cache; requests filter within this
+COMMUNITY_MAX_SIZE = int(os.environ.get("COMMUNITY_MAX_SIZE", "50"))
+
+# Most sellers accepted by one POST /graph/batch
+GRAPH_BATCH_MAX = int(os.environ.get("GRAPH_BATCH_MAX", "5000"))
+
+# Liveness is the process answering; readiness is the graph being loaded and indexed
+startup_state = {"phase": "starting", "started_at": time.time(), "ready_at": None, "source": None, "error": None}
+snapshot_state = {"graph_version": None, "communities_version": None, "last": None}
+# One writer at a time: save() clears every other snapshot directory, so the loop,
+# POST /graph/snapshot, the save after warm-up and the shutdown save must not overlap
+snapshot_lock = threading.Lock()
+
+def is_ready():
+    return startup_state["phase"] == "ready"
+
+def require_ready():
+    if not is_ready():
+        raise HTTPException(status_code=503, detail=f"Graph not ready ({startup_state['phase']})")
+
+def require_graph():
+    require_ready()
+    if graph_engine.sketch_only:
+        raise HTTPException(status_code=503, detail="Graph disabled (GRAPH_SKETCH_ONLY=1); "
+                                                    "buyer signals are at /graph/{seller_id}/buyers")
+
+def snapshot_if_changed():
+    """Write a snapshot when the graph or communities moved on since the last one."""
+    if not GRAPH_SNAPSHOT_PATH or not is_ready():
+        return None
+    with snapshot_lock:
+        return _snapshot_if_changed()
+
+def _snapshot_if_changed():
+    result = graph_engine.communities.get()
+    current = (graph_engine.graph_version, result["version"] if result else None)
+    if current == (snapshot_state["graph_version"], snapshot_state["communities_version"]):
+        return None
+    try:
+        meta = graph_engine.save_snapshot(GRAPH_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"Graph snapshot error: {e}")
+        return None
+    snapshot_state.update(graph_version=current[0], communities_version=current[1], last=meta)
+    return meta
+
+async def refresh_loop():
+    while True:
+        await asyncio.sleep(GRAPH_REFRESH_SECONDS)
+        if not is_ready():
+            continue
+        try:
+            applied = await run_in_threadpool(graph_engine.load_delta)
+            if applied:
+                print(f"Graph refresh: applied {applied} new transactions")
+                await run_in_threadpool(graph_engine.refresh_index)
+        except Exception as e:
+            print(f"Graph refresh error: {e}")
+
+def run_community_detection():
+    # detect_communities skips the run when another one holds the cache's run lock
+    if graph_engine.sketch_only:
+        return
+    try:
+        graph_engine.detect_communities(COMMUNITY_ALGORITHM, max_size=COMMUNITY_MAX_SIZE)
+    except Exception as e:
+        print(f"Error in fraud ring detection: {e}")
+
+async def community_loop():
+    while True:
+        await asyncio.sleep(COMMUNITY_REFRESH_SECONDS)
+        if not is_ready():
+            continue
+        result = graph_engine.communities.get()
+        if result is None or result["graph_version"] != graph_engine.graph_version:
+            await run_in_threadpool(run_community_detection)
+
+async def snapshot_loop():
+    while True:
+        await asyncio.sleep(GRAPH_SNAPSHOT_SECONDS)
+        await run_in_threadpool(snapshot_if_changed)
+
+def warm_up():
+    """
+    Restore the snapshot and apply newer transactions, or load everything when
+    there is none, then index. Fraud rings are computed after the service is ready.
+    """
+    start = time.perf_counter()
+    try:
+        startup_state["phase"] = "loading_snapshot"
+        meta = graph_engine.load_snapshot(GRAPH_SNAPSHOT_PATH) if GRAPH_SNAPSHOT_PATH else None
+        if meta is not None:
+            snapshot_state.update(graph_version=meta["graph_version"], last=meta,
+                                  communities_version=(graph_engine.communities.get() or {}).get("version"))
+            if meta["source"] == "supabase":
+                startup_state["phase"] = "catching_up"
+                try:
+                    startup_state["delta_rows"] = graph_engine.load_delta()
+                except SupabaseError as e:
+                    # Serve the snapshot; the refresh loop catches up from the same watermark
+                    print(f"Graph catch-up failed: {e}")
+            graph_engine.refresh_index()
+            startup_state["source"] = f"snapshot+{meta['source']}"
+        else:
+            startup_state["phase"] = "loading"
+            graph_engine.load_data()
+            startup_state["phase"] = "indexing"
+            graph_engine.build_index()
+            startup_state["source"] = graph_engine.source
+        startup_state.update(phase="ready", ready_at=time.time(), load_seconds=round(time.perf_counter() - start, 2))
+        print(f"Graph service ready in {startup_state['load_seconds']}s (source: {startup_state['source']})")
+    except Exception as e:
+        startup_state.update(phase="failed", error=str(e))
+        print(f"Graph startup failed: {e}")
+        return
+    result = graph_engine.communities.get()
+    if result is None or result["graph_version"] != graph_engine.graph_version:
+        run_community_detection()
+    snapshot_if_changed()
+
+@app.on_event("startup")
+async def start_refresh():
+    # Load, index and detect fraud rings without blocking startup; /health/ready reports progress
+    threading.Thread(target=warm_up, daemon=True).start()
+    if GRAPH_REFRESH_SECONDS > 0:
+        asyncio.create_task(refresh_loop())
+    if COMMUNITY_REFRESH_SECONDS > 0:
+        asyncio.create_task(community_loop())
+    if GRAPH_SNAPSHOT_PATH and GRAPH_SNAPSHOT_SECONDS > 0:
+        asyncio.create_task(snapshot_loop())
+
+@app.on_event("shutdown")
+async def save_snapshot_on_shutdown():
+    await run_in_threadpool(snapshot_if_changed)
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    state = {**startup_state, "graph": graph_engine.stats() if is_ready() else None,
+             "sketches_loaded": graph_engine.sketches.loaded, "snapshot": snapshot_state["last"]}
+    if not is_ready():
+        return JSONResponse(status_code=503, content=state)
+    return state
 
-# Initialize Graph Engine and load CSV data
-graph_engine = GraphEngine()
+@app.post("/graph/snapshot")
+def write_snapshot():
+    """Write a snapshot now (skipped when nothing changed since the last one)."""
+    require_ready()
+    meta = snapshot_if_changed()
+    return {"written": meta is not None, "snapshot": snapshot_state["last"]}
 
 @app.get("/")
 def read_root():
-    return {"message": "TRUSTRA Graph Service Running (In-Memory NetworkX)"}
+    backend = "CSR" if graph_engine.backend == "csr" else "NetworkX"
+    return {"message": f"TRUSTRA Graph Service Running (In-Memory {backend})"}
 
-@app.get("/graph/{seller_id}")
-def get_graph(seller_id: str):
-    centrality = graph_engine.get_centrality_score(seller_id)
-    collusion_score = graph_engine.detect_collusion(seller_id)
+@app.post("/graph/edges")
+def ingest_edges(batch: EdgeBatch, background_tasks: BackgroundTasks):
+    """Apply a batch of buyer -> seller transaction events without a reload."""
+    require_ready()
+    if graph_engine.source == "supabase" and any(e.id is None for e in batch.edges):
+        raise HTTPException(status_code=422, detail="Edge events need an id when deltas are pulled from Supabase")
+    touched = graph_engine.add_edges([e.model_dump() for e in batch.edges], pushed=True)
+    background_tasks.add_task(graph_engine.refresh_index)
+    return {"applied": len(batch.edges), "edges_touched": touched, **graph_engine.stats()}
+
+@app.post("/graph/refresh")
+def refresh_graph():
+    """Pull transactions newer than the watermark from Supabase."""
+    require_ready()
+    try:
+        applied = graph_engine.load_delta()
+    except SupabaseError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    graph_engine.refresh_index()
+    return {"applied": applied, **graph_engine.stats()}
+
+@app.get("/graph/stats")
+def graph_stats():
+    return graph_engine.stats()
+
+def graph_response(seller_id, signals):
+    high_risk = signals["clustering_coefficient"] > 0.5 or signals["collusion_score"] > 0.5
     
     return {
         "seller_id": seller_id,
-        "centrality": centrality,
-        "clustering_coefficient": collusion_score,
-        "fraud_risk": "High" if collusion_score > 0.5 else "Low"
+        **signals,
+        "fraud_risk": "High" if high_risk else "Low"
     }
 
+@app.post("/graph/batch")
+def get_graph_batch(batch: SellerBatch):
+    """
+    Graph signals for many sellers in one call, in request order. Indexed
+    sellers are served from the index; the rest are computed together.
+    """
+    require_graph()
+    if len(batch.seller_ids) > GRAPH_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {GRAPH_BATCH_MAX} sellers per batch")
+    not_owned = [s for s in dict.fromkeys(batch.seller_ids) if not graph_engine.owns(s)]
+    if not_owned:
+        raise HTTPException(status_code=421, detail={"not_owned": not_owned})
+    signals = graph_engine.get_seller_signals_many(batch.seller_ids)
+    return {
+        "count": len(batch.seller_ids),
+        "results": [graph_response(s, signals[s]) for s in batch.seller_ids],
+    }
+
+@app.get("/graph/{seller_id}")
+def get_graph(seller_id: str):
+    if not graph_engine.owns(seller_id):
+        # Sharded deployments route through router.py; a direct call hit the wrong shard
+        raise HTTPException(status_code=421, detail=f"Seller {seller_id} is not owned by this shard")
+    require_graph()
+    return graph_response(seller_id, graph_engine.get_seller_signals(seller_id))
+
+@app.get("/graph/{seller_id}/buyers")
+def get_buyer_signals(seller_id: str):
+    """
+    Distinct buyers and top repeat buyers from the fixed-memory sketches
+    (buyer_sketch.py). Served once transactions are loaded, before the graph
+    is built and indexed, and in sketch-only mode.
+    """
+    if not graph_engine.owns(seller_id):
+        raise HTTPException(status_code=421, detail=f"Seller {seller_id} is not owned by this shard")
+    if not graph_engine.sketches.loaded:
+        raise HTTPException(status_code=503, detail=f"Buyer sketches not loaded ({startup_state['phase']})")
+    return {"seller_id": seller_id, **graph_engine.get_buyer_signals(seller_id)}
+
 @app.get("/detect-collusion")
-def detect_collusion_endpoint():
-    rings = graph_engine.find_fraud_rings()
-    return {"suspicious_communities": rings}
+def detect_collusion_endpoint(background_tasks: BackgroundTasks, offset: int = 0, limit: int = 20,
+                              min_size: int = 3, max_size: int = 10, refresh: bool = False):
+    """
+    Suspicious communities from the latest background detection run, most
+    suspicious first. refresh=true schedules a new run; this call never waits on it.
+    """
+    if refresh:
+        background_tasks.add_task(run_community_detection)
+    result = graph_engine.communities.get()
+    if result is None:
+        return {"status": "pending", "total": 0, "communities": [], "suspicious_communities": []}
+
+    matches = [c for c in result["communities"] if min_size <= c["size"] <= max_size]
+    page = matches[offset : offset + limit]
+    return {
+        "status": "ready",
+        "version": result["version"],
+        "graph_version": result["graph_version"],
+        "stale": result["graph_version"] != graph_engine.graph_version,
+        "algorithm": result["algorithm"],
+        "computed_at": result["computed_at"],
+        "duration_ms": result["duration_ms"],
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+        "communities": page,
+        "suspicious_communities": [c["members"] for c in page],
+    }
+
+# --- Metrics and profiling ---
+
+def graph_sizes():
+    stats = graph_engine.stats()
+    return [({"kind": "nodes"}, stats["nodes"]), ({"kind": "edges"}, stats["edges"])]
+
+def community_stats():
+    result = graph_engine.communities.get()
+    return [
+        ({"field": "communities"}, len(result["communities"]) if result else 0),
+        ({"field": "last_duration_seconds"}, result["duration_ms"] / 1000 if result else 0),
+        ({"field": "stale"}, int(bool(result) and result["graph_version"] != graph_engine.graph_version)),
+        ({"field": "running"}, int(graph_engine.communities.running)),
+    ]
+
+register_upstream_gauges(metrics, {"sync": graph_engine.supabase})
+metrics.gauge("trustra_graph_size", graph_sizes, "Nodes and edges in the transaction graph.")
+metrics.gauge("trustra_graph_version", lambda: graph_engine.graph_version, "Bumped on every edge change.")
+metrics.gauge("trustra_seller_index", lambda: [
+    ({"field": k}, v) for k, v in graph_engine.index.stats().items() if k in ("sellers", "dirty", "version")
+], "Precomputed seller signals: entries, dirty sellers and build version.")
+metrics.gauge("trustra_communities", community_stats, "Latest background community detection run.")
+metrics.gauge("trustra_buyer_sketches", lambda: [
+    ({"field": k}, graph_engine.sketches.stats()[k]) for k in ("sellers", "transactions", "bytes")
+], "Buyer sketches: sellers tracked, transactions counted and fixed memory in bytes.")
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: request latency, per-stage timers, upstream timings, graph sizes, memory."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# GET /debug/profile (PROFILER_ENABLED=1)
+register_profiler_routes(app)
@@ -0,0 +1,177 @@
+"""
+TRUSTRA - Graph shard router
+Fronts sharded graph-service instances (SHARD_COUNT/SHARD_INDEX, see
+sharding.py) with the same API as a single instance:
+
+  /graph/{seller_id}  forwarded to the shard owning the seller's hash range
+                      (also /graph/{seller_id}/buyers)
+  /graph/batch        split by owning shard, shards queried concurrently
+  /graph/edges        broadcast; each shard keeps owned-seller and halo edges
+  /detect-collusion   fanned out, then rings reported by several shards merged
+
+Usage:
+    SHARD_URLS=http://127.0.0.1:8101,http://127.0.0.1:8102 python -m uvicorn router:app --port 8001
+    python run_sharded.py --shards 4     # local multi-process setup
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from api_models import EdgeBatch, SellerBatch
+from sharding import merge_communities, shard_for
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.metrics import MetricsMiddleware, registry as metrics
+
+app = FastAPI(title="TRUSTRA Graph Router")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(MetricsMiddleware)
+
+# Shard base URLs in shard-index order (shard i owns hash range i of len(SHARD_URLS))
+SHARD_URLS = [u.strip().rstrip("/") for u in os.environ.get("SHARD_URLS", "").split(",") if u.strip()]
+# Most sellers accepted by one POST /graph/batch (as on each shard)
+GRAPH_BATCH_MAX = int(os.environ.get("GRAPH_BATCH_MAX", "5000"))
+# Communities requested from each shard before merging
+COMMUNITY_FANOUT_LIMIT = int(os.environ.get("COMMUNITY_FANOUT_LIMIT", "1000"))
+
+shard_clients = [httpx.AsyncClient(base_url=url, timeout=30) for url in SHARD_URLS]
+
+async def forward(client, method, path, **kwargs):
+    """Call a shard and return its JSON, re-raising shard errors with their status."""
+    try:
+        resp = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Shard {client.base_url} unavailable: {e}")
+    if resp.status_code >= 400:
+        try:
+            detail = resp.json().get("detail", resp.text)
+        except ValueError:
+            detail = resp.text
+        raise HTTPException(status_code=resp.status_code, detail=detail)
+    return resp.json()
+
+async def fan_out(method, path, **kwargs):
+    """Same request to every shard; failures come back as exceptions, in shard order."""
+    return await asyncio.gather(*(forward(c, method, path, **kwargs) for c in shard_clients),
+                                return_exceptions=True)
+
+def require_shards():
+    if not shard_clients:
+        raise HTTPException(status_code=503, detail="No shards configured (set SHARD_URLS)")
+
+def error_of(result):
+    return result.detail if isinstance(result, HTTPException) else str(result)
+
+@app.on_event("shutdown")
+async def close_clients():
+    for client in shard_clients:
+        await client.aclose()
+
+@app.get("/")
+def read_root():
+    return {"message": f"TRUSTRA Graph Router ({len(shard_clients)} shards)"}
+
+@app.get("/graph/stats")
+async def graph_stats():
+    require_shards()
+    results = await fan_out("GET", "/graph/stats")
+    shards = [{"url": url, **r} if isinstance(r, dict) else {"url": url, "error": error_of(r)}
+              for url, r in zip(SHARD_URLS, results)]
+    healthy = [s for s in shards if "error" not in s]
+    return {
+        "shards": shards,
+        "healthy": len(healthy),
+        # Owned sellers are disjoint; nodes/edges include halo copies held by several shards
+        "sellers": sum(s["index"]["sellers"] for s in healthy),
+        "nodes_stored": sum(s["nodes"] for s in healthy),
+        "edges_stored": sum(s["edges"] for s in healthy),
+    }
+
+@app.post("/graph/edges")
+async def ingest_edges(batch: EdgeBatch):
+    """Broadcast the batch: the owner keeps the seller's edges, other shards their halo edges."""
+    require_shards()
+    results = await fan_out("POST", "/graph/edges", json=batch.model_dump(exclude_unset=True))
+    failed = [(url, error_of(r)) for url, r in zip(SHARD_URLS, results) if not isinstance(r, dict)]
+    if failed:
+        raise HTTPException(status_code=502, detail={"failed_shards": failed})
+    return {"applied": len(batch.edges), "edges_touched": sum(r["edges_touched"] for r in results)}
+
+@app.post("/graph/refresh")
+async def refresh_graph():
+    require_shards()
+    results = await fan_out("POST", "/graph/refresh")
+    return {"shards": [r if isinstance(r, dict) else {"error": error_of(r)} for r in results]}
+
+@app.post("/graph/batch")
+async def get_graph_batch(batch: SellerBatch):
+    """Split the sellers by owning shard, look them up concurrently and reassemble in request order."""
+    require_shards()
+    seller_ids = batch.seller_ids
+    if len(seller_ids) > GRAPH_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {GRAPH_BATCH_MAX} sellers per batch")
+    groups = {}
+    for seller_id in dict.fromkeys(seller_ids):
+        groups.setdefault(shard_for(seller_id, len(shard_clients)), []).append(seller_id)
+    responses = await asyncio.gather(*(forward(shard_clients[i], "POST", "/graph/batch", json={"seller_ids": ids})
+                                       for i, ids in groups.items()))
+    found = {r["seller_id"]: r for response in responses for r in response["results"]}
+    return {"count": len(seller_ids), "results": [found[s] for s in seller_ids]}
+
+@app.get("/graph/{seller_id}")
+async def get_graph(seller_id: str):
+    require_shards()
+    return await forward(shard_clients[shard_for(seller_id, len(shard_clients))], "GET", f"/graph/{seller_id}")
+
+@app.get("/graph/{seller_id}/buyers")
+async def get_buyer_signals(seller_id: str):
+    require_shards()
+    return await forward(shard_clients[shard_for(seller_id, len(shard_clients))], "GET", f"/graph/{seller_id}/buyers")
+
+@app.get("/detect-collusion")
+async def detect_collusion_endpoint(offset: int = 0, limit: int = 20, min_size: int = 3, max_size: int = 10,
+                                    refresh: bool = False):
+    """
+    Every shard detects communities on its owned sellers plus their buyers'
+    edges, so a ring spanning shards is seen whole by each shard owning one of
+    its sellers. Shard results are merged here (duplicates by member overlap)
+    and paginated. refresh=true asks every shard for a new background run.
+    """
+    require_shards()
+    params = {"limit": COMMUNITY_FANOUT_LIMIT, "min_size": min_size, "max_size": max_size,
+              "refresh": str(refresh).lower()}
+    results = await fan_out("GET", "/detect-collusion", params=params)
+    ready = [r for r in results if isinstance(r, dict) and r["status"] == "ready"]
+    shards = [
+        {"url": url, "error": error_of(r)} if not isinstance(r, dict) else
+        {"url": url, **{k: r.get(k) for k in ("status", "version", "graph_version", "stale", "duration_ms", "total")}}
+        for url, r in zip(SHARD_URLS, results)
+    ]
+    matches = merge_communities([r["communities"] for r in ready])
+    page = matches[offset : offset + limit]
+    return {
+        "status": "ready" if len(ready) == len(shard_clients) else ("partial" if ready else "pending"),
+        "stale": any(r["stale"] for r in ready),
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+        "communities": page,
+        "suspicious_communities": [c["members"] for c in page],
+        "shards": shards,
+    }
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,104 @@
+"""
+TRUSTRA - Local sharded graph-service
+Starts N graph-service shard processes plus the router, waits until every
+shard has built its seller index, and keeps them running until Ctrl-C.
+--check compares the router's answers with an unsharded in-process
+GraphEngine on the same data and exits.
+
+Usage:
+    python run_sharded.py --shards 4                    # router on :8001, shards on :8101..
+    python run_sharded.py --shards 3 --check 200 --data /tmp/trustra-1m
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def start(module, port, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=SERVICE_DIR, env={**os.environ, **env},
+    )
+
+def wait_ready(url, timeout):
+    """Poll a shard until it reports ready (graph loaded or restored, and indexed)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            resp = requests.get(f"{url}/health/ready", timeout=2)
+            if resp.status_code == 200:
+                return resp.json()["graph"]
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+def check(router_url, data_path, samples):
+    """Seller signals through the router must equal a single unsharded engine's."""
+    from graph_engine import GraphEngine
+    reference = GraphEngine(data_path)
+    sellers = reference.seller_ids()
+    mismatches = 0
+    for seller_id in random.Random(42).sample(sellers, min(samples, len(sellers))):
+        routed = requests.get(f"{router_url}/graph/{seller_id}", timeout=10).json()
+        expected = reference.compute_seller_signals(seller_id)
+        if any(routed[k] != v for k, v in expected.items() if k != "top_overlap_seller"):
+            mismatches += 1
+            print(f"  MISMATCH {seller_id}: {routed} != {expected}")
+    reference.detect_communities()
+    single = {frozenset(c["members"]) for c in reference.communities.get()["communities"] if c["size"] <= 10}
+    deadline = time.time() + 600
+    while True:
+        routed = requests.get(f"{router_url}/detect-collusion", params={"limit": 10000}, timeout=60).json()
+        if routed["status"] == "ready" or time.time() > deadline:
+            break
+        time.sleep(1)
+    found = {frozenset(c["members"]) for c in routed["communities"]}
+    print(f"  Signals: {mismatches} mismatches over {min(samples, len(sellers))} sellers")
+    print(f"  Communities: {len(found)} via router, {len(single)} unsharded, {len(found & single)} identical")
+    return mismatches == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Run graph-service as N seller shards behind a router")
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=8101)
+    parser.add_argument("--router-port", type=int, default=8001)
+    parser.add_argument("--data", default=os.environ.get("DATA_PATH", "../data-simulation"))
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--check", type=int, default=0, help="compare N sellers with an unsharded engine, then exit")
+    args = parser.parse_args()
+
+    urls = [f"http://127.0.0.1:{args.base_port + i}" for i in range(args.shards)]
+    procs = []
+    try:
+        for i, url in enumerate(urls):
+            procs.append(start("main", args.base_port + i, {
+                "SHARD_COUNT": str(args.shards), "SHARD_INDEX": str(i), "DATA_PATH": os.path.abspath(args.data),
+            }))
+        procs.append(start("router", args.router_port, {"SHARD_URLS": ",".join(urls)}))
+        for i, url in enumerate(urls):
+            stats = wait_ready(url, args.timeout)
+            print(f"Shard {i} ready at {url}: {stats['index']['sellers']} sellers, "
+                  f"{stats['nodes']} nodes, {stats['edges']} edges")
+        router_url = f"http://127.0.0.1:{args.router_port}"
+        print(f"Router at {router_url}")
+        if args.check:
+            sys.exit(0 if check(router_url, args.data, args.check) else 1)
+        while all(p.poll() is None for p in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import threading
+import time
+
+class SellerIndex:
+    """
+    Precomputed per-seller graph signals (centrality, weighted degree, clustering,
+    buyer-overlap collusion score) served in O(1).
+
+    A full build runs in the background; afterwards only sellers marked dirty by
+    edge changes are recomputed. Lookups of dirty or unknown sellers fall back to
+    computing on demand so answers are never stale. Every mark_dirty() bumps a
+    generation; a value computed from the graph as of generation() is only stored
+    by put() if its seller was not re-marked meanwhile, otherwise it stays dirty.
+    """
+
+    def __init__(self):
+        self.entries = {}       # seller_id -> signals dict
+        self._dirty = {}        # seller_id -> generation it was last marked at
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.version = 0
+        self.built_at = None
+        self.building = False
+
+    def get(self, seller_id):
+        with self._lock:
+            if seller_id in self._dirty:
+                return None
+            return self.entries.get(seller_id)
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, seller_id, signals, generation=None):
+        """Store signals computed as of generation(); False if the seller changed since."""
+        with self._lock:
+            if generation is not None and self._dirty.get(seller_id, -1) > generation:
+                return False
+            self.entries[seller_id] = signals
+            self._dirty.pop(seller_id, None)
+            return True
+
+    def mark_dirty(self, seller_ids):
+        with self._lock:
+            self._generation += 1
+            self._dirty.update(dict.fromkeys(seller_ids, self._generation))
+
+    def dirty(self):
+        with self._lock:
+            return set(self._dirty)
+
+    def rebuild(self, compute, seller_ids):
+        """Recompute every seller with compute(seller_id) and swap in the result."""
+        self.building = True
+        try:
+            with self._lock:
+                # Edges that change during the build re-mark their sellers
+                self._dirty.clear()
+            entries = {seller_id: compute(seller_id) for seller_id in seller_ids}
+            with self._lock:
+                dirty = self._dirty
+                self.entries = {k: v for k, v in entries.items() if k not in dirty}
+                self.version += 1
+                self.built_at = time.time()
+        finally:
+            self.building = False
+        return len(entries)
+
+    def refresh(self, compute):
+        """
+        Recompute only the dirty sellers. Sellers re-marked while being computed
+        stay dirty for the next refresh. Returns how many were updated.
+        """
+        generation = self.generation()
+        pending = self.dirty()
+        updated = sum(1 for seller_id in pending if self.put(seller_id, compute(seller_id), generation))
+        if updated:
+            with self._lock:
+                self.version += 1
+        return updated
+
+    def snapshot(self):
+        """(entries, dirty sellers) at one instant, for graph snapshots."""
+        with self._lock:
+            return dict(self.entries), sorted(self._dirty)
+
+    def restore(self, entries, version, dirty=()):
+        """Adopt entries loaded from a graph snapshot; dirty sellers are recomputed by the next refresh."""
+        with self._lock:
+            self.entries = entries
+            self._generation += 1
+            self._dirty = dict.fromkeys(dirty, self._generation)
+            self.version = max(version, 1)
+            self.built_at = time.time()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sellers": len(self.entries),
+                "dirty": len(self._dirty),
+                "version": self.version,
+                "built_at": self.built_at,
+                "building": self.building,
+            }
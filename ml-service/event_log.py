@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from lazy_modules import lazy_module
+
+pd = lazy_module("pandas")
+
+class EventLog:
+    """
+    Streamed transaction and review events that the source tables may not hold yet.
+
+    /events records each event here (and in the trust_events table, in database
+    mode) before it is applied. Every read of a seller's transactions and reviews
+    merges the logged events in, so /compute-trust, batch scoring and re-scores
+    start from the same inputs as the stream, also after a cached score expires
+    or the service restarts. An event is forgotten once the source tables hold
+    it: its row id is present or, for a status change, the transaction already
+    has the new status. Past max_events the oldest events are dropped.
+    """
+
+    def __init__(self, max_events=100000):
+        self.max_events = max_events
+        self._events = {}      # key -> event, oldest first
+        self._by_seller = {}   # seller_id -> {key: None}
+        self._lock = threading.Lock()
+        self.landed = 0
+        self.dropped = 0
+        self._last_received = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    @staticmethod
+    def key(event):
+        """The event's trust_events row id; a status change is keyed by its new status too."""
+        if event.get('previous_status'):
+            return f"{event['id']}:{event.get('status')}"
+        return event['id']
+
+    def prepare(self, event):
+        """
+        Stamp an incoming event with received_at (epoch seconds, increasing from
+        one event to the next), an id if it has none, and a review timestamp if
+        it has none.
+        """
+        with self._lock:
+            received_at = self._last_received = max(time.time(), self._last_received + 1e-6)
+        event = {**event, 'received_at': received_at}
+        if event.get('id') is None:
+            event['id'] = f"event-{uuid.uuid4()}"
+        if event['type'] == 'review' and event.get('timestamp') is None:
+            event['timestamp'] = datetime.fromtimestamp(received_at, timezone.utc).isoformat()
+        return event
+
+    def rows(self, events):
+        """trust_events rows for prepared events."""
+        return [{
+            "id": self.key(e),
+            "seller_id": e['seller_id'],
+            "event": e,
+            "received_at": datetime.fromtimestamp(e['received_at'], timezone.utc).isoformat(),
+        } for e in events]
+
+    def add(self, events):
+        """Log prepared events; one already logged (same key) is ignored."""
+        with self._lock:
+            for event in events:
+                key = self.key(event)
+                if key in self._events:
+                    continue
+                self._events[key] = event
+                self._by_seller.setdefault(event['seller_id'], {})[key] = None
+                while len(self._events) > self.max_events:
+                    self._remove(next(iter(self._events)))
+                    self.dropped += 1
+
+    def load(self, rows):
+        """Seed the log from stored trust_events rows (oldest first)."""
+        self.add([row['event'] for row in rows])
+
+    def _remove(self, key):
+        event = self._events.pop(key, None)
+        if event is None:
+            return
+        keys = self._by_seller.get(event['seller_id'])
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._by_seller[event['seller_id']]
+
+    def merge(self, transactions, reviews, seller_ids=None, until=None):
+        """
+        (transactions, reviews) with the logged events of seller_ids (every
+        seller if None) merged in: new rows are appended and status changes
+        applied to the transaction with the event's id. until (a received_at)
+        leaves out events received after it. Events the frames already hold
+        are forgotten. The input frames are not modified.
+        """
+        with self._lock:
+            if seller_ids is None:
+                events = list(self._events.values())
+            else:
+                events = [self._events[k] for s in seller_ids for k in self._by_seller.get(s, ())]
+        if until is not None:
+            events = [e for e in events if e['received_at'] <= until]
+        if not events:
+            return transactions, reviews
+
+        stored_status = self._stored(transactions, {e['id'] for e in events if e['type'] == 'transaction'}, 'status')
+        stored_reviews = self._stored(reviews, {e['id'] for e in events if e['type'] == 'review'}, 'id')
+        new_tx, new_reviews, changes, landed = [], [], {}, []
+        for e in events:
+            if e['type'] == 'review':
+                if e['id'] in stored_reviews:
+                    landed.append(e)
+                    continue
+                new_reviews.append({
+                    'id': e['id'], 'seller_id': e['seller_id'], 'rating': e.get('rating'), 'text': e.get('text'),
+                    'timestamp': e['timestamp'],
+                    'created_at': datetime.fromtimestamp(e['received_at'], timezone.utc).isoformat(),
+                })
+            elif e.get('previous_status'):
+                if stored_status.get(e['id']) == e.get('status'):
+                    landed.append(e)
+                    continue
+                changes[e['id']] = e.get('status')
+            else:
+                if e['id'] in stored_status:
+                    landed.append(e)
+                    continue
+                new_tx.append({'id': e['id'], 'seller_id': e['seller_id'], 'status': e.get('status'),
+                               'delivery_time_days': e.get('delivery_time_days')})
+
+        if landed:
+            with self._lock:
+                for e in landed:
+                    self._remove(self.key(e))
+                self.landed += len(landed)
+        if new_tx or changes:
+            transactions = _append(transactions, new_tx)
+            if changes and 'id' in transactions.columns:
+                ids = transactions['id'].astype(str)
+                changed = ids.isin(changes.keys())
+                transactions.loc[changed, 'status'] = ids[changed].map(changes)
+        if new_reviews:
+            reviews = _append(reviews, new_reviews)
+            # Offline frames have no insertion time; their rows fall back to the review timestamp
+            reviews['created_at'] = reviews['created_at'].fillna(reviews['timestamp'])
+        return transactions, reviews
+
+    @staticmethod
+    def _stored(frame, ids, column):
+        """{id: frame[column]} for the rows of frame whose id is in ids."""
+        if not ids or frame.empty or 'id' not in frame.columns:
+            return {}
+        rows = frame[frame['id'].astype(str).isin(ids)]
+        return dict(zip(rows['id'].astype(str), rows[column]))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "events": len(self._events),
+                "sellers": len(self._by_seller),
+                "landed": self.landed,
+                "dropped": self.dropped,
+            }
+
+def _append(frame, rows):
+    """A copy of frame with rows appended."""
+    if not rows:
+        return frame.copy()
+    extra = pd.DataFrame(rows)
+    return extra if frame.empty else pd.concat([frame, extra], ignore_index=True)
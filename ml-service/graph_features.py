@@ -0,0 +1,127 @@
+"""
+TRUSTRA - Graph features for combined scoring
+Supplies graph-service's per-seller signals (centrality, clustering, buyer-overlap
+collusion) to POST /compute-trust/combined.
+
+  GRAPH_MODE=local   a GraphEngine inside this process; it restores graph-service's
+                     snapshot (memory-mapped) when present, else builds from the data
+  GRAPH_MODE=remote  GET /graph/{id} on graph-service, concurrent with the ML fetch
+  GRAPH_MODE=off     no graph features
+"""
+import os
+import sys
+
+from fastapi.concurrency import run_in_threadpool
+
+from lazy_modules import load_module
+
+GRAPH_SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "graph-service")
+MODES = ("local", "remote", "off")
+
+def fraud_risk(signals) -> str:
+    """graph-service's rule for GET /graph/{id}."""
+    high_risk = signals["clustering_coefficient"] > 0.5 or signals["collusion_score"] > 0.5
+    return "High" if high_risk else "Low"
+
+class GraphFeatures:
+    def __init__(self, mode, data_path, snapshot_path=None, service_url=None, timeout=2.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown GRAPH_MODE: {mode} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.data_path = data_path
+        self.snapshot_path = snapshot_path
+        self.engine = None
+        self.status = {"local": "starting", "remote": "remote", "off": "off"}[mode]
+        self.error = None
+        self.service_url = service_url
+        self.timeout = timeout
+        # Remote mode's HTTP client, created on the first lookup
+        self.client = None
+
+    def load(self):
+        """Restore or build the in-process graph and its seller index (local mode; run in the background)."""
+        if self.mode != "local":
+            return
+        self.status = "loading"
+        try:
+            # The graph code uses pandas too; don't race load_data() through the lazy import
+            load_module("pandas")
+            if GRAPH_SERVICE_DIR not in sys.path:
+                sys.path.append(GRAPH_SERVICE_DIR)
+            from graph_engine import GraphEngine
+            engine = GraphEngine(self.data_path, autoload=False)
+            meta = engine.load_snapshot(self.snapshot_path) if self.snapshot_path else None
+            if meta is None:
+                engine.load_data()
+                engine.build_index()
+            else:
+                if meta["source"] == "supabase":
+                    try:
+                        engine.load_delta()
+                    except Exception as e:
+                        # The snapshot is usable as is; refresh() retries from its watermark
+                        print(f"Local graph catch-up failed: {e}")
+                engine.refresh_index()
+            self.engine = engine
+            self.status = "ready"
+            print(f"Local graph ready: {engine.stats()['nodes']} nodes ({'snapshot' if meta else engine.source})")
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f"Local graph failed to load: {e}")
+
+    def refresh(self):
+        """Catch the local graph up on transactions newer than its watermark."""
+        if self.engine is not None and self.engine.source == "supabase":
+            self.engine.load_delta()
+            self.engine.refresh_index()
+
+    def _http(self):
+        import httpx
+        if self.client is None:
+            self.client = httpx.AsyncClient(base_url=self.service_url, timeout=self.timeout)
+        return self.client
+
+    async def signals(self, seller_id):
+        """
+        (signals shaped like GET /graph/{id} or None, status). In remote mode the
+        status names why a lookup failed: "timeout", "http_<code>", "unreachable"
+        or "invalid_response".
+        """
+        if self.mode == "local":
+            if self.engine is None:
+                return None, self.status
+            # Indexed sellers are a dict lookup; only misses compute (off the event loop)
+            signals = self.engine.index.get(seller_id)
+            if signals is None:
+                signals = await run_in_threadpool(self.engine.get_seller_signals, seller_id)
+            return {"seller_id": seller_id, **signals, "fraud_risk": fraud_risk(signals)}, self.status
+        if self.mode == "remote":
+            import httpx
+            try:
+                resp = await self._http().get(f"/graph/{seller_id}")
+                resp.raise_for_status()
+                return resp.json(), self.status
+            except httpx.TimeoutException as e:
+                status, error = "timeout", e
+            except httpx.HTTPStatusError as e:
+                status, error = f"http_{e.response.status_code}", e
+            except httpx.HTTPError as e:
+                status, error = "unreachable", e
+            except ValueError as e:
+                status, error = "invalid_response", e
+            print(f"Graph service unavailable for {seller_id} ({status}): {error}")
+            return None, status
+        return None, self.status
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "error": self.error,
+            "graph": self.engine.stats() if self.engine is not None else None,
+        }
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
@@ -0,0 +1,44 @@
+"""
+TRUSTRA - Deferred imports for fast ML service startup
+`pd = lazy_module("pandas")` binds a module object that only imports on first
+attribute access, so importing main.py (or a CLI tool) does not pay for pandas
+until something actually builds a frame.
+
+LazyLoader is not thread-safe before Python 3.12: two threads touching a
+deferred module for the first time can both run its import. Threads that may
+be first (the background loaders) call load_module() before anything else.
+"""
+import importlib.util
+import sys
+import threading
+
+_load_lock = threading.Lock()
+
+def lazy_module(name):
+    """The module if already imported, else a stand-in that imports it on first use."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def load_module(name):
+    """Finish importing a deferred module, once, under a lock; returns the module."""
+    with _load_lock:
+        module = sys.modules.get(name)
+        if isinstance(module, importlib.util._LazyModule):
+            # Any attribute access runs the real import
+            getattr(module, "__name__")
+            module = sys.modules[name]
+        return module
+
+def is_loaded(name) -> bool:
+    """True once the module has really been imported (not just deferred)."""
+    module = sys.modules.get(name)
+    return module is not None and not isinstance(module, importlib.util._LazyModule)
@@ -1,15 +1,38 @@
+import time
+# Import-time breakdown (reported by /health/ready): (group, perf_counter when it finished)
+IMPORT_STARTED = time.perf_counter()
+import_marks = []
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Union
+import_marks.append(("fastapi", time.perf_counter()))
+import numpy as np
+import asyncio
+import json
 import os
-import requests
-from datetime import datetime
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from lazy_modules import is_loaded, lazy_module, load_module
+# pandas loads on first use: in the background data load, or the first request
+pd = lazy_module("pandas")
+import_marks.append(("numpy", time.perf_counter()))
 
 from models.behavioral_engine import BehavioralEngine
 from models.authenticity_model import AuthenticityModel
 from models.risk_engine import RiskEngine
+from models.streaming_trust import StreamingTrustEngine
+from trust_history import TrustHistory
+from event_log import EventLog
+from parallel_scoring import ParallelScorer
+from graph_features import GraphFeatures
+import_marks.append(("models", time.perf_counter()))
 
 app = FastAPI(title="TRUSTRA ML Service (Supabase)")
 
@@ -22,142 +45,954 @@ app.add_middleware(
 )
 
 # --- Supabase Config ---
+# Pooled clients shared with graph-service live in ../shared
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from shared.supabase_client import SupabaseClient, AsyncSupabaseClient, SupabaseError
+from shared.columnar_store import ColumnarStore
+from shared.metrics import MetricsMiddleware, register_upstream_gauges, registry as metrics
+from shared.profiler import register_routes as register_profiler_routes
+import_marks.append(("shared", time.perf_counter()))
+
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://gpdhyiohcagqydhhjzrz.supabase.co")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "sb_publishable_DixO3g1pvbB4aRuaTXh4Mw_5miq-nXW")
-REST_URL = f"{SUPABASE_URL}/rest/v1"
-SB_HEADERS = {
-    "apikey": SUPABASE_KEY,
-    "Authorization": f"Bearer {SUPABASE_KEY}",
-}
+supabase = SupabaseClient(SUPABASE_URL, SUPABASE_KEY, timeout=10)
+supabase_async = AsyncSupabaseClient(SUPABASE_URL, SUPABASE_KEY, timeout=10)
+
+# Request latency for every route, exported with the rest at GET /metrics
+app.add_middleware(MetricsMiddleware)
 
 def sb_query(table: str, params: dict = None) -> list:
     """Query Supabase REST API and return JSON rows."""
-    try:
-        resp = requests.get(f"{REST_URL}/{table}", headers=SB_HEADERS, params=params or {}, timeout=10)
-        if resp.status_code == 200:
-            return resp.json()
-        else:
-            print(f"Supabase query error ({table}): {resp.status_code} {resp.text[:200]}")
-            return []
-    except Exception as e:
-        print(f"Supabase connection error ({table}): {e}")
-        return []
+    return supabase.query(table, params)
+
+def sb_query_all(table: str, params: dict = None, page_size: int = 1000) -> list:
+    """
+    Page through a Supabase table (several pages in flight) until a short page is
+    returned. Raises SupabaseError if a page fails rather than returning part of it.
+    """
+    return supabase.query_all(table, params, page_size=page_size)
+
+# Keep `in.(...)` filters short enough for the PostgREST URL limit
+ID_CHUNK_SIZE = 100
+
+def sb_query_in(table: str, column: str, ids: list, select: str = "*") -> list:
+    """Fetch all rows whose `column` is in `ids`, chunking the id list."""
+    rows = []
+    for i in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk = ids[i : i + ID_CHUNK_SIZE]
+        rows.extend(sb_query_all(table, {"select": select, column: f"in.({','.join(chunk)})"}))
+    return rows
 
 # Initialize Engines
 behavioral_engine = BehavioralEngine()
-authenticity_model = AuthenticityModel()
+# Its shared text index holds the newest REVIEW_INDEX_MAX_DOCS reviews (~12 KB each):
+# offline, those loaded at startup; in Supabase mode, those of sellers scored so far,
+# so cross-seller scores depend on scoring order
+authenticity_model = AuthenticityModel(max_indexed_reviews=int(os.environ.get("REVIEW_INDEX_MAX_DOCS", "50000")))
 risk_engine = RiskEngine()
+# Last N scores per seller for volatility/trend; written to trust_scores in bulk in database mode
+TRUST_HISTORY_SIZE = int(os.environ.get("TRUST_HISTORY_SIZE", "30"))
+TRUST_HISTORY_DAYS = int(os.environ.get("TRUST_HISTORY_DAYS", "30"))
+trust_history = TrustHistory(capacity=TRUST_HISTORY_SIZE)
+# Per-seller running aggregates fed by POST /events
+stream_engine = StreamingTrustEngine(behavioral_engine, authenticity_model)
+# Streamed events, merged into every transactions/reviews read until the source
+# tables hold them; stored in trust_events in database mode
+EVENT_LOG_MAX = int(os.environ.get("EVENT_LOG_MAX", "100000"))
+EVENT_LOG_DAYS = int(os.environ.get("EVENT_LOG_DAYS", "30"))
+event_log = EventLog(max_events=EVENT_LOG_MAX)
+
+class TrustCache:
+    """
+    Bounded LRU cache with a per-entry TTL for per-seller trust results.
+    Entries expire after ttl_seconds; the least recently used entry is evicted
+    once max_size is reached. A value computed from data read before an
+    invalidation is dropped by put() when given the generation() taken first.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # seller_id -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        self._generation = 0      # bumped by every invalidate()
+        self._invalidated_at = {}  # seller_id -> generation of its last invalidation
+        self._cleared_at = 0      # generation of the last full invalidation
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, seller_id: str):
+        with self._lock:
+            entry = self._entries.get(seller_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[seller_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(seller_id)
+            self.hits += 1
+            return value
+
+    def put(self, seller_id: str, value: dict, generation: Optional[int] = None):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and max(self._cleared_at, self._invalidated_at.get(seller_id, 0)) > generation:
+                self.stale_puts += 1
+                return
+            self._entries[seller_id] = (time.monotonic(), value)
+            self._entries.move_to_end(seller_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, seller_ids=None) -> int:
+        """Drop the given sellers (or everything when seller_ids is None)."""
+        with self._lock:
+            self._generation += 1
+            if seller_ids is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._invalidated_at.clear()
+                self._cleared_at = self._generation
+            else:
+                for sid in seller_ids:
+                    self._invalidated_at[sid] = self._generation
+                removed = sum(1 for sid in seller_ids if self._entries.pop(sid, None) is not None)
+            self.invalidations += removed
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
+
+trust_cache = TrustCache(
+    max_size=int(os.environ.get("TRUST_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.environ.get("TRUST_CACHE_TTL", "60")),
+)
+# Per-seller AuthenticityState for /compute-trust: later requests fetch and fold in
+# only reviews inserted since the state's cursor. LRU-bounded, never expires. Together
+# with the text index: about REVIEW_STATE_CACHE_SIZE x 18 KB + REVIEW_INDEX_MAX_DOCS x 12 KB.
+review_states = TrustCache(max_size=int(os.environ.get("REVIEW_STATE_CACHE_SIZE", "50000")), ttl_seconds=float("inf"))
 
-# Fallback: also keep CSV loading for offline mode
-sellers_df = pd.DataFrame()
-transactions_df = pd.DataFrame()
-reviews_df = pd.DataFrame()
+# Fallback: also keep CSV loading for offline mode (None until load_data runs)
+sellers_df = None
+transactions_df = None
+reviews_df = None
+# seller_id -> row positions, built once so CSV lookups avoid full-frame masks
+transactions_index = {}
+reviews_index = {}
 
-DATA_PATH = "../data-simulation"
+DATA_PATH = os.environ.get("DATA_PATH", "../data-simulation")
+# Memory-mapped Arrow snapshot (python shared/columnar_store.py); preferred over CSVs when present
+COLUMNAR_PATH = os.environ.get("COLUMNAR_PATH", os.path.join(DATA_PATH, "columnar"))
+columnar_store = None
 USE_SUPABASE = True  # Flag to toggle
 
-@app.on_event("startup")
-async def load_data():
-    global sellers_df, transactions_df, reviews_df, USE_SUPABASE
-    
+# Graph signals for /compute-trust/combined: "local" (GraphEngine in this process), "remote" or "off"
+GRAPH_MODE = os.environ.get("GRAPH_MODE", "remote")
+# Share of the trust score removed at full graph risk
+GRAPH_RISK_WEIGHT = float(os.environ.get("GRAPH_RISK_WEIGHT", "0.3"))
+# Local mode: pull new Supabase transactions into the in-process graph every N seconds (0 disables)
+GRAPH_REFRESH_SECONDS = float(os.environ.get("GRAPH_REFRESH_SECONDS", "0"))
+graph_features = GraphFeatures(
+    GRAPH_MODE, DATA_PATH,
+    snapshot_path=os.environ.get("GRAPH_SNAPSHOT_PATH", os.path.join(DATA_PATH, "graph-snapshot")),
+    service_url=os.environ.get("GRAPH_SERVICE_URL", "http://localhost:8001"),
+    timeout=float(os.environ.get("GRAPH_TIMEOUT", "2")),
+)
+
+@contextmanager
+def stage_timer(stage: str, timings: Optional[dict] = None):
+    """Stage histogram for /metrics; also records milliseconds into timings when given."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("trustra_stage_seconds", elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = round(elapsed * 1000, 3)
+
+# ML_LAZY_INIT=1: serve as soon as the app is imported and load data in the background
+# (/health/ready reports progress); requests needing data wait up to ML_READY_TIMEOUT seconds
+ML_LAZY_INIT = os.environ.get("ML_LAZY_INIT", "0") == "1"
+ML_READY_TIMEOUT = float(os.environ.get("ML_READY_TIMEOUT", "30"))
+startup_state = {"phase": "starting", "lazy": ML_LAZY_INIT, "ready_at": None, "ready_seconds": None,
+                 "source": None, "error": None, "import_ms": {}, "phases_ms": {}}
+data_ready = threading.Event()
+
+def import_breakdown() -> dict:
+    """Milliseconds spent importing each group of modules, plus module-level setup."""
+    breakdown, previous = {}, IMPORT_STARTED
+    for group, finished in import_marks:
+        breakdown[group] = round((finished - previous) * 1000, 1)
+        previous = finished
+    breakdown["total"] = round((previous - IMPORT_STARTED) * 1000, 1)
+    breakdown["pandas_loaded"] = is_loaded("pandas")
+    return breakdown
+
+def data_source() -> str:
+    return "supabase" if USE_SUPABASE else ("columnar" if columnar_store is not None else "csv")
+
+def require_data():
+    """Wait for the startup load (only lazy mode can get here first); 503 when it failed or timed out."""
+    if not data_ready.wait(ML_READY_TIMEOUT) or startup_state["phase"] != "ready":
+        raise HTTPException(status_code=503, detail=f"ML service not ready ({startup_state['phase']})")
+
+async def require_data_async():
+    if not data_ready.is_set():
+        await run_in_threadpool(data_ready.wait, ML_READY_TIMEOUT)
+    require_data()
+
+def load_data():
+    """Probe Supabase, then load trust history or the offline data; timed per phase."""
+    start = time.perf_counter()
+    startup_state["phase"] = "loading"
+    try:
+        # Runs beside GraphFeatures.load; whichever thread is first imports pandas
+        load_module("pandas")
+        _load_data(startup_state["phases_ms"])
+        startup_state.update(phase="ready", ready_at=time.time(), source=data_source(),
+                             ready_seconds=round(time.perf_counter() - IMPORT_STARTED, 3),
+                             load_seconds=round(time.perf_counter() - start, 3))
+        print(f"ML service ready {startup_state['ready_seconds']}s after import started "
+              f"(source: {startup_state['source']}, load {startup_state['load_seconds']}s)")
+    except Exception as e:
+        startup_state.update(phase="failed", error=str(e))
+        print(f"ML service startup failed: {e}")
+    finally:
+        data_ready.set()
+
+def _load_data(phases):
+    global sellers_df, transactions_df, reviews_df, transactions_index, reviews_index, USE_SUPABASE, columnar_store
+
+    with stage_timer("startup_pandas_import", phases):
+        sellers_df, transactions_df, reviews_df = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
     # Test Supabase connection
     print("Testing Supabase connection...")
-    test = sb_query("sellers", {"select": "id", "limit": "1"})
+    with stage_timer("startup_supabase_probe", phases):
+        test = supabase.query("sellers", {"select": "id", "limit": "1"}, retries=0)
     if test:
         print("Supabase connection OK! Using database mode.")
         USE_SUPABASE = True
+        cutoff = datetime.fromtimestamp(time.time() - TRUST_HISTORY_DAYS * 86400, timezone.utc).isoformat()
+        with stage_timer("startup_trust_history", phases):
+            try:
+                history = supabase.query_all(
+                    "trust_scores", {"select": "seller_id,score,timestamp", "timestamp": f"gte.{cutoff}", "order": "timestamp.asc"}
+                )
+            except SupabaseError as e:
+                # Scores start from an empty history rather than a truncated one
+                print(f"Trust history unavailable: {e}")
+                history = []
+            trust_history.load(history)
+        trust_history.client = supabase
+        trust_history.start()
+        print(f"Trust history loaded: {len(history)} scores for {len(trust_history.rows)} sellers")
+        events_cutoff = datetime.fromtimestamp(time.time() - EVENT_LOG_DAYS * 86400, timezone.utc).isoformat()
+        with stage_timer("startup_event_log", phases):
+            try:
+                logged = supabase.query_all(
+                    "trust_events", {"select": "event", "received_at": f"gte.{events_cutoff}", "order": "received_at.asc"}
+                )
+            except SupabaseError as e:
+                print(f"Event log unavailable: {e}")
+                logged = []
+            event_log.load(logged)
+        print(f"Event log loaded: {len(event_log)} events not yet in the source tables")
     else:
         print("Supabase unavailable. Falling back to CSV mode.")
         USE_SUPABASE = False
+        if ColumnarStore.available(COLUMNAR_PATH):
+            try:
+                # Per-seller rows are sliced from the mapped files on demand
+                with stage_timer("startup_columnar", phases):
+                    columnar_store = ColumnarStore(COLUMNAR_PATH)
+                    sellers_df = columnar_store.frame("sellers")
+                with stage_timer("startup_review_index", phases):
+                    authenticity_model.index_reviews(
+                        columnar_store.frame("reviews", columns=['id', 'seller_id', 'text']).to_dict('records'))
+                print(f"Columnar Data Mapped: {len(sellers_df)} sellers, "
+                      f"{columnar_store.num_rows('transactions')} transactions from {COLUMNAR_PATH}")
+                return
+            except Exception as e:
+                print(f"Error opening columnar data, reading CSVs instead: {e}")
+                columnar_store = None
         # Load CSVs as fallback
         try:
-            if os.path.exists(os.path.join(DATA_PATH, "sellers.csv")):
-                sellers_df = pd.read_csv(os.path.join(DATA_PATH, "sellers.csv"))
-                sellers_df['id'] = sellers_df['id'].astype(str)
-            if os.path.exists(os.path.join(DATA_PATH, "transactions.csv")):
-                transactions_df = pd.read_csv(os.path.join(DATA_PATH, "transactions.csv"))
-                transactions_df['seller_id'] = transactions_df['seller_id'].astype(str)
-            if os.path.exists(os.path.join(DATA_PATH, "reviews.csv")):
-                reviews_df = pd.read_csv(os.path.join(DATA_PATH, "reviews.csv"))
-                reviews_df['seller_id'] = reviews_df['seller_id'].astype(str)
+            with stage_timer("startup_csv", phases):
+                if os.path.exists(os.path.join(DATA_PATH, "sellers.csv")):
+                    sellers_df = pd.read_csv(os.path.join(DATA_PATH, "sellers.csv"))
+                    sellers_df['id'] = sellers_df['id'].astype(str)
+                if os.path.exists(os.path.join(DATA_PATH, "transactions.csv")):
+                    transactions_df = pd.read_csv(os.path.join(DATA_PATH, "transactions.csv"))
+                    transactions_df['seller_id'] = transactions_df['seller_id'].astype(str)
+                if os.path.exists(os.path.join(DATA_PATH, "reviews.csv")):
+                    reviews_df = pd.read_csv(os.path.join(DATA_PATH, "reviews.csv"))
+                    reviews_df['seller_id'] = reviews_df['seller_id'].astype(str)
+                transactions_index = build_seller_index(transactions_df)
+                reviews_index = build_seller_index(reviews_df)
+            with stage_timer("startup_review_index", phases):
+                if not reviews_df.empty:
+                    authenticity_model.index_reviews(reviews_df[['id', 'seller_id', 'text']].to_dict('records'))
             print(f"CSV Data Loaded: {len(sellers_df)} sellers")
         except Exception as e:
             print(f"Error loading CSV data: {e}")
 
+@app.on_event("startup")
+async def start_loading():
+    if ML_LAZY_INIT:
+        threading.Thread(target=load_data, daemon=True).start()
+    else:
+        await run_in_threadpool(load_data)
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness():
+    """Startup phase, import-time and per-phase load timings; 503 until data is loaded."""
+    state = {**startup_state, "phases_ms": dict(startup_state["phases_ms"])}
+    if startup_state["phase"] != "ready":
+        return JSONResponse(status_code=503, content=state)
+    return state
+
+def build_seller_index(df: "pd.DataFrame") -> dict:
+    """Map seller_id -> row positions in a single groupby pass."""
+    if df.empty or 'seller_id' not in df.columns:
+        return {}
+    return df.groupby('seller_id', sort=False).indices
+
+def rows_for_seller(df: "pd.DataFrame", index: dict, seller_id: str) -> "pd.DataFrame":
+    positions = index.get(seller_id)
+    if positions is None:
+        return df.iloc[0:0]
+    return df.iloc[positions]
+
 # Data Models
 class TrustRequest(BaseModel):
     seller_id: str
 
+class BatchTrustRequest(BaseModel):
+    seller_ids: Union[List[str], Literal["all"]] = "all"
+
+class TrustEvent(BaseModel):
+    type: Literal["transaction", "review"]
+    seller_id: str
+    id: Optional[str] = None
+    # transaction fields; previous_status marks a status change of a known transaction
+    status: Optional[str] = None
+    previous_status: Optional[str] = None
+    delivery_time_days: Optional[float] = None
+    # review fields
+    rating: Optional[float] = None
+    text: Optional[str] = None
+    timestamp: Optional[str] = None
+
+    @model_validator(mode="after")
+    def status_change_has_id(self):
+        if self.previous_status and self.id is None:
+            raise ValueError("a status change (previous_status) needs the transaction id")
+        return self
+
+class EventBatch(BaseModel):
+    events: List[TrustEvent]
+
+class RescoreRequest(BaseModel):
+    seller_ids: Union[List[str], Literal["all"]] = "all"
+    workers: int = Field(max(1, os.cpu_count() or 1), ge=1, le=max(1, os.cpu_count() or 1))
+
+class CacheInvalidateRequest(BaseModel):
+    # Omit to clear the whole cache
+    seller_ids: Optional[List[str]] = None
+    # Also rebuild review state from full history (after reviews were edited or deleted)
+    reset_review_state: bool = False
+
 @app.get("/")
 def read_root():
     mode = "Supabase" if USE_SUPABASE else "CSV"
     return {"message": f"TRUSTRA ML Service Running ({mode} Mode)"}
 
-@app.post("/compute-trust")
-def compute_trust_endpoint(request: TrustRequest):
-    seller_id = request.seller_id
-    
+def score_seller(seller_id: str, seller_tx: "pd.DataFrame", seller_reviews: "pd.DataFrame", current_trust: float,
+                 behavioral_score: Optional[float] = None, timings: Optional[dict] = None,
+                 review_state=None, record: bool = True) -> dict:
+    """
+    Run the behavioral, authenticity and decay engines for one seller.
+    A precomputed behavioral_score (from BehavioralEngine.compute_all) skips step 2.
+    Authenticity always comes from the seller's cached AuthenticityState (review_state,
+    or the one in review_states), so every endpoint scores a seller the same way;
+    seller_reviews may overlap reviews the state has already folded in.
+    record=False (a seller with no sellers row) keeps the score out of the history.
+    """
+    # 2. Behavioral Score
+    if behavioral_score is None:
+        with stage_timer("behavioral", timings):
+            behavioral_score = behavioral_engine.compute_metrics(seller_tx, seller_reviews)
+
+    # 3. Authenticity Score
+    with stage_timer("authenticity", timings):
+        if review_state is None:
+            review_state = review_state_for(seller_id)
+        with review_state.lock:
+            authenticity_model.update_state_many(review_state, seller_reviews, seller_id)
+            authenticity_score, evidence = authenticity_model.score_state(review_state, return_evidence=True)
+        review_states.put(seller_id, review_state)
+
+    return build_trust_result(seller_id, behavioral_score, authenticity_score, evidence, current_trust,
+                              record=record, timings=timings)
+
+def review_state_for(seller_id: str):
+    """The seller's cached AuthenticityState, or a new one (cached once score_seller uses it)."""
+    state = review_states.get(seller_id)
+    return state if state is not None else authenticity_model.new_state()
+
+def risk_level(score: float) -> str:
+    return "High" if score < 500 else "Medium" if score < 750 else "Low"
+
+def build_trust_result(seller_id: str, behavioral_score: float, authenticity_score: float, evidence: dict,
+                       current_trust: float, record: bool = True, timings: Optional[dict] = None) -> dict:
+    """
+    Combine component scores with decay into the /compute-trust response.
+    With record=True the score is appended to the seller's trust history.
+    """
+    with stage_timer("decay", timings):
+        # 4. Temporal Decay (since the seller's last recorded score)
+        decayed_score = risk_engine.calculate_temporal_trust(current_trust, trust_history.last_updated(seller_id))
+
+        # 5. Final Score
+        final_score = risk_engine.combine_trust(decayed_score, behavioral_score, authenticity_score)
+
+        # 6. Volatility and trend over the recent score history
+        if record:
+            trust_history.record(seller_id, final_score)
+        history = trust_history.history(seller_id)
+        volatility = risk_engine.calculate_volatility(history)
+
+    return {
+        "seller_id": seller_id,
+        "trust_score": round(final_score, 2),
+        "volatility_index": round(volatility, 2),
+        "trend": risk_engine.predict_risk_trend(history),
+        "history_points": len(history),
+        "components": {
+            "behavioral": round(behavioral_score * 1000, 2),
+            "authenticity": round(authenticity_score * 1000, 2),
+            "temporal_decay_applied": round(current_trust - decayed_score, 2)
+        },
+        "evidence": evidence,
+        "risk_level": risk_level(final_score),
+        "data_source": data_source()
+    }
+
+@app.on_event("shutdown")
+async def close_clients():
+    await run_in_threadpool(trust_history.close)
+    await supabase_async.aclose()
+    await graph_features.aclose()
+    supabase.close()
+
+async def fetch_seller_data(seller_id: str, timings: Optional[dict] = None, reviews_since: Optional[str] = None,
+                            events_until: Optional[float] = None):
+    """
+    Load one seller's transactions, reviews and baseline trust, and whether the
+    seller exists. reviews_since (an ISO timestamp) limits Supabase reviews to
+    those inserted (created_at) from that time onwards. Logged stream events
+    (up to received_at events_until, if given) are merged into the transactions
+    and reviews.
+    """
     if USE_SUPABASE:
-        # Query Supabase for this seller's data
-        seller_info = sb_query("sellers", {"select": "*", "id": f"eq.{seller_id}"})
-        seller_txns = sb_query("transactions", {"select": "*", "seller_id": f"eq.{seller_id}"})
-        seller_revs = sb_query("reviews", {"select": "*", "seller_id": f"eq.{seller_id}"})
+        # Query Supabase for this seller's data (the three requests run concurrently)
+        with stage_timer("fetch", timings):
+            seller_info, seller_txns, seller_revs = await asyncio.gather(
+                supabase_async.query("sellers", {"select": "*", "id": f"eq.{seller_id}"}),
+                supabase_async.query("transactions", {"select": "*", "seller_id": f"eq.{seller_id}"}),
+                supabase_async.query("reviews", {"select": "*", "seller_id": f"eq.{seller_id}",
+                                                 **({"created_at": f"gte.{reviews_since}"} if reviews_since else {})}),
+            )
         
-        seller_tx = pd.DataFrame(seller_txns) if seller_txns else pd.DataFrame()
-        seller_reviews = pd.DataFrame(seller_revs) if seller_revs else pd.DataFrame()
+        with stage_timer("dataframe", timings):
+            seller_tx = pd.DataFrame(seller_txns) if seller_txns else pd.DataFrame()
+            seller_reviews = pd.DataFrame(seller_revs) if seller_revs else pd.DataFrame()
         
-        if seller_info:
-            current_trust = float(seller_info[0].get('baseline_trust_score', 500.0))
-        else:
-            current_trust = 500.0
+        found = bool(seller_info)
+        current_trust = float(seller_info[0].get('baseline_trust_score', 500.0)) if found else 500.0
     else:
-        # CSV fallback
-        seller_tx = transactions_df[transactions_df['seller_id'] == seller_id]
-        seller_reviews = reviews_df[reviews_df['seller_id'] == seller_id]
-        seller_info_df = sellers_df[sellers_df['id'] == seller_id]
-        current_trust = float(seller_info_df.iloc[0]['baseline_trust_score']) if not seller_info_df.empty else 500.0
+        # CSV / columnar fallback
+        with stage_timer("fetch", timings):
+            if columnar_store is not None:
+                seller_tx = columnar_store.seller_rows("transactions", seller_id)
+                seller_reviews = columnar_store.seller_rows("reviews", seller_id)
+            else:
+                seller_tx = rows_for_seller(transactions_df, transactions_index, seller_id)
+                seller_reviews = rows_for_seller(reviews_df, reviews_index, seller_id)
+            seller_info_df = sellers_df[sellers_df['id'] == seller_id]
+            found = not seller_info_df.empty
+            current_trust = float(seller_info_df.iloc[0]['baseline_trust_score']) if found else 500.0
+    seller_tx, seller_reviews = event_log.merge(seller_tx, seller_reviews, [seller_id], until=events_until)
+    return seller_tx, seller_reviews, current_trust, found
+
+async def compute_trust(seller_id: str, timings: Optional[dict] = None) -> dict:
+    cached = trust_cache.get(seller_id)
+    if cached is not None:
+        return cached
+    await require_data_async()
+    generation = trust_cache.generation()
+
+    review_state = review_state_for(seller_id)
+    since = authenticity_model.reviews_since(review_state)
+    seller_tx, seller_reviews, current_trust, found = await fetch_seller_data(seller_id, timings, since)
 
     try:
-        # 2. Behavioral Score
-        behavioral_score = behavioral_engine.compute_metrics(seller_tx, seller_reviews)
-        
-        # 3. Authenticity Score
-        reviews_list = seller_reviews.to_dict('records') if not seller_reviews.empty else []
-        authenticity_score = authenticity_model.predict_authenticity(reviews_list)
-        
-        # 4. Temporal Decay
-        decayed_score = risk_engine.calculate_temporal_trust(current_trust, None)
-        
-        # 5. Final Score
-        raw_performance = (behavioral_score * 0.6 + authenticity_score * 0.4) * 1000
-        alpha = 0.3
-        final_score = (decayed_score * (1 - alpha)) + (raw_performance * alpha)
-        final_score = max(0, min(1000, final_score))
-        
-        # 6. Volatility
-        volatility = 20.0
-        
-        return {
-            "seller_id": seller_id,
-            "trust_score": round(final_score, 2),
-            "volatility_index": round(volatility, 2),
-            "components": {
-                "behavioral": round(behavioral_score * 1000, 2),
-                "authenticity": round(authenticity_score * 1000, 2),
-                "temporal_decay_applied": round(current_trust - decayed_score, 2)
-            },
-            "risk_level": "High" if final_score < 500 else "Medium" if final_score < 750 else "Low",
-            "data_source": "supabase" if USE_SUPABASE else "csv"
-        }
-        
+        # Scoring is CPU-bound; keep it off the event loop
+        result = await run_in_threadpool(score_seller, seller_id, seller_tx, seller_reviews, current_trust,
+                                         timings=timings, review_state=review_state, record=found)
+        trust_cache.put(seller_id, result, generation)
+        return result
     except Exception as e:
         print(f"Error computing trust: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/compute-trust")
+async def compute_trust_endpoint(request: TrustRequest):
+    return await compute_trust(request.seller_id)
+
+async def graph_signals(seller_id: str, timings: dict):
+    with stage_timer("graph", timings):
+        return await graph_features.signals(seller_id)
+
+@app.post("/compute-trust/combined")
+async def compute_trust_combined_endpoint(request: TrustRequest):
+    """
+    /compute-trust and the seller's graph signals in one call, with the trust
+    score discounted by graph collusion risk. Seller data and graph signals are
+    fetched concurrently; latency_ms breaks the request down by component.
+    """
+    start = time.perf_counter()
+    timings = {}
+    result, (graph, graph_status) = await asyncio.gather(compute_trust(request.seller_id, timings),
+                                                         graph_signals(request.seller_id, timings))
+
+    combined = {**result, "components": dict(result["components"]), "ml_trust_score": result["trust_score"],
+                "graph": graph, "graph_status": graph_status}
+    if graph is not None:
+        score = risk_engine.apply_graph_risk(result["trust_score"], graph["clustering_coefficient"],
+                                             graph["collusion_score"], GRAPH_RISK_WEIGHT)
+        combined["trust_score"] = round(score, 2)
+        combined["components"]["graph_risk_penalty"] = round(result["trust_score"] - score, 2)
+        combined["risk_level"] = risk_level(score)
+    combined["ml_cached"] = "fetch" not in timings
+    combined["latency_ms"] = {**timings, "total": round((time.perf_counter() - start) * 1000, 3)}
+    return combined
+
+@app.get("/graph-features/stats")
+def graph_features_stats_endpoint():
+    """Graph mode for combined scoring and, in local mode, the in-process graph's size."""
+    return graph_features.stats()
+
+@app.on_event("startup")
+async def start_graph_features():
+    # Local mode loads the graph without blocking startup; combined scores omit it until ready
+    threading.Thread(target=graph_features.load, daemon=True).start()
+    if GRAPH_MODE == "local" and GRAPH_REFRESH_SECONDS > 0:
+        asyncio.create_task(graph_refresh_loop())
+
+async def graph_refresh_loop():
+    while True:
+        await asyncio.sleep(GRAPH_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(graph_features.refresh)
+        except Exception as e:
+            print(f"Local graph refresh error: {e}")
+
+def load_batch_data(seller_ids):
+    """
+    Fetch sellers, transactions and reviews for many sellers in bulk, with
+    logged stream events merged in.
+    Returns (seller_ids, baselines, transactions, reviews).
+    """
+    wanted = None if seller_ids == "all" else seller_ids
+    seller_ids, baselines, txns, revs = _read_batch_data(seller_ids)
+    txns, revs = event_log.merge(txns, revs, wanted)
+    return seller_ids, baselines, txns, revs
+
+def _read_batch_data(seller_ids):
+    # Transaction ids are only needed to match logged events against stored rows
+    tx_columns = ['seller_id', 'status', 'delivery_time_days'] + (['id'] if len(event_log) else [])
+    if USE_SUPABASE:
+        if seller_ids == "all":
+            sellers = sb_query_all("sellers", {"select": "id,baseline_trust_score"})
+            txns = sb_query_all("transactions", {"select": ",".join(tx_columns)})
+            revs = sb_query_all("reviews", {"select": "id,seller_id,rating,text,timestamp,created_at"})
+            seller_ids = [row['id'] for row in sellers]
+        else:
+            sellers = sb_query_in("sellers", "id", seller_ids, "id,baseline_trust_score")
+            txns = sb_query_in("transactions", "seller_id", seller_ids, ",".join(tx_columns))
+            revs = sb_query_in("reviews", "seller_id", seller_ids, "id,seller_id,rating,text,timestamp,created_at")
+        baselines = {row['id']: float(row.get('baseline_trust_score') or 500.0) for row in sellers}
+        return seller_ids, baselines, pd.DataFrame(txns), pd.DataFrame(revs)
+
+    # CSV fallback
+    if sellers_df.empty:
+        baselines = {}
+    else:
+        baselines = dict(zip(sellers_df['id'], sellers_df['baseline_trust_score'].astype(float)))
+    if columnar_store is not None:
+        if seller_ids == "all":
+            return (list(sellers_df['id']), baselines,
+                    columnar_store.frame("transactions", columns=tx_columns),
+                    columnar_store.frame("reviews", columns=['id', 'seller_id', 'rating', 'text', 'timestamp']))
+        # pd.concat needs a frame; with no sellers, an unknown id gives an empty slice with the columns
+        wanted = seller_ids or [None]
+        txns = pd.concat([columnar_store.seller_rows("transactions", s) for s in wanted], ignore_index=True)
+        revs = pd.concat([columnar_store.seller_rows("reviews", s) for s in wanted], ignore_index=True)
+        return seller_ids, baselines, txns, revs
+    if seller_ids == "all":
+        return list(sellers_df['id']) if not sellers_df.empty else [], baselines, transactions_df, reviews_df
+    wanted = set(seller_ids)
+    txns = transactions_df[transactions_df['seller_id'].isin(wanted)] if not transactions_df.empty else transactions_df
+    revs = reviews_df[reviews_df['seller_id'].isin(wanted)] if not reviews_df.empty else reviews_df
+    return seller_ids, baselines, txns, revs
+
+def group_by_seller(df: "pd.DataFrame") -> dict:
+    """Split a frame into {seller_id: rows} with a single groupby pass."""
+    if df.empty or 'seller_id' not in df.columns:
+        return {}
+    return {seller_id: group for seller_id, group in df.groupby('seller_id', sort=False)}
+
+@app.post("/compute-trust/batch")
+def compute_trust_batch_endpoint(request: BatchTrustRequest):
+    """
+    Score many sellers in one pass and stream one JSON object per line (NDJSON).
+    """
+    require_data()
+    generation = trust_cache.generation()
+    with metrics.timer("trustra_stage_seconds", stage="batch_fetch"):
+        try:
+            seller_ids, baselines, txns, revs = load_batch_data(request.seller_ids)
+        except SupabaseError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    with metrics.timer("trustra_stage_seconds", stage="batch_behavioral"):
+        behavioral = behavioral_engine.compute_all(txns, revs)['behavioral_score']
+    review_groups = group_by_seller(revs)
+    empty = pd.DataFrame()
+
+    def generate():
+        for seller_id in seller_ids:
+            try:
+                result = score_seller(
+                    seller_id,
+                    empty,
+                    review_groups.get(seller_id, empty),
+                    baselines.get(seller_id, 500.0),
+                    behavioral_score=float(behavioral.get(seller_id, 0.0)),
+                    record=seller_id in baselines,
+                )
+                trust_cache.put(seller_id, result, generation)
+            except Exception as e:
+                print(f"Error computing trust for {seller_id}: {e}")
+                result = {"seller_id": seller_id, "error": str(e)}
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+# --- Full-population re-score across a process pool ---
+rescore_status = {"running": False}
+# Held from the request that starts a re-score until run_rescore finishes
+rescore_lock = threading.Lock()
+
+def run_rescore(seller_ids, workers):
+    rescore_status.update(running=True, phase="loading", done=0, total=0, workers=workers,
+                          started_at=time.time(), finished_at=None, error=None)
+    try:
+        generation = trust_cache.generation()
+        seller_ids, baselines, txns, revs = load_batch_data(seller_ids)
+
+        def report(phase, done, total):
+            rescore_status.update(phase=phase, done=done, total=total)
+
+        # The pool computes behavioral scores; authenticity comes from each seller's
+        # review state, as on /compute-trust, so both endpoints agree
+        scorer = ParallelScorer(workers=workers, authenticity_model=authenticity_model,
+                                behavioral_engine=behavioral_engine, risk_engine=risk_engine, authenticity=False)
+        components = scorer.score(seller_ids, txns, revs, baselines, progress=report)
+        review_groups = group_by_seller(revs)
+        empty = pd.DataFrame()
+        rescore_status.update(phase="finalizing", done=0, total=len(components))
+        for i, (seller_id, row) in enumerate(components.iterrows(), 1):
+            result = score_seller(seller_id, empty, review_groups.get(seller_id, empty), float(row["baseline"]),
+                                  behavioral_score=float(row["behavioral_score"]), record=seller_id in baselines)
+            trust_cache.put(seller_id, result, generation)
+            rescore_status["done"] = i
+        rescore_status.update(phase="done", sellers=len(components), timings=scorer.timings)
+    except Exception as e:
+        print(f"Error in parallel re-score: {e}")
+        rescore_status["error"] = str(e)
+    finally:
+        rescore_status.update(running=False, finished_at=time.time())
+        rescore_lock.release()
+
+@app.post("/admin/rescore", status_code=202)
+def start_rescore_endpoint(request: RescoreRequest):
+    """Re-score sellers across a process pool in the background; poll GET /admin/rescore."""
+    require_data()
+    if not rescore_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A re-score is already running")
+    rescore_status["running"] = True
+    threading.Thread(target=run_rescore, args=(request.seller_ids, request.workers), daemon=True).start()
+    return rescore_status
+
+@app.get("/admin/rescore")
+def rescore_status_endpoint():
+    return rescore_status
+
+# --- Streaming trust updates ---
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "10000"))
+event_queue = None
+trust_subscribers = set()
+# Streamed sellers with no sellers row: scored, but kept out of the trust history
+stream_unknown_sellers = set()
+
+@app.on_event("startup")
+async def start_event_consumer():
+    global event_queue
+    event_queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    asyncio.create_task(consume_events())
+
+async def consume_events():
+    """Apply queued events one at a time and publish each seller's new score."""
+    while True:
+        event = await event_queue.get()
+        try:
+            await apply_event(event)
+        except Exception as e:
+            print(f"Error applying event for {event.get('seller_id')}: {e}")
+        finally:
+            event_queue.task_done()
+
+async def apply_event(event: dict):
+    seller_id = event['seller_id']
+    generation = trust_cache.generation()
+    seeded_ids = set()
+    if not stream_engine.has(seller_id):
+        await require_data_async()
+        # First event for this seller: start from its stored history once, with the
+        # events logged up to this one; later ones are applied as they come
+        seller_tx, seller_reviews, current_trust, found = await fetch_seller_data(
+            seller_id, events_until=event['received_at'])
+        if not found:
+            stream_unknown_sellers.add(seller_id)
+        await run_in_threadpool(stream_engine.seed, seller_id, seller_tx, seller_reviews, current_trust)
+        for frame in (seller_tx, seller_reviews):
+            if 'id' in frame.columns:
+                seeded_ids.update(frame['id'].astype(str))
+
+    baseline = stream_engine.aggregates[seller_id].baseline
+    previous = trust_cache.get(seller_id)
+    if previous is None:
+        previous = build_trust_result(seller_id, *stream_engine.scores(seller_id), baseline, record=False)
+    # Skip an event the seeded history already contains
+    if event['id'] not in seeded_ids:
+        stream_engine.apply(event)
+
+    result = build_trust_result(seller_id, *stream_engine.scores(seller_id), baseline,
+                                record=seller_id not in stream_unknown_sellers)
+    result["data_source"] = "stream"
+    trust_cache.put(seller_id, result, generation)
+
+    update = {
+        "seller_id": seller_id,
+        "trust_score": result["trust_score"],
+        "change": round(result["trust_score"] - previous["trust_score"], 2),
+        "risk_level": result["risk_level"],
+        "event_type": event['type'],
+        **stream_engine.summary(seller_id),
+        "timestamp": time.time(),
+    }
+    for queue in list(trust_subscribers):
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            pass  # slow subscriber; drop rather than block ingest
+
+@app.post("/events", status_code=202)
+async def ingest_events_endpoint(batch: EventBatch):
+    """
+    Log and queue transaction/review events; scores are updated and published
+    asynchronously. In database mode the batch is stored in trust_events first
+    (503 if that fails, so the producer can retry it).
+    """
+    await require_data_async()
+    events = [event_log.prepare(event.model_dump()) for event in batch.events]
+    if USE_SUPABASE and not await supabase_async.upsert("trust_events", event_log.rows(events)):
+        raise HTTPException(status_code=503, detail="Events could not be stored; retry the batch")
+    event_log.add(events)
+    for event in events:
+        await event_queue.put(event)
+    return {"queued": len(batch.events), "queue_depth": event_queue.qsize()}
+
+@app.get("/events/trust")
+async def trust_updates_endpoint():
+    """Stream score updates produced by ingested events, one JSON object per line."""
+    queue = asyncio.Queue(maxsize=1000)
+    trust_subscribers.add(queue)
+
+    async def generate():
+        try:
+            while True:
+                update = await queue.get()
+                yield json.dumps(update) + "\n"
+        finally:
+            trust_subscribers.discard(queue)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.get("/events/stats")
+def event_stats_endpoint():
+    return {
+        "queue_depth": event_queue.qsize() if event_queue else 0,
+        "subscribers": len(trust_subscribers),
+        "log": event_log.stats(),
+        **stream_engine.stats(),
+    }
+
+@app.post("/cache/invalidate")
+def invalidate_cache_endpoint(request: CacheInvalidateRequest):
+    """Call when new transactions or reviews arrive for the given sellers."""
+    removed = trust_cache.invalidate(request.seller_ids)
+    if request.reset_review_state:
+        review_states.invalidate(request.seller_ids)
+    return {"invalidated": removed, "cache": trust_cache.stats()}
+
+@app.get("/review-state/{seller_id}")
+def review_state_endpoint(seller_id: str):
+    """A seller's serialized AuthenticityState (as kept between /compute-trust calls)."""
+    state = review_states.get(seller_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No review state for seller {seller_id}")
+    with state.lock:
+        return {"seller_id": seller_id, "bytes": state.nbytes(), "state": state.to_dict()}
+
+@app.get("/cache/stats")
+def cache_stats_endpoint():
+    return trust_cache.stats()
+
+@app.get("/upstream/stats")
+def upstream_stats_endpoint():
+    """Per-table Supabase request counts and latency."""
+    return {"sync": supabase.metrics(), "async": supabase_async.metrics(), "history_writer": trust_history.stats()}
+
+# --- Metrics and profiling ---
+
+register_upstream_gauges(metrics, {"sync": supabase, "async": supabase_async})
+metrics.gauge("trustra_trust_cache", lambda: [
+    ({"field": k}, v) for k, v in trust_cache.stats().items() if k not in ("max_size", "ttl_seconds")
+], "Trust cache size, hits, misses, evictions and expirations.")
+metrics.gauge("trustra_loaded_rows", lambda: [] if sellers_df is None else [
+    ({"table": "sellers"}, len(sellers_df)),
+    ({"table": "transactions"}, columnar_store.num_rows("transactions") if columnar_store else len(transactions_df)),
+    ({"table": "reviews"}, columnar_store.num_rows("reviews") if columnar_store else len(reviews_df)),
+], "Rows held for offline scoring.")
+metrics.gauge("trustra_ml_ready", lambda: int(startup_state["phase"] == "ready"),
+              "1 once startup data is loaded (ML_LAZY_INIT=1 serves before that).")
+metrics.gauge("trustra_trust_history", lambda: [
+    ({"field": k}, v) for k, v in trust_history.stats().items() if k != "capacity"
+], "Trust history sellers, pending writes and buffer memory.")
+metrics.gauge("trustra_event_queue_depth", lambda: event_queue.qsize() if event_queue else 0,
+              "Trust events waiting to be applied.")
+metrics.gauge("trustra_local_graph_ready", lambda: 1 if graph_features.engine is not None else 0,
+              "1 once the in-process graph (GRAPH_MODE=local) is loaded.")
+metrics.gauge("trustra_stream_sellers", lambda: len(stream_engine.aggregates),
+              "Sellers with incremental streaming state.")
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: request latency, per-stage timers, upstream timings, sizes, memory."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# GET /debug/profile (PROFILER_ENABLED=1)
+register_profiler_routes(app)
+
+@app.post("/risk/sweep")
+def risk_sweep_endpoint(limit: int = 20):
+    """
+    Decay, volatility and trend for every seller with history in one vectorised
+    pass. Decay is applied to each seller's latest score since it was recorded.
+    """
+    require_data()
+    start = time.perf_counter()
+    seller_ids, scores, last_updated = trust_history.matrix()
+    if not seller_ids:
+        return {"sellers": 0, "trends": {}, "most_volatile": [], "declining": []}
+    latest = scores[:, -1]
+    assessed = risk_engine.assess_all(latest, last_updated, scores)
+    volatility, slope, trend = assessed["volatility"], assessed["slope"], assessed["trend"]
+
+    def summary(i):
+        return {
+            "seller_id": seller_ids[i],
+            "trust_score": round(float(latest[i]), 2),
+            "decayed_trust": round(float(assessed["decayed_trust"][i]), 2),
+            "volatility_index": round(float(volatility[i]), 2),
+            "slope": None if np.isnan(slope[i]) else round(float(slope[i]), 3),
+            "trend": trend[i],
+        }
+
+    declining = np.flatnonzero(trend == "declining")
+    return {
+        "sellers": len(seller_ids),
+        "trends": {label: int(np.count_nonzero(trend == label)) for label in ("improving", "stable", "declining")},
+        "most_volatile": [summary(i) for i in np.argsort(-volatility, kind="stable")[:limit]],
+        "declining": [summary(i) for i in declining[np.argsort(slope[declining], kind="stable")][:limit]],
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+@app.get("/trust-history/{seller_id}")
+def trust_history_endpoint(seller_id: str):
+    """Recent scores for a seller (oldest first) with their volatility and trend."""
+    require_data()
+    history = trust_history.history(seller_id)
+    return {
+        "seller_id": seller_id,
+        "history": history,
+        "volatility_index": round(risk_engine.calculate_volatility(history), 2),
+        "trend": risk_engine.predict_risk_trend(history),
+    }
+
 @app.get("/sellers")
 def get_all_sellers():
+    require_data()
     if USE_SUPABASE:
         rows = sb_query("sellers", {"select": "id,name,baseline_trust_score", "limit": "50"})
         return rows
     else:
         return sellers_df[['id', 'name', 'baseline_trust_score']].head(50).to_dict('records')
+
+import_marks.append(("setup", time.perf_counter()))
+startup_state["import_ms"] = import_breakdown()
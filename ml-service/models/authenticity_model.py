@@ -1,73 +1,409 @@
+import base64
+import bisect
 import re
-from datetime import datetime
-from collections import Counter
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
 import numpy as np
 
+from models.minhash_lsh import MinHashLSH
+from lazy_modules import lazy_module
+
+pd = lazy_module("pandas")
+
+SECONDS_PER_DAY = 86400
+# Review column recording when a row was written; incremental folds resume from it
+INSERTED_COLUMN = 'created_at'
+
+def to_epoch_seconds(timestamps, sort=True):
+    """Parse ISO timestamps into an int64 array of epoch seconds (sorted unless sort=False)."""
+    parsed = pd.to_datetime(pd.Series(list(timestamps), dtype=object), format='ISO8601', utc=True)
+    epochs = ((parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64, copy=True)
+    if sort:
+        epochs.sort()
+    return epochs
+
+def peak_window(epochs, window_seconds):
+    """
+    Sliding-window sweep over sorted epochs.
+    Returns (count, start_index, end_index) of the window holding the most events,
+    where a window ending at t covers (t - window_seconds, t].
+    """
+    if len(epochs) == 0:
+        return 0, 0, 0
+    # First index still inside the window ending at each event
+    starts = np.searchsorted(epochs, epochs - window_seconds, side='right')
+    counts = np.arange(1, len(epochs) + 1) - starts
+    end = int(np.argmax(counts))
+    return int(counts[end]), int(starts[end]), end
+
+def epoch_seconds(timestamp):
+    """One ISO timestamp as epoch seconds (naive times are UTC, like to_epoch_seconds)."""
+    parsed = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() // 1)
+
+class AuthenticityState:
+    """
+    One seller's authenticity inputs, updated a review at a time in fixed memory:
+    the newest review timestamps (burst detection), MinHash fingerprints of the
+    newest reviews (duplicate ratio), match counters and rating counts.
+
+    Fingerprints keep the low 16 bits of each signature value; a spurious match
+    per value has probability 2^-16, so similarity estimates are unchanged in
+    practice. Peak counts above max_timestamps are reported as max_timestamps.
+    At the defaults a state is about 18 KB (2 KB of timestamps, 16 KB of
+    fingerprints) plus the ids inside its cursor overlap. The reviews it indexes
+    for cross-seller checks live in the model's shared, separately capped index.
+    Hold lock while updating or reading a state shared between requests.
+    """
+
+    def __init__(self, max_timestamps=256, max_fingerprints=64):
+        self.lock = threading.Lock()
+        self.max_fingerprints = max_fingerprints
+        self.timestamps = deque(maxlen=max_timestamps)  # epoch seconds, ascending
+        self.fingerprints = None   # (<= max_fingerprints, num_perm) uint16 ring
+        self.next_slot = 0         # ring slot overwritten next once full
+        self.review_count = 0
+        self.duplicate_reviews = 0     # reviews near-duplicating a fingerprinted earlier one
+        self.indexed_reviews = 0
+        self.cross_seller_reviews = 0  # reviews near-duplicating another seller's review
+        self.rating_sum = 0.0
+        self.rating_counts = [0, 0, 0, 0, 0]  # ratings rounded to 1..5
+        self.peak_count = 0
+        self.peak_start = None
+        self.peak_end = None
+        # Newest insertion time folded in (epoch seconds), and the ids folded within
+        # the model's cursor overlap of it; fetches resume from cursor - overlap
+        self.cursor = None
+        self.cursor_ids = {}  # review id -> insertion epoch seconds
+
+    def nbytes(self):
+        return 8 * len(self.timestamps) + (self.fingerprints.nbytes if self.fingerprints is not None else 0)
+
+    def to_dict(self):
+        """JSON-serializable form (fingerprints base64-encoded)."""
+        ring = self.fingerprints
+        return {
+            "max_timestamps": self.timestamps.maxlen,
+            "max_fingerprints": self.max_fingerprints,
+            "timestamps": list(self.timestamps),
+            "fingerprints": base64.b64encode(ring.tobytes()).decode("ascii") if ring is not None else None,
+            "fingerprint_shape": list(ring.shape) if ring is not None else None,
+            "next_slot": self.next_slot,
+            "review_count": self.review_count,
+            "duplicate_reviews": self.duplicate_reviews,
+            "indexed_reviews": self.indexed_reviews,
+            "cross_seller_reviews": self.cross_seller_reviews,
+            "rating_sum": self.rating_sum,
+            "rating_counts": list(self.rating_counts),
+            "peak_count": self.peak_count,
+            "peak_start": self.peak_start,
+            "peak_end": self.peak_end,
+            "cursor": self.cursor,
+            "cursor_ids": dict(sorted(self.cursor_ids.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["max_timestamps"], data["max_fingerprints"])
+        state.timestamps.extend(data["timestamps"])
+        if data["fingerprints"] is not None:
+            raw = base64.b64decode(data["fingerprints"])
+            state.fingerprints = np.frombuffer(raw, dtype=np.uint16).reshape(data["fingerprint_shape"]).copy()
+        for field in ("next_slot", "review_count", "duplicate_reviews", "indexed_reviews", "cross_seller_reviews",
+                      "rating_sum", "peak_count", "peak_start", "peak_end", "cursor"):
+            setattr(state, field, data[field])
+        state.rating_counts = list(data["rating_counts"])
+        state.cursor_ids = dict(data["cursor_ids"])
+        return state
+
 class AuthenticityModel:
-    def __init__(self):
-        pass
+    """
+    Review authenticity from bursts, within-seller duplicates and cross-seller
+    duplicates. The shared text index behind cross-seller checks keeps the
+    newest max_indexed_reviews reviews (about 12 KB each: signature plus LSH
+    bucket entries); older ones are evicted and no longer matched against.
+    Unbounded when max_indexed_reviews is None.
+    """
+
+    def __init__(self, burst_window_days=7, burst_threshold=10, similarity_threshold=0.6,
+                 cursor_overlap_seconds=300, max_indexed_reviews=None):
+        self.burst_window_days = burst_window_days
+        self.burst_threshold = burst_threshold
+        self.similarity_threshold = similarity_threshold
+        # How far behind the newest insertion time a row may still commit (clock skew,
+        # slow transactions); rows inside it are refetched and deduplicated by id
+        self.cursor_overlap_seconds = cursor_overlap_seconds
+        # Shared across sellers; grows incrementally as reviews are indexed
+        self.text_index = MinHashLSH(threshold=similarity_threshold, max_docs=max_indexed_reviews)
 
-    def detect_bursts(self, reviews, time_window_days=7, burst_threshold=10):
+    def index_reviews(self, reviews):
+        """Add reviews (with 'id', 'text', 'seller_id') to the cross-seller text index."""
+        new = [r for r in reviews if r.get('id') is not None and r['id'] not in self.text_index]
+        signatures = self.text_index.signatures_for(r.get('text', '') for r in new)
+        for r, signature in zip(new, signatures):
+            self.text_index.add(r['id'], r.get('text', ''), r.get('seller_id'), signature=signature)
+
+    def detect_bursts(self, reviews, time_window_days=None, burst_threshold=None):
         """
         Detect if a seller received unusually high number of reviews in a short window.
+        Returns a dict with 'is_burst', 'max_rate' (reviews/day) and the peak window
+        ('peak_count', 'peak_start', 'peak_end').
         """
-        if not reviews:
-            return False, 0.0
+        window_days = self.burst_window_days if time_window_days is None else time_window_days
+        threshold = self.burst_threshold if burst_threshold is None else burst_threshold
+        result = {
+            "is_burst": False,
+            "max_rate": 0.0,
+            "peak_count": 0,
+            "peak_start": None,
+            "peak_end": None,
+            "window_days": window_days,
+            "threshold": threshold,
+        }
+        if not reviews or len(reviews) < threshold:
+            return result
 
-        dates = [datetime.fromisoformat(r['timestamp']) for r in reviews]
-        dates.sort()
-        
-        if len(dates) < burst_threshold:
-            return False, 0.0
+        epochs = to_epoch_seconds(r['timestamp'] for r in reviews)
+        # A review counts toward a window while it is less than (window_days + 1)
+        # whole days older than the window end, matching timedelta.days semantics.
+        count, start, end = peak_window(epochs, (window_days + 1) * SECONDS_PER_DAY)
 
-        # Check rolling window
-        max_rate = 0
-        is_burst = False
-        
-        for i in range(len(dates)):
-            window_end = dates[i]
-            # Count reviews in [window_end - time_window, window_end]
-            count = 0
-            for d in dates:
-                if 0 <= (window_end - d).days <= time_window_days:
-                    count += 1
-            
-            rate = count / time_window_days
-            if count >= burst_threshold:
-                is_burst = True
-                max_rate = max(max_rate, rate)
-                
-        return is_burst, max_rate
+        result["peak_count"] = count
+        result["peak_start"] = pd.Timestamp(epochs[start], unit='s').isoformat()
+        result["peak_end"] = pd.Timestamp(epochs[end], unit='s').isoformat()
+        if count >= threshold:
+            result["is_burst"] = True
+            result["max_rate"] = count / window_days
+        return result
 
     def check_text_similarity(self, reviews):
         """
-        Check for duplicate or highly similar review text (basic Jaccard or exact match).
+        Share of a seller's reviews that are near-duplicates of another of its reviews.
+        Reviews are grouped into MinHash/LSH clusters; 0.0 means every text is distinct.
         """
         if not reviews:
             return 0.0
-            
-        texts = [r['text'].lower() for r in reviews]
-        unique_texts = set(texts)
-        
-        # Ratio of unique texts to total reviews
-        uniqueness_ratio = len(unique_texts) / len(texts) if texts else 1.0
+
+        local = MinHashLSH(threshold=self.similarity_threshold)
+        doc_ids = [r.get('id', i) for i, r in enumerate(reviews)]
+        # Read once: the shared index may evict documents meanwhile
+        known = [self.text_index.signatures.get(doc_id) for doc_id in doc_ids]
+        missing = [i for i, signature in enumerate(known) if signature is None]
+        computed = dict(zip(missing, local.signatures_for(reviews[i].get('text', '') for i in missing)))
+        for i, doc_id in enumerate(doc_ids):
+            signature = computed[i] if i in computed else known[i]
+            local.add(doc_id, None, signature=signature)
+
+        duplicates = sum(len(c) - 1 for c in local.clusters())
+        distinct = len(reviews) - duplicates
+
+        # Ratio of distinct texts to total reviews
+        uniqueness_ratio = distinct / len(reviews)
         
         # If low uniqueness, high probability of spam
         return 1.0 - uniqueness_ratio
 
-    def predict_authenticity(self, seller_reviews):
+    def check_cross_seller_similarity(self, reviews):
+        """
+        Share of reviews whose text nearly duplicates a review left for a different
+        seller. Only reviews already in the shared text index are considered, and
+        only against what it holds: offline modes index every review at startup,
+        while in Supabase mode the index only holds the sellers scored so far in
+        this process, so a seller's score can rise as other sellers are scored.
+        """
+        indexed = [r['id'] for r in reviews if r.get('id') in self.text_index]
+        if not indexed:
+            return 0.0
+        shared = sum(1 for doc_id in indexed if self.text_index.has_cross_seller_match(doc_id))
+        return shared / len(indexed)
+
+    def combine_signals(self, is_burst, spam_score, cross_seller_score):
+        """
+        Turn the burst flag and similarity scores into a 0-1 authenticity score.
+        Works on scalars or on whole NumPy columns.
+        """
+        base_score = 1.0 - np.where(is_burst, 0.4, 0.0)
+        base_score = base_score - np.where(spam_score > 0.2, spam_score * 0.5, 0.0)
+        base_score = base_score - np.where(cross_seller_score > 0.2, cross_seller_score * 0.3, 0.0)
+        return np.maximum(0.0, base_score) if np.ndim(base_score) else max(0.0, float(base_score))
+
+    # --- Incremental per-seller state ---
+
+    def new_state(self, max_timestamps=256, max_fingerprints=64):
+        return AuthenticityState(max(max_timestamps, self.burst_threshold), max_fingerprints)
+
+    def update_state(self, state, review, seller_id=None, signature=None, epoch=None):
+        """
+        Fold one review ('id', 'text', 'rating', 'timestamp') into a seller's
+        state in O(1) amortized time (bounded by the state's sizes). Reviews with
+        an id also join the shared text index for cross-seller checks. A new
+        review is compared with earlier ones; earlier ones are not re-checked.
+        """
+        state.review_count += 1
+        rating = review.get('rating')
+        if rating is not None and not pd.isna(rating):
+            state.rating_sum += float(rating)
+            state.rating_counts[min(4, max(0, int(round(float(rating))) - 1))] += 1
+
+        # Duplicate ratio against the fingerprint ring
+        doc_id = review.get('id')
+        if signature is None and doc_id is not None:
+            signature = self.text_index.signatures.get(doc_id)
+        if signature is None:
+            signature = self.text_index.signature(review.get('text') or '')
+        fingerprint = (signature & 0xFFFF).astype(np.uint16)
+        ring = state.fingerprints
+        if ring is not None and len(ring):
+            matches = np.count_nonzero(ring == fingerprint, axis=1) / len(fingerprint)
+            if matches.max() >= self.similarity_threshold:
+                state.duplicate_reviews += 1
+        if ring is None:
+            state.fingerprints = fingerprint[None, :]
+        elif len(ring) < state.max_fingerprints:
+            state.fingerprints = np.vstack([ring, fingerprint])
+        else:
+            ring[state.next_slot] = fingerprint
+            state.next_slot = (state.next_slot + 1) % state.max_fingerprints
+
+        if doc_id is not None:
+            self.text_index.add(doc_id, review.get('text') or '', seller_id, signature=signature)
+            state.indexed_reviews += 1
+            if self.text_index.has_cross_seller_match(doc_id):
+                state.cross_seller_reviews += 1
+
+        timestamp = review.get('timestamp')
+        if epoch is None and timestamp:
+            epoch = epoch_seconds(timestamp)
+        if epoch is not None:
+            self._add_timestamp(state, epoch)
+
+    def _add_timestamp(self, state, t):
+        """
+        Insert into the sorted timestamp deque and update the peak burst window.
+        An out-of-order t also falls in windows ending at later kept timestamps,
+        so every window ending in [t, t + window) is re-counted.
+        """
+        window = state.timestamps
+        window_seconds = (self.burst_window_days + 1) * SECONDS_PER_DAY
+        if window and t < window[-1]:
+            if len(window) == window.maxlen:
+                if t <= window[0]:
+                    return  # older than everything kept
+                window.popleft()
+            window.insert(bisect.bisect_right(window, t), t)
+        else:
+            window.append(t)
+        lo = bisect.bisect_left(window, t)
+        hi = bisect.bisect_left(window, t + window_seconds)
+        for end in sorted(set(window[i] for i in range(lo, hi))):
+            first = bisect.bisect_right(window, end - window_seconds)
+            count = bisect.bisect_right(window, end) - first
+            if count > state.peak_count:
+                state.peak_count, state.peak_start, state.peak_end = count, window[first], end
+
+    def reviews_since(self, state):
         """
-        Returns a score 0-1 (1 = authentic, 0 = fake)
+        ISO insertion time (UTC) from which to fetch reviews the state may not
+        have folded in yet, or None to fetch them all.
         """
-        is_burst, burst_rate = self.detect_bursts(seller_reviews)
+        if state.cursor is None:
+            return None
+        return datetime.fromtimestamp(state.cursor - self.cursor_overlap_seconds, timezone.utc).isoformat()
+
+    def update_state_many(self, state, reviews_df, seller_id=None):
+        """
+        Fold a frame of reviews into the state in timestamp order, skipping rows
+        already folded in, so the frame may overlap earlier ones. Returns how
+        many were applied.
+
+        Rows are tracked by insertion time (INSERTED_COLUMN), not review
+        timestamp, so a late or backdated review is still folded in when it
+        arrives. Rows inserted within cursor_overlap_seconds of the newest one
+        seen are deduplicated by id; older ones were seen already. Frames
+        without INSERTED_COLUMN (the offline CSV/columnar data) fall back to the
+        review timestamp, which is only safe for data that is not appended to.
+        """
+        if reviews_df.empty:
+            return 0
+        epochs = to_epoch_seconds(reviews_df['timestamp'], sort=False)
+        if INSERTED_COLUMN in reviews_df.columns:
+            inserted = to_epoch_seconds(reviews_df[INSERTED_COLUMN], sort=False)
+        else:
+            inserted = epochs
+        ids = reviews_df['id'].to_numpy(dtype=object) if 'id' in reviews_df.columns else np.full(len(reviews_df), None)
+        keep = np.ones(len(reviews_df), dtype=bool)
+        if state.cursor is not None:
+            unseen = np.fromiter((i is not None and i not in state.cursor_ids for i in ids),
+                                 dtype=bool, count=len(ids))
+            # Rows without an id can't be deduplicated; take them only past the cursor
+            keep = (inserted > state.cursor) | ((inserted >= state.cursor - self.cursor_overlap_seconds) & unseen)
+        rows = np.flatnonzero(keep)
+        if len(rows) == 0:
+            return 0
+        rows = rows[np.argsort(epochs[rows], kind='stable')]
+
+        newest = int(inserted[rows].max())
+        state.cursor = newest if state.cursor is None else max(state.cursor, newest)
+        horizon = state.cursor - self.cursor_overlap_seconds
+        for i in rows.tolist():
+            if ids[i] is not None:
+                state.cursor_ids[ids[i]] = int(inserted[i])
+        state.cursor_ids = {k: v for k, v in state.cursor_ids.items() if v >= horizon}
+
+        texts = reviews_df['text'].to_numpy(dtype=object) if 'text' in reviews_df.columns else np.full(len(reviews_df), '')
+        ratings = reviews_df['rating'].to_numpy() if 'rating' in reviews_df.columns else np.full(len(reviews_df), None)
+        timestamps = reviews_df['timestamp'].to_numpy(dtype=object)
+        # Signatures for texts not yet in the shared index, computed in one batch
+        missing = [i for i in rows.tolist() if ids[i] is None or ids[i] not in self.text_index]
+        computed = dict(zip(missing, self.text_index.signatures_for(texts[i] or '' for i in missing)))
+        for i in rows.tolist():
+            review = {'id': ids[i], 'text': texts[i], 'rating': ratings[i], 'timestamp': timestamps[i]}
+            self.update_state(state, review, seller_id, signature=computed.get(i), epoch=int(epochs[i]))
+        return len(rows)
+
+    def score_state(self, state, return_evidence=False):
+        """predict_authenticity from a seller's incremental state instead of its review list."""
+        bursts = {
+            "is_burst": False,
+            "max_rate": 0.0,
+            "peak_count": 0,
+            "peak_start": None,
+            "peak_end": None,
+            "window_days": self.burst_window_days,
+            "threshold": self.burst_threshold,
+        }
+        if state.review_count >= self.burst_threshold and state.peak_end is not None:
+            bursts["peak_count"] = state.peak_count
+            bursts["peak_start"] = pd.Timestamp(state.peak_start, unit='s').isoformat()
+            bursts["peak_end"] = pd.Timestamp(state.peak_end, unit='s').isoformat()
+            if state.peak_count >= self.burst_threshold:
+                bursts["is_burst"] = True
+                bursts["max_rate"] = state.peak_count / self.burst_window_days
+
+        spam_score = state.duplicate_reviews / state.review_count if state.review_count else 0.0
+        cross_seller_score = state.cross_seller_reviews / state.indexed_reviews if state.indexed_reviews else 0.0
+        score = self.combine_signals(bursts["is_burst"], spam_score, cross_seller_score)
+        if return_evidence:
+            return score, {"burst": bursts, "spam_score": spam_score, "cross_seller_score": cross_seller_score}
+        return score
+
+    def predict_authenticity(self, seller_reviews, return_evidence=False):
+        """
+        Returns a score 0-1 (1 = authentic, 0 = fake).
+        With return_evidence=True, returns (score, evidence) where evidence holds
+        the burst result and spam score behind it.
+        """
+        bursts = self.detect_bursts(seller_reviews)
         spam_score = self.check_text_similarity(seller_reviews)
-        
-        base_score = 1.0
-        
-        if is_burst:
-            base_score -= 0.4
-            
-        if spam_score > 0.2:
-            base_score -= (spam_score * 0.5)
-            
-        return max(0.0, base_score)
+        cross_seller_score = self.check_cross_seller_similarity(seller_reviews)
+        score = self.combine_signals(bursts["is_burst"], spam_score, cross_seller_score)
+        if return_evidence:
+            return score, {
+                "burst": bursts,
+                "spam_score": spam_score,
+                "cross_seller_score": cross_seller_score,
+            }
+        return score
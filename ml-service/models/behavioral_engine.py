@@ -1,6 +1,12 @@
-import pandas as pd
 import numpy as np
-from scipy.stats import zscore
+from lazy_modules import lazy_module
+
+pd = lazy_module("pandas")
+
+# Delivery within this many days counts as on-time
+ONTIME_MAX_DAYS = 5
+
+FEATURE_COLUMNS = ['ontime_rate', 'return_rate', 'cancellation_rate', 'dispute_rate']
 
 class BehavioralEngine:
     def __init__(self):
@@ -15,8 +21,7 @@ class BehavioralEngine:
 
         # Feature 1: On-time Delivery Rate
         # Assume 'delivery_time_days' <= 5 is on-time
-        transactions_df['is_ontime'] = transactions_df['delivery_time_days'] <= 5
-        ontime_rate = transactions_df['is_ontime'].mean()
+        ontime_rate = (transactions_df['delivery_time_days'] <= ONTIME_MAX_DAYS).mean()
 
         # Feature 2: Return Rate
         # Status 'refunded' counts as return
@@ -36,10 +41,15 @@ class BehavioralEngine:
             avg_rating = 0.0
             rating_count = 0
 
-        # Composite Score Calculation (Simplified for now)
+        return self._composite_score(ontime_rate, return_rate, cancellation_rate, dispute_rate)
+
+    def _composite_score(self, ontime_rate, return_rate, cancellation_rate, dispute_rate):
+        """
+        Composite Score Calculation (Simplified for now).
+        Works on scalars or on whole NumPy/pandas columns.
+        """
         # Weights: OnTime (0.3), Return (-0.2), Cancel (-0.2), Dispute (-0.3)
         # Rating is handled separately
-        
         behavioral_score = (
             (ontime_rate * 0.3) - 
             (return_rate * 0.2) - 
@@ -50,12 +60,69 @@ class BehavioralEngine:
         # Normalize to 0-1 range roughly (considering negatives)
         # Base score 0.5 + behavioral_score
         final_score = 0.5 + behavioral_score
-        return max(0.0, min(1.0, final_score))
+        return np.clip(final_score, 0.0, 1.0) if np.ndim(final_score) else max(0.0, min(1.0, final_score))
+
+    def compute_all(self, transactions_df, reviews_df):
+        """
+        Compute behavioral features for every seller in one groupby pass.
+        Returns a DataFrame indexed by seller_id with the per-seller rates,
+        rating stats and the same 'behavioral_score' as compute_metrics.
+        """
+        columns = FEATURE_COLUMNS + ['transaction_count', 'avg_rating', 'rating_count', 'behavioral_score']
+
+        if transactions_df.empty:
+            features = pd.DataFrame(columns=FEATURE_COLUMNS + ['transaction_count'], dtype=float)
+        else:
+            status = transactions_df['status'].to_numpy()
+            flags = pd.DataFrame({
+                'ontime_rate': (transactions_df['delivery_time_days'] <= ONTIME_MAX_DAYS).to_numpy(),
+                'return_rate': status == 'refunded',
+                'cancellation_rate': status == 'cancelled',
+                'dispute_rate': status == 'disputed',
+            })
+            grouped = flags.groupby(transactions_df['seller_id'].to_numpy(), sort=False)
+            features = grouped.mean()
+            features['transaction_count'] = grouped.size()
+
+        if not reviews_df.empty:
+            ratings = reviews_df.groupby('seller_id', sort=False)['rating'].agg(['mean', 'size'])
+            ratings.columns = ['avg_rating', 'rating_count']
+            features = features.join(ratings, how='outer')
+        else:
+            features['avg_rating'] = 0.0
+            features['rating_count'] = 0
+
+        features = features.fillna({
+            'ontime_rate': 0.0, 'return_rate': 0.0, 'cancellation_rate': 0.0, 'dispute_rate': 0.0,
+            'transaction_count': 0, 'avg_rating': 0.0, 'rating_count': 0,
+        })
+        features['transaction_count'] = features['transaction_count'].astype(int)
+        features['rating_count'] = features['rating_count'].astype(int)
+
+        score = self._composite_score(
+            features['ontime_rate'].to_numpy(dtype=float),
+            features['return_rate'].to_numpy(dtype=float),
+            features['cancellation_rate'].to_numpy(dtype=float),
+            features['dispute_rate'].to_numpy(dtype=float),
+        )
+        # Sellers without transactions score 0.0, as in compute_metrics
+        features['behavioral_score'] = np.where(features['transaction_count'].to_numpy() > 0, score, 0.0)
+        features.index.name = 'seller_id'
+        return features[columns]
 
     def normalize_features(self, df):
         """
         Apply Z-score normalization to features across all sellers
         """
-        # numerical_cols = ['ontime_rate', 'return_rate', 'cancellation_rate', 'dispute_rate']
-        # df[numerical_cols] = df[numerical_cols].apply(zscore)
+        numerical_cols = [c for c in FEATURE_COLUMNS if c in df.columns]
+        df = df.copy()
+        if len(df) < 2:
+            df[numerical_cols] = 0.0
+            return df
+        values = df[numerical_cols].to_numpy(dtype=float)
+        # Population z-score (ddof=0), as scipy.stats.zscore; numpy keeps scipy off the import path
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scaled = (values - values.mean(axis=0)) / values.std(axis=0)
+        # Constant columns carry no signal; their z-score is NaN
+        df[numerical_cols] = np.nan_to_num(scaled, nan=0.0)
         return df
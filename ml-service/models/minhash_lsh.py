@@ -0,0 +1,213 @@
+import re
+import threading
+import zlib
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[^a-z0-9]+")
+
+def shingles(text, k=4):
+    """Character k-gram shingles of normalized text (lowercase, punctuation collapsed)."""
+    normalized = _TOKEN_RE.sub(" ", str(text).lower()).strip()
+    if len(normalized) <= k:
+        return {normalized}
+    return {normalized[i : i + k] for i in range(len(normalized) - k + 1)}
+
+class MinHashLSH:
+    """
+    MinHash signatures plus a banded locality-sensitive-hashing index.
+
+    Documents (reviews) are added incrementally; each add only touches the
+    buckets of its own bands, so finding near-duplicates is sub-quadratic.
+    Candidates from shared buckets are confirmed by estimated Jaccard similarity.
+    Adds, removes and bucket lookups hold one lock, so a shared index can be
+    filled and queried from several request threads. With max_docs set, adding
+    past it evicts the oldest documents first.
+    """
+
+    def __init__(self, num_perm=128, bands=32, threshold=0.6, shingle_size=4, seed=42, max_docs=None):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_docs = max_docs
+        self.evicted = 0
+
+        # Multiply-shift hashing: (a * x + b) mod 2^64, keep the high 32 bits.
+        # uint64 arithmetic wraps, so no modulo is needed.
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+
+        self.signatures = {}   # doc_id -> signature (uint32 array), oldest first
+        self.owners = {}       # doc_id -> seller_id
+        # band -> {band bytes: {seller_id: [doc_id]}}; grouping by owner keeps
+        # cross-seller checks proportional to the sellers in a bucket, not its size
+        self.buckets = [dict() for _ in range(bands)]
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.signatures
+
+    def _hash(self, hashed):
+        """Apply all num_perm hash functions to shingle hashes -> (num_perm, n) uint32."""
+        with np.errstate(over='ignore'):
+            return ((np.outer(self._a, hashed) + self._b[:, None]) >> np.uint64(32)).astype(np.uint32)
+
+    def signature(self, text):
+        """Compute the MinHash signature of a text."""
+        hashed = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)),
+            dtype=np.uint64,
+        )
+        return self._hash(hashed).min(axis=1)
+
+    def signatures_for(self, texts, chunk_shingles=32768):
+        """
+        Compute signatures for many texts at once. Shingle hashes are hashed in
+        chunks of about chunk_shingles columns and reduced per document.
+        """
+        hashed, offsets = [], []
+        for text in texts:
+            values = [zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)]
+            offsets.append(len(values))
+            hashed.extend(values)
+        if not offsets:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        hashed = np.asarray(hashed, dtype=np.uint64)
+        ends = np.cumsum(offsets)
+        starts = ends - np.asarray(offsets)
+
+        result = np.empty((len(offsets), self.num_perm), dtype=np.uint32)
+        doc = 0
+        while doc < len(offsets):
+            # Take as many whole documents as fit in one chunk (at least one)
+            last = max(doc + 1, int(np.searchsorted(ends, starts[doc] + chunk_shingles, side='right')))
+            lo, hi = starts[doc], ends[last - 1]
+            values = self._hash(hashed[lo:hi])
+            result[doc:last] = np.minimum.reduceat(values, starts[doc:last] - lo, axis=1).T
+            doc = last
+        return result
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity of two signatures."""
+        return np.count_nonzero(sig_a == sig_b) / self.num_perm
+
+    def add(self, doc_id, text, seller_id=None, signature=None):
+        """
+        Index one document. Re-adding a known doc_id is a no-op.
+        A signature computed elsewhere (same parameters) can be passed in.
+        """
+        existing = self.signatures.get(doc_id)
+        if existing is not None:
+            return existing
+        if signature is None:
+            signature = self.signature(text)
+        keys = self._band_keys(signature)
+        with self._lock:
+            if doc_id in self.signatures:
+                return self.signatures[doc_id]
+            self.signatures[doc_id] = signature
+            self.owners[doc_id] = seller_id
+            for band, key in enumerate(keys):
+                self.buckets[band].setdefault(key, {}).setdefault(seller_id, []).append(doc_id)
+            while self.max_docs is not None and len(self.signatures) > self.max_docs:
+                self._remove(next(iter(self.signatures)))
+                self.evicted += 1
+        return signature
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        owner = self.owners.pop(doc_id, None)
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket is None or owner not in bucket:
+                continue
+            bucket[owner].remove(doc_id)
+            if not bucket[owner]:
+                del bucket[owner]
+            if not bucket:
+                del self.buckets[band][key]
+
+    def clusters(self, doc_ids=None, min_size=2):
+        """
+        Group documents into near-duplicate clusters (connected components of
+        candidate pairs whose estimated similarity clears the threshold).
+        Identical signatures are merged directly; then within each LSH bucket
+        every pair not already in one cluster is compared, a row at a time.
+        Restrict to doc_ids if given.
+        """
+        with self._lock:
+            members = list(self.signatures) if doc_ids is None else [d for d in doc_ids if d in self.signatures]
+            signature_of = {d: self.signatures[d] for d in members}
+            buckets = [[d for docs in bucket.values() for d in docs]
+                       for band_buckets in self.buckets for bucket in band_buckets.values()
+                       if len(bucket) > 1 or len(next(iter(bucket.values()))) > 1]
+
+        # Collapse exact-duplicate signatures to one representative
+        by_signature = {}
+        for doc_id in members:
+            by_signature.setdefault(signature_of[doc_id].tobytes(), []).append(doc_id)
+        representative = {docs[0] for docs in by_signature.values()}
+        parent = {d: d for d in representative}
+
+        def find(d):
+            while parent[d] != d:
+                parent[d] = parent[parent[d]]
+                d = parent[d]
+            return d
+
+        for bucket in buckets:
+            in_scope = [d for d in bucket if d in representative]
+            if len(in_scope) < 2:
+                continue
+            signatures = np.stack([signature_of[d] for d in in_scope])
+            for i in range(len(in_scope) - 1):
+                root = find(in_scope[i])
+                rest = [j for j in range(i + 1, len(in_scope)) if find(in_scope[j]) != root]
+                if not rest:
+                    continue
+                sims = np.count_nonzero(signatures[rest] == signatures[i], axis=1) / self.num_perm
+                for j in np.asarray(rest)[sims >= self.threshold].tolist():
+                    root_a, root_b = find(in_scope[i]), find(in_scope[j])
+                    if root_a != root_b:
+                        parent[root_b] = root_a
+
+        groups = {}
+        for docs in by_signature.values():
+            groups.setdefault(find(docs[0]), []).extend(docs)
+        return [g for g in groups.values() if len(g) >= min_size]
+
+    def has_cross_seller_match(self, doc_id):
+        """True if doc_id nearly duplicates a document owned by a different seller."""
+        with self._lock:
+            owner = self.owners.get(doc_id)
+            signature = self.signatures.get(doc_id)
+            if signature is None:
+                return False  # evicted
+            checked = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                for other_owner, docs in self.buckets[band].get(key, {}).items():
+                    if other_owner == owner:
+                        continue
+                    for other in docs:
+                        if other in checked:
+                            continue
+                        checked.add(other)
+                        if self.similarity(signature, self.signatures[other]) >= self.threshold:
+                            return True
+        return False
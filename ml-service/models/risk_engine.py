@@ -1,5 +1,31 @@
+import time
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+SECONDS_PER_DAY = 86400
+# Slope (points per step) beyond which a trend counts as improving/declining
+TREND_SLOPE = 5
+TREND_WINDOW = 5
+
+def history_matrix(values, offsets, width=None):
+    """
+    Pack ragged per-seller histories into a NaN-padded matrix.
+    Seller i's scores are values[offsets[i]:offsets[i + 1]], oldest first; row i
+    holds its most recent `width` scores right-aligned (newest in the last column).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if width is None and len(lengths) else (width or 0)
+    matrix = np.full((len(lengths), width), np.nan)
+    if width == 0 or len(values) == 0:
+        return matrix
+    # Position of every value counted back from its seller's newest score
+    seller = np.repeat(np.arange(len(lengths)), lengths)
+    from_end = offsets[seller + 1] - 1 - np.arange(len(values))
+    keep = from_end < width
+    matrix[seller[keep], width - 1 - from_end[keep]] = values[keep]
+    return matrix
 
 class RiskEngine:
     def __init__(self, decay_lambda=0.05):
@@ -14,7 +40,9 @@ class RiskEngine:
             return current_trust
             
         last_updated = datetime.fromisoformat(last_updated_str)
-        delta_t = (datetime.now() - last_updated).days
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)
+        delta_t = (datetime.now(timezone.utc) - last_updated).days
         
         if delta_t <= 0:
             return current_trust
@@ -56,3 +84,89 @@ class RiskEngine:
             return "declining"
         else:
             return "stable"
+
+    def combine_trust(self, decayed_trust, behavioral_score, authenticity_score, alpha=0.3):
+        """
+        Blend decayed trust with current performance (0-1 components) on the
+        0-1000 scale. Works on scalars or on whole NumPy columns.
+        """
+        raw_performance = (behavioral_score * 0.6 + authenticity_score * 0.4) * 1000
+        final_score = (decayed_trust * (1 - alpha)) + (raw_performance * alpha)
+        return np.clip(final_score, 0, 1000) if np.ndim(final_score) else max(0, min(1000, final_score))
+
+    def apply_graph_risk(self, trust, clustering, collusion, weight=0.3):
+        """
+        Discount trust by graph risk: the larger of the seller's clustering
+        coefficient and buyer-overlap collusion score (both 0-1). Full risk
+        removes `weight` of the score.
+        """
+        risk = min(1.0, max(clustering, collusion, 0.0))
+        return trust * (1 - weight * risk)
+
+    # --- Array versions: one NumPy pass over every seller ---
+
+    def temporal_trust_all(self, current_trust, last_updated, now=None):
+        """
+        calculate_temporal_trust for whole columns. last_updated holds epoch
+        seconds (NaN = never updated); decay uses whole elapsed days.
+        """
+        current_trust = np.asarray(current_trust, dtype=np.float64)
+        last_updated = np.asarray(last_updated, dtype=np.float64)
+        now = time.time() if now is None else now
+        with np.errstate(invalid='ignore'):
+            delta_days = np.floor((now - last_updated) / SECONDS_PER_DAY)
+        delta_days = np.where(np.isnan(delta_days) | (delta_days <= 0), 0.0, delta_days)
+        return current_trust * np.exp(-self.decay_lambda * delta_days)
+
+    def volatility_all(self, scores):
+        """calculate_volatility for every row of a NaN-padded (sellers x history) matrix."""
+        scores = np.asarray(scores, dtype=np.float64)
+        valid = ~np.isnan(scores)
+        n = valid.sum(axis=1)
+        filled = np.where(valid, scores, 0.0)
+        mean = filled.sum(axis=1) / np.maximum(n, 1)
+        var = np.where(valid, (filled - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(n, 1)
+        volatility = np.minimum(100.0, np.sqrt(var) / 50.0 * 100)
+        return np.where(n < 2, 0.0, volatility)
+
+    def slope_all(self, scores, window=TREND_WINDOW):
+        """
+        Closed-form least-squares slope of each row's last `window` scores
+        (NaN where a seller has fewer than `window` scores).
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.shape[1] < window:
+            return np.full(len(scores), np.nan)
+        recent = scores[:, -window:]
+        x = np.arange(window) - (window - 1) / 2.0
+        # sum((x - x_mean) * y) / sum((x - x_mean)^2); NaN rows stay NaN
+        return recent @ x / (x @ x)
+
+    def trend_all(self, scores, window=TREND_WINDOW):
+        """predict_risk_trend for every row: 'improving', 'declining' or 'stable'."""
+        return self._trend_labels(self.slope_all(scores, window))
+
+    def _trend_labels(self, slope):
+        trend = np.full(len(slope), "stable", dtype=object)
+        trend[slope > TREND_SLOPE] = "improving"
+        trend[slope < -TREND_SLOPE] = "declining"
+        return trend
+
+    def assess_all(self, current_trust, last_updated, scores, now=None, chunk_rows=131072):
+        """
+        Decay, volatility, slope and trend for every seller. The history matrix
+        is processed in row chunks so temporaries stay small at 10^6 sellers.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        volatility = np.empty(len(scores))
+        slope = np.empty(len(scores))
+        for start in range(0, len(scores), chunk_rows):
+            block = scores[start:start + chunk_rows]
+            volatility[start:start + chunk_rows] = self.volatility_all(block)
+            slope[start:start + chunk_rows] = self.slope_all(block)
+        return {
+            "decayed_trust": self.temporal_trust_all(current_trust, last_updated, now),
+            "volatility": volatility,
+            "slope": slope,
+            "trend": self._trend_labels(slope),
+        }
@@ -0,0 +1,126 @@
+import itertools
+
+import numpy as np
+
+from models.authenticity_model import AuthenticityState, epoch_seconds
+from models.behavioral_engine import ONTIME_MAX_DAYS
+
+class SellerAggregate:
+    """Running per-seller counters behind the behavioral score, plus the seller's AuthenticityState."""
+
+    __slots__ = ("baseline", "tx_count", "ontime", "refunded", "cancelled", "disputed", "reviews")
+
+    def __init__(self, baseline=500.0, reviews=None):
+        self.baseline = baseline
+        self.tx_count = 0
+        self.ontime = 0
+        self.refunded = 0
+        self.cancelled = 0
+        self.disputed = 0
+        self.reviews = reviews if reviews is not None else AuthenticityState()
+
+    def status_counts(self, status, delta):
+        if status == 'refunded':
+            self.refunded += delta
+        elif status == 'cancelled':
+            self.cancelled += delta
+        elif status == 'disputed':
+            self.disputed += delta
+
+class StreamingTrustEngine:
+    """
+    Keeps a SellerAggregate per seller so a transaction or review event updates
+    the seller's behavioral and authenticity scores without rereading its history.
+
+    A seller is seeded once from its full history; after that each event costs a
+    few counter updates and one AuthenticityModel.update_state, so memory per
+    seller stays fixed however many reviews it receives.
+    The text signals are incremental approximations: a new review is checked
+    against earlier reviews, but earlier reviews are not re-checked against it.
+    """
+
+    def __init__(self, behavioral_engine, authenticity_model):
+        self.behavioral_engine = behavioral_engine
+        self.authenticity_model = authenticity_model
+        self.aggregates = {}
+        self.events_applied = 0
+        self._ids = itertools.count()
+
+    def has(self, seller_id):
+        return seller_id in self.aggregates
+
+    def seed(self, seller_id, transactions_df, reviews_df, baseline=500.0):
+        """Build a seller's aggregate from its full transaction and review history."""
+        agg = SellerAggregate(baseline, self.authenticity_model.new_state())
+        if not transactions_df.empty:
+            status = transactions_df['status'].to_numpy()
+            agg.tx_count = len(transactions_df)
+            agg.ontime = int((transactions_df['delivery_time_days'] <= ONTIME_MAX_DAYS).sum())
+            agg.refunded = int(np.count_nonzero(status == 'refunded'))
+            agg.cancelled = int(np.count_nonzero(status == 'cancelled'))
+            agg.disputed = int(np.count_nonzero(status == 'disputed'))
+
+        self.authenticity_model.update_state_many(agg.reviews, reviews_df, seller_id)
+        self.aggregates[seller_id] = agg
+        return agg
+
+    def apply(self, event):
+        """
+        Fold one event into its seller's aggregate.
+        event['type'] is 'transaction' (status, delivery_time_days and optionally
+        previous_status for a status change) or 'review' (id, rating, text, timestamp).
+        """
+        agg = self.aggregates.get(event['seller_id'])
+        if agg is None:
+            agg = self.aggregates[event['seller_id']] = SellerAggregate(reviews=self.authenticity_model.new_state())
+        if event['type'] == 'transaction':
+            self._apply_transaction(agg, event)
+        else:
+            self._apply_review(agg, event)
+        self.events_applied += 1
+        return agg
+
+    def _apply_transaction(self, agg, event):
+        if event.get('previous_status'):
+            # Status change of a known transaction: move it between buckets
+            agg.status_counts(event['previous_status'], -1)
+        else:
+            agg.tx_count += 1
+            delivery = event.get('delivery_time_days')
+            if delivery is not None and delivery <= ONTIME_MAX_DAYS:
+                agg.ontime += 1
+        agg.status_counts(event.get('status'), 1)
+
+    def _apply_review(self, agg, event):
+        review = {**event, 'id': event.get('id') or f"stream-{next(self._ids)}"}
+        self.authenticity_model.update_state(agg.reviews, review, event['seller_id'])
+
+    def scores(self, seller_id):
+        """(behavioral_score, authenticity_score, evidence) from the seller's aggregate."""
+        agg = self.aggregates[seller_id]
+        model = self.authenticity_model
+
+        if agg.tx_count:
+            n = agg.tx_count
+            behavioral = self.behavioral_engine._composite_score(
+                agg.ontime / n, agg.refunded / n, agg.cancelled / n, agg.disputed / n)
+        else:
+            behavioral = 0.0
+
+        authenticity, evidence = model.score_state(agg.reviews, return_evidence=True)
+        return behavioral, authenticity, evidence
+
+    def summary(self, seller_id):
+        agg = self.aggregates[seller_id]
+        return {
+            "transaction_count": agg.tx_count,
+            "review_count": agg.reviews.review_count,
+            "avg_rating": round(agg.reviews.rating_sum / agg.reviews.review_count, 3) if agg.reviews.review_count else 0.0,
+        }
+
+    def stats(self):
+        return {
+            "sellers": len(self.aggregates),
+            "events_applied": self.events_applied,
+            "review_state_bytes": sum(agg.reviews.nbytes() for agg in list(self.aggregates.values())),
+        }
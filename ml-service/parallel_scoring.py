@@ -0,0 +1,393 @@
+"""
+TRUSTRA - Parallel full-population scoring
+Shards sellers by a stable hash and scores the shards in a process pool.
+Columnar inputs (codes, numbers, UTF-8 text bytes + offsets) and outputs live
+in one shared-memory block, so workers never receive pickled DataFrames.
+
+  Phase 1 (per shard): behavioral rates, MinHash signatures, burst windows and
+                       within-seller spam clusters.
+  Phase 2 (per band):  cross-seller near-duplicate flags from the shared
+                       signature matrix.
+  Merge  (parent):     authenticity and trust scores for every seller at once.
+
+Usage:
+    python parallel_scoring.py --workers 8
+    python parallel_scoring.py --bench 1,2,4,8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from models.authenticity_model import AuthenticityModel, SECONDS_PER_DAY, peak_window, to_epoch_seconds
+from models.behavioral_engine import BehavioralEngine, ONTIME_MAX_DAYS
+from models.minhash_lsh import MinHashLSH
+from models.risk_engine import RiskEngine
+from lazy_modules import lazy_module
+
+pd = lazy_module("pandas")
+
+STATUS_CODES = {'refunded': 1, 'cancelled': 2, 'disputed': 3}
+# Cap on the (docs x representatives x num_perm) comparison block in phase 2
+COMPARE_BLOCK_BYTES = 32 * 1024 * 1024
+
+def shard_of(seller_id, num_shards):
+    """Stable across processes and runs (unlike hash())."""
+    return zlib.crc32(str(seller_id).encode("utf-8")) % num_shards
+
+class SharedArrays:
+    """Named NumPy arrays packed into one shared-memory block."""
+
+    ALIGN = 64
+
+    def __init__(self, arrays):
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[name] = (offset, array.dtype.str, array.shape)
+            offset += -(-max(array.nbytes, 1) // self.ALIGN) * self.ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.spec = {"name": self.shm.name, "layout": layout}
+        self.arrays = self._views(self.shm, layout)
+        for name, array in arrays.items():
+            self.arrays[name][...] = array
+
+    @staticmethod
+    def _views(shm, layout):
+        return {
+            name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout.items()
+        }
+
+    @staticmethod
+    def attach(spec):
+        # Pool workers share the parent's resource tracker, which unlinks the block once
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        return shm, SharedArrays._views(shm, spec["layout"])
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+        self.shm.unlink()
+
+# --- Worker side ---
+
+_WORKER = {}
+
+def _init_worker(spec, params):
+    shm, arrays = SharedArrays.attach(spec)
+    _WORKER.update(shm=shm, arrays=arrays, params=params,
+                   lsh=MinHashLSH(threshold=params["similarity_threshold"]),
+                   behavioral=BehavioralEngine())
+
+def _score_shard(shard):
+    """Phase 1 for the sellers of one shard (a contiguous seller range)."""
+    a, p, lsh = _WORKER["arrays"], _WORKER["params"], _WORKER["lsh"]
+    s0, s1 = int(a["shard_offsets"][shard]), int(a["shard_offsets"][shard + 1])
+    if s0 == s1:
+        return shard
+
+    # Behavioral rates from per-seller counts
+    tx_off = a["tx_offsets"]
+    t0, t1 = int(tx_off[s0]), int(tx_off[s1])
+    counts = np.diff(tx_off[s0:s1 + 1])
+    local = np.repeat(np.arange(s1 - s0), counts)
+    status = a["tx_status"][t0:t1]
+    n = np.maximum(counts, 1)
+
+    def rate(flags):
+        return np.bincount(local, weights=flags, minlength=s1 - s0) / n
+
+    score = _WORKER["behavioral"]._composite_score(
+        rate(a["tx_delivery"][t0:t1] <= ONTIME_MAX_DAYS),
+        rate(status == STATUS_CODES['refunded']),
+        rate(status == STATUS_CODES['cancelled']),
+        rate(status == STATUS_CODES['disputed']),
+    )
+    a["behavioral"][s0:s1] = np.where(counts > 0, score, 0.0)
+    if not p["authenticity"]:
+        return shard
+
+    # MinHash signatures for the shard's reviews
+    rv_off, text_off, text = a["rv_offsets"], a["text_offsets"], a["text_bytes"]
+    r0, r1 = int(rv_off[s0]), int(rv_off[s1])
+    raw = text[text_off[r0]:text_off[r1]].tobytes()
+    starts = text_off[r0:r1 + 1] - text_off[r0]
+    texts = [raw[starts[i]:starts[i + 1]].decode("utf-8") for i in range(r1 - r0)]
+    if texts:
+        a["signatures"][r0:r1] = lsh.signatures_for(texts)
+
+    window = (p["burst_window_days"] + 1) * SECONDS_PER_DAY
+    for s in range(s0, s1):
+        lo, hi = int(rv_off[s]), int(rv_off[s + 1])
+        if hi == lo:
+            continue
+        # Within-seller near-duplicate clusters (as check_text_similarity)
+        clusters = MinHashLSH(threshold=p["similarity_threshold"])
+        for i in range(lo, hi):
+            clusters.add(i, None, signature=a["signatures"][i])
+        duplicates = sum(len(c) - 1 for c in clusters.clusters())
+        a["spam"][s] = 1.0 - (hi - lo - duplicates) / (hi - lo)
+
+        # Busiest review window (as detect_bursts)
+        if hi - lo >= p["burst_threshold"]:
+            epochs = np.sort(a["rv_epochs"][lo:hi])
+            count, start, end = peak_window(epochs, window)
+            a["peak_count"][s] = count
+            a["peak_start"][s] = epochs[start]
+            a["peak_end"][s] = epochs[end]
+    return shard
+
+def _cross_seller_band(band):
+    """Phase 2 for one LSH band: flag reviews that nearly duplicate another seller's review."""
+    a, p, lsh = _WORKER["arrays"], _WORKER["params"], _WORKER["lsh"]
+    signatures, sellers = a["signatures"], a["rv_seller"]
+    if len(signatures) < 2:
+        return band
+    rows = lsh.rows
+    keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+    keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+    _, inverse = np.unique(keys, return_inverse=True)
+    by_key = np.argsort(inverse, kind="stable")
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(inverse[by_key]) != 0]))
+    ends = np.append(starts[1:], len(by_key))
+    # Only buckets holding more than one seller can produce a cross-seller match
+    group_sellers = sellers[by_key]
+    mixed = np.minimum.reduceat(group_sellers, starts) != np.maximum.reduceat(group_sellers, starts)
+
+    for start, end in zip(starts[mixed], ends[mixed]):
+        docs = by_key[start:end]
+        doc_sellers = sellers[docs]
+        # Every other seller's review in the bucket is a candidate, as in the serial index
+        step = max(1, COMPARE_BLOCK_BYTES // (len(docs) * lsh.num_perm))
+        for i in range(0, len(docs), step):
+            block = docs[i:i + step]
+            sim = (signatures[block][:, None, :] == signatures[docs][None, :, :]).sum(axis=2) / lsh.num_perm
+            match = (sim >= p["similarity_threshold"]) & (sellers[block][:, None] != doc_sellers[None, :])
+            a["cross"][block[match.any(axis=1)]] = 1
+    return band
+
+# --- Driver ---
+
+class ParallelScorer:
+    """
+    Scores a whole population across a process pool and returns one row per
+    seller with the same behavioral/authenticity components as the serial path.
+    authenticity=False skips the review phases for callers that score
+    authenticity elsewhere; the authenticity columns then hold their defaults.
+    """
+
+    def __init__(self, workers=4, shards_per_worker=4, authenticity_model=None, behavioral_engine=None,
+                 risk_engine=None, authenticity=True):
+        self.workers = max(1, workers)
+        self.authenticity = authenticity
+        self.num_shards = self.workers * shards_per_worker
+        self.authenticity_model = authenticity_model or AuthenticityModel()
+        self.behavioral_engine = behavioral_engine or BehavioralEngine()
+        self.risk_engine = risk_engine or RiskEngine()
+
+    def _columns(self, seller_ids, txns, revs):
+        """Encode the inputs as flat arrays ordered by (shard, seller)."""
+        shards = np.array([shard_of(s, self.num_shards) for s in seller_ids], dtype=np.int64)
+        seller_order = np.argsort(shards, kind="stable")
+        ordered_ids = [seller_ids[i] for i in seller_order]
+        code = {seller_id: i for i, seller_id in enumerate(ordered_ids)}
+        num_sellers = len(ordered_ids)
+
+        def encode(df):
+            if df.empty:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            codes = df['seller_id'].map(code).to_numpy(dtype=float)
+            rows = np.flatnonzero(~np.isnan(codes))
+            codes = codes[rows].astype(np.int64)
+            by_seller = np.argsort(codes, kind="stable")
+            return codes[by_seller], rows[by_seller]
+
+        def offsets(codes):
+            return np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=num_sellers))]).astype(np.int64)
+
+        tx_codes, tx_rows = encode(txns)
+        rv_codes, rv_rows = encode(revs)
+        if len(tx_rows):
+            tx_status = txns['status'].map(STATUS_CODES).fillna(0).to_numpy(dtype=np.int8)[tx_rows]
+            tx_delivery = txns['delivery_time_days'].to_numpy(dtype=float)[tx_rows]
+        else:
+            tx_status, tx_delivery = np.zeros(0, dtype=np.int8), np.zeros(0)
+
+        texts = [str(t).encode("utf-8") for t in revs['text'].to_numpy()[rv_rows]] if len(rv_rows) else []
+        text_offsets = np.concatenate([[0], np.cumsum([len(t) for t in texts], dtype=np.int64)]).astype(np.int64)
+        epochs = (to_epoch_seconds(revs['timestamp'].to_numpy()[rv_rows], sort=False)
+                  if len(rv_rows) else np.zeros(0, dtype=np.int64))
+
+        num_perm = MinHashLSH(threshold=self.authenticity_model.similarity_threshold).num_perm
+        columns = {
+            "shard_offsets": np.searchsorted(shards[seller_order], np.arange(self.num_shards + 1)).astype(np.int64),
+            "tx_offsets": offsets(tx_codes),
+            "tx_status": tx_status,
+            "tx_delivery": tx_delivery,
+            "rv_offsets": offsets(rv_codes),
+            "rv_seller": rv_codes,
+            "rv_epochs": epochs,
+            "text_offsets": text_offsets,
+            "text_bytes": np.frombuffer(b"".join(texts), dtype=np.uint8),
+            # outputs
+            "signatures": np.zeros((len(rv_rows), num_perm), dtype=np.uint32),
+            "cross": np.zeros(len(rv_rows), dtype=np.uint8),
+            "behavioral": np.zeros(num_sellers),
+            "spam": np.zeros(num_sellers),
+            "peak_count": np.zeros(num_sellers, dtype=np.int64),
+            "peak_start": np.zeros(num_sellers, dtype=np.int64),
+            "peak_end": np.zeros(num_sellers, dtype=np.int64),
+        }
+        return ordered_ids, columns
+
+    def score(self, seller_ids, txns, revs, baselines=None, progress=None):
+        """
+        Score every seller in seller_ids. progress(phase, done, total) is called as
+        shards and bands finish. Returns a DataFrame indexed by seller_id.
+        """
+        timings = {}
+        start = time.perf_counter()
+        seller_ids = list(dict.fromkeys(seller_ids))
+        ordered_ids, columns = self._columns(seller_ids, txns, revs)
+        timings["encode_s"] = time.perf_counter() - start
+
+        model = self.authenticity_model
+        params = {
+            "similarity_threshold": model.similarity_threshold,
+            "burst_window_days": model.burst_window_days,
+            "burst_threshold": model.burst_threshold,
+            "authenticity": self.authenticity,
+        }
+        shared = SharedArrays(columns)
+        try:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(shared.spec, params)) as pool:
+                phases = [("shards", _score_shard, range(self.num_shards))]
+                if self.authenticity:
+                    bands = MinHashLSH(threshold=model.similarity_threshold).bands
+                    phases.append(("bands", _cross_seller_band, range(bands)))
+                for phase, task, items in phases:
+                    phase_start = time.perf_counter()
+                    futures = [pool.submit(task, item) for item in items]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        future.result()
+                        if progress:
+                            progress(phase, done, len(futures))
+                    timings[f"{phase}_s"] = time.perf_counter() - phase_start
+            result = self._merge(ordered_ids, shared.arrays, baselines or {})
+        finally:
+            shared.close()
+        timings["total_s"] = time.perf_counter() - start
+        self.timings = {k: round(v, 3) for k, v in timings.items()}
+        return result.loc[seller_ids]
+
+    def _merge(self, ordered_ids, a, baselines):
+        model = self.authenticity_model
+        review_count = np.diff(a["rv_offsets"])
+        cross_count = np.bincount(a["rv_seller"], weights=a["cross"], minlength=len(ordered_ids))
+        cross = np.divide(cross_count, review_count, out=np.zeros(len(ordered_ids)), where=review_count > 0)
+        is_burst = a["peak_count"] >= model.burst_threshold
+        authenticity = model.combine_signals(is_burst, a["spam"], cross)
+        baseline = np.array([float(baselines.get(s, 500.0)) for s in ordered_ids])
+        # No trust history here, so no decay: the baseline is the current trust
+        trust = self.risk_engine.combine_trust(baseline, a["behavioral"], authenticity)
+        has_peak = a["peak_count"] > 0
+        return pd.DataFrame({
+            "seller_id": ordered_ids,
+            "trust_score": np.round(trust, 2),
+            "behavioral_score": a["behavioral"].copy(),
+            "authenticity_score": authenticity,
+            "spam_score": a["spam"].copy(),
+            "cross_seller_score": cross,
+            "is_burst": is_burst,
+            "peak_count": a["peak_count"].copy(),
+            "peak_start": np.where(has_peak, a["peak_start"], 0),
+            "peak_end": np.where(has_peak, a["peak_end"], 0),
+            "review_count": review_count,
+            "transaction_count": np.diff(a["tx_offsets"]),
+            "baseline": baseline,
+        }).set_index("seller_id")
+
+    def evidence(self, row):
+        """The /compute-trust evidence dict for one merged row."""
+        model = self.authenticity_model
+        has_peak = row["peak_count"] > 0
+        return {
+            "burst": {
+                "is_burst": bool(row["is_burst"]),
+                "max_rate": row["peak_count"] / model.burst_window_days if row["is_burst"] else 0.0,
+                "peak_count": int(row["peak_count"]),
+                "peak_start": pd.Timestamp(int(row["peak_start"]), unit='s').isoformat() if has_peak else None,
+                "peak_end": pd.Timestamp(int(row["peak_end"]), unit='s').isoformat() if has_peak else None,
+                "window_days": model.burst_window_days,
+                "threshold": model.burst_threshold,
+            },
+            "spam_score": float(row["spam_score"]),
+            "cross_seller_score": float(row["cross_seller_score"]),
+        }
+
+def load_offline(data_path):
+    """(seller_ids, baselines, transactions, reviews) from the columnar snapshot or CSVs."""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from shared.columnar_store import ColumnarStore
+
+    columnar = os.environ.get("COLUMNAR_PATH", os.path.join(data_path, "columnar"))
+    if ColumnarStore.available(columnar):
+        store = ColumnarStore(columnar)
+        sellers = store.frame("sellers", columns=['id', 'baseline_trust_score'])
+        txns = store.frame("transactions", columns=['seller_id', 'status', 'delivery_time_days'])
+        revs = store.frame("reviews", columns=['id', 'seller_id', 'rating', 'text', 'timestamp'])
+    else:
+        sellers = pd.read_csv(os.path.join(data_path, "sellers.csv"), usecols=['id', 'baseline_trust_score'])
+        txns = pd.read_csv(os.path.join(data_path, "transactions.csv"),
+                           usecols=['seller_id', 'status', 'delivery_time_days'])
+        revs = pd.read_csv(os.path.join(data_path, "reviews.csv"),
+                           usecols=['id', 'seller_id', 'rating', 'text', 'timestamp'])
+    sellers['id'] = sellers['id'].astype(str)
+    baselines = dict(zip(sellers['id'], sellers['baseline_trust_score'].astype(float)))
+    return list(sellers['id']), baselines, txns, revs
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every seller across a process pool")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data-simulation"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bench", help="comma-separated worker counts to time, e.g. 1,2,4,8")
+    parser.add_argument("--out", help="write one JSON object per seller to this file")
+    args = parser.parse_args()
+
+    seller_ids, baselines, txns, revs = load_offline(args.data)
+    print(f"Loaded {len(seller_ids)} sellers, {len(txns)} transactions, {len(revs)} reviews")
+
+    if args.bench:
+        runs = []
+        for workers in [int(w) for w in args.bench.split(",")]:
+            scorer = ParallelScorer(workers=workers)
+            scorer.score(seller_ids, txns, revs, baselines)
+            runs.append({"workers": workers, **scorer.timings})
+        base = runs[0]["total_s"]
+        for run in runs:
+            run["speedup"] = round(base / run["total_s"], 2)
+        print(json.dumps({"cpu_count": os.cpu_count(), "sellers": len(seller_ids), "runs": runs}, indent=2))
+        return
+
+    def report(phase, done, total):
+        print(f"\r  {phase}: {done}/{total}", end="\n" if done == total else "", flush=True)
+
+    scorer = ParallelScorer(workers=args.workers)
+    result = scorer.score(seller_ids, txns, revs, baselines, progress=report)
+    print(f"Scored {len(result)} sellers with {args.workers} workers: {scorer.timings}")
+    if args.out:
+        result.reset_index().to_json(args.out, orient="records", lines=True)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+class TrustHistory:
+    """
+    Recent trust scores per seller, kept in fixed-size ring buffers so volatility
+    and trend never need a database read.
+
+    Rings are rows of two (sellers x capacity) arrays, which also lets every
+    seller be processed at once. New scores are queued and written to the
+    trust_scores table in bulk by a background thread (when a client is given).
+    A batch that fails transiently is retried; one the database rejects is
+    split in halves until the offending rows are found and dropped.
+    Timestamps are written and returned as UTC.
+    """
+
+    def __init__(self, client=None, capacity=30, flush_size=500, flush_interval=2.0, max_pending=100000):
+        self.client = client
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.rows = {}                                    # seller_id -> ring row
+        self.scores = np.zeros((0, capacity))
+        self.times = np.zeros((0, capacity))              # epoch seconds
+        self.counts = np.zeros(0, dtype=np.int64)         # scores ever recorded per row
+
+        self._lock = threading.Lock()
+        self._pending = deque(maxlen=max_pending)  # full: appending drops the oldest
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def _row(self, seller_id):
+        row = self.rows.get(seller_id)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.counts):
+                grow = max(64, len(self.counts))
+                self.scores = np.vstack([self.scores, np.zeros((grow, self.capacity))])
+                self.times = np.vstack([self.times, np.zeros((grow, self.capacity))])
+                self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+            self.rows[seller_id] = row
+        return row
+
+    def _push(self, seller_id, score, timestamp):
+        row = self._row(seller_id)
+        slot = self.counts[row] % self.capacity
+        self.scores[row, slot] = score
+        self.times[row, slot] = timestamp
+        self.counts[row] += 1
+
+    def _ordered(self, row):
+        """Ring slots of a row, oldest first."""
+        n = min(int(self.counts[row]), self.capacity)
+        return (self.counts[row] - n + np.arange(n)) % self.capacity
+
+    def record(self, seller_id, score, timestamp=None, persist=True):
+        """Append a score to the seller's ring and queue it for the database."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._push(seller_id, score, timestamp)
+            if persist and self.client is not None:
+                if len(self._pending) == self.max_pending:
+                    # Database unreachable for a long time: the append drops the oldest
+                    self.dropped += 1
+                self._pending.append({
+                    "seller_id": seller_id,
+                    "score": round(float(score), 2),
+                    "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                })
+                if len(self._pending) >= self.flush_size:
+                    self._wake.set()
+
+    def load(self, rows):
+        """Seed the rings from stored trust_scores rows (oldest first); naive timestamps are UTC."""
+        for r in rows:
+            parsed = datetime.fromisoformat(r['timestamp'])
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            self.record(r['seller_id'], float(r['score']), parsed.timestamp(), persist=False)
+
+    def history(self, seller_id):
+        """[{'score', 'timestamp'}] oldest first, the shape RiskEngine expects."""
+        with self._lock:
+            row = self.rows.get(seller_id)
+            if row is None:
+                return []
+            order = self._ordered(row)
+            scores, times = self.scores[row, order], self.times[row, order]
+        return [
+            {"score": float(s), "timestamp": datetime.fromtimestamp(t, timezone.utc).isoformat()}
+            for s, t in zip(scores, times)
+        ]
+
+    def last_updated(self, seller_id):
+        """ISO timestamp of the seller's latest score, or None."""
+        with self._lock:
+            row = self.rows.get(seller_id)
+            if row is None or self.counts[row] == 0:
+                return None
+            t = self.times[row, (self.counts[row] - 1) % self.capacity]
+        return datetime.fromtimestamp(t, timezone.utc).isoformat()
+
+    def matrix(self):
+        """
+        (seller_ids, scores, last_updated) for every seller: scores is a
+        (sellers x capacity) matrix, oldest first and NaN-padded on the left;
+        last_updated holds epoch seconds of each seller's newest score.
+        """
+        with self._lock:
+            n = len(self.rows)
+            seller_ids = list(self.rows)
+            counts = self.counts[:n].copy()
+            ring_scores = self.scores[:n].copy()
+            ring_times = self.times[:n].copy()
+        cap = self.capacity
+        rows = np.arange(n)[:, None]
+        slots = (counts[:, None] + np.arange(cap)[None, :]) % cap
+        scores = ring_scores[rows, slots]
+        scores[np.arange(cap)[None, :] < cap - np.minimum(counts, cap)[:, None]] = np.nan
+        last_updated = ring_times[np.arange(n), (counts - 1) % cap]
+        return seller_ids, scores, last_updated
+
+    def flush(self):
+        """Write queued scores in one bulk insert. Returns how many were written."""
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return 0
+        retry = []
+        written = self._insert(batch, retry)
+        if retry:
+            self.failed_flushes += 1
+            with self._lock:
+                # Retry on the next flush, ahead of anything queued meanwhile
+                queued = retry + list(self._pending)
+                self.dropped += max(0, len(queued) - self.max_pending)
+                self._pending = deque(queued, maxlen=self.max_pending)
+        return written
+
+    def _insert(self, batch, retry):
+        """
+        Insert batch; rows that failed transiently (no connection, 429, 5xx) go
+        to retry. A rejected batch (other 4xx, e.g. an unknown seller_id) is
+        bisected so only its bad rows are dropped.
+        """
+        status = self.client.upsert_status("trust_scores", batch, prefer="return=minimal")
+        if status in (200, 201, 204):
+            self.written += len(batch)
+            return len(batch)
+        if status is None or status in self.client.retry_statuses:
+            retry.extend(batch)
+            return 0
+        if len(batch) == 1:
+            self.rejected += 1
+            return 0
+        middle = len(batch) // 2
+        return self._insert(batch[:middle], retry) + self._insert(batch[middle:], retry)
+
+    def start(self):
+        if self.client is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the writer and flush whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.client is not None:
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "sellers": len(self.rows),
+            "capacity": self.capacity,
+            "pending": pending,
+            "written": self.written,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "memory_bytes": int(self.scores.nbytes + self.times.nbytes + self.counts.nbytes),
+        }
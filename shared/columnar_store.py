@@ -0,0 +1,152 @@
+"""
+TRUSTRA - Columnar offline snapshot (Arrow IPC, memory-mapped)
+Converts the simulation CSVs into Arrow IPC files sorted by seller_id, with
+dictionary-encoded status and UUID columns, plus a per-seller row-range index.
+Services memory-map the files and slice one seller's rows without parsing
+anything else.
+
+Usage:
+    python shared/columnar_store.py data-simulation data-simulation/columnar
+"""
+import os
+import sys
+import time
+
+# Tables partitioned (sorted + row-range indexed) by seller
+SELLER_PARTITIONED = {"transactions": "seller_id", "reviews": "seller_id"}
+# Low-cardinality or repeated id columns stored as Arrow dictionaries
+DICTIONARY_COLUMNS = {"id", "seller_id", "buyer_id", "transaction_id", "status"}
+TABLES = ("sellers", "transactions", "reviews")
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.csv
+        import pyarrow.ipc
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("The columnar store needs pyarrow (pip install pyarrow)") from e
+
+def convert_csv_dir(csv_dir, out_dir):
+    """Convert sellers/transactions/reviews CSVs in csv_dir to Arrow IPC files in out_dir."""
+    pa = _pyarrow()
+    os.makedirs(out_dir, exist_ok=True)
+    summary = {}
+    for name in TABLES:
+        csv_path = os.path.join(csv_dir, f"{name}.csv")
+        if not os.path.exists(csv_path):
+            continue
+        start = time.perf_counter()
+        table = pa.csv.read_csv(
+            csv_path,
+            convert_options=pa.csv.ConvertOptions(
+                # Keep ids and timestamps as the exact strings the services use
+                column_types={c: pa.string() for c in ("id", "seller_id", "buyer_id", "transaction_id",
+                                                         "text", "timestamp", "joined_at")},
+            ),
+        )
+        sort_key = SELLER_PARTITIONED.get(name, "id")
+        table = table.sort_by(sort_key)
+
+        index = None
+        if name in SELLER_PARTITIONED:
+            index = _row_ranges(table.column(sort_key))
+
+        columns = []
+        for field in table.schema:
+            column = table.column(field.name)
+            if field.name in DICTIONARY_COLUMNS:
+                column = pa.compute.dictionary_encode(column)
+            columns.append(column)
+        table = pa.table(columns, names=table.column_names)
+
+        _write_ipc(table, os.path.join(out_dir, f"{name}.arrow"))
+        if index is not None:
+            _write_ipc(index, os.path.join(out_dir, f"{name}.index.arrow"))
+        summary[name] = {"rows": table.num_rows, "seconds": round(time.perf_counter() - start, 3)}
+    return summary
+
+def _row_ranges(sorted_keys):
+    """(key, start, length) for each run of equal keys in a sorted column."""
+    pa = _pyarrow()
+    import numpy as np
+    keys = sorted_keys.to_numpy(zero_copy_only=False)
+    if len(keys) == 0:
+        starts = np.zeros(0, dtype=np.int64)
+    else:
+        change = np.ones(len(keys), dtype=bool)
+        change[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(change).astype(np.int64)
+    lengths = np.diff(np.append(starts, len(keys)))
+    return pa.table({
+        "seller_id": pa.array(keys[starts], type=pa.string()),
+        "start": pa.array(starts),
+        "length": pa.array(lengths.astype(np.int64)),
+    })
+
+def _write_ipc(table, path):
+    pa = _pyarrow()
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=64 * 1024)
+    os.replace(tmp_path, path)
+
+class ColumnarStore:
+    """Read side: memory-mapped Arrow tables plus per-seller row ranges."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tables = {}
+        self._indexes = {}
+
+    @staticmethod
+    def available(path):
+        return os.path.exists(os.path.join(path, "transactions.arrow"))
+
+    def table(self, name):
+        """The whole table, memory-mapped (no copy until columns are touched)."""
+        if name not in self._tables:
+            pa = _pyarrow()
+            source = pa.memory_map(os.path.join(self.path, f"{name}.arrow"), "r")
+            self._tables[name] = pa.ipc.open_file(source).read_all()
+        return self._tables[name]
+
+    def seller_index(self, name):
+        if name not in self._indexes:
+            index = self.table(f"{name}.index")
+            self._indexes[name] = dict(zip(
+                index.column("seller_id").to_pylist(),
+                zip(index.column("start").to_pylist(), index.column("length").to_pylist()),
+            ))
+        return self._indexes[name]
+
+    def num_rows(self, name):
+        return self.table(name).num_rows
+
+    def _to_pandas(self, table, columns=None):
+        pa = _pyarrow()
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        decoded = [
+            pa.compute.cast(table.column(i), pa.string()) if pa.types.is_dictionary(field.type) else table.column(i)
+            for i, field in enumerate(table.schema)
+        ]
+        return pa.table(decoded, names=table.column_names).to_pandas()
+
+    def seller_rows(self, name, seller_id, columns=None):
+        """One seller's rows as a DataFrame, read from its row range only."""
+        start, length = self.seller_index(name).get(seller_id, (0, 0))
+        return self._to_pandas(self.table(name).slice(start, length), columns)
+
+    def frame(self, name, columns=None):
+        """A whole table as a DataFrame with dictionary columns decoded to strings."""
+        return self._to_pandas(self.table(name), columns)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python shared/columnar_store.py <csv_dir> <out_dir>")
+        sys.exit(1)
+    for table_name, info in convert_csv_dir(sys.argv[1], sys.argv[2]).items():
+        print(f"  {table_name}: {info['rows']} rows in {info['seconds']}s")
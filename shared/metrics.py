@@ -0,0 +1,218 @@
+"""
+TRUSTRA - Prometheus-style metrics
+A small dependency-free registry (histograms, counters, callback metrics) that
+renders the Prometheus text exposition format, plus ASGI middleware that times
+every request by route template. Both services expose it at GET /metrics.
+
+    from shared.metrics import registry
+    with registry.timer("trustra_stage_seconds", stage="behavioral"):
+        ...
+"""
+import math
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus defaults, extended down to 1 ms (per-stage timers) and up to 60 s (graph load)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    def __init__(self, prefix="trustra"):
+        self.prefix = prefix
+        self._histograms = {}  # name -> {label_key: Histogram}
+        self._counters = {}    # name -> {label_key: value}
+        self._gauges = {}      # name -> (kind, callback returning a number or [(labels dict, value)])
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(_label_key(labels))
+            if hist is None:
+                hist = series[_label_key(labels)] = Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def gauge(self, name, callback, help_text=None, kind="gauge"):
+        """
+        Register a metric read at scrape time. callback returns a number, or a
+        list of (labels dict, value) pairs for labelled series. kind="counter"
+        exports values that only grow (so rate() works); kind="summary" expects
+        {"sum": ..., "count": ...} values and renders the _sum/_count pair.
+        """
+        self._gauges[name] = (kind, callback)
+        if help_text:
+            self.describe(name, help_text)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the block's wall time (seconds) into a histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            histograms = {n: {k: (list(h.counts), h.sum, h.count, h.buckets) for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+            counters = {n: dict(s) for n, s in self._counters.items()}
+
+        for name in sorted(histograms):
+            header(name, "histogram")
+            for key, (counts, total, count, buckets) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, c in zip(buckets, counts):
+                    cumulative += c
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        for name in sorted(counters):
+            header(name, "counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(self._gauges):
+            kind, callback = self._gauges[name]
+            try:
+                value = callback()
+            except Exception as e:
+                print(f"Metrics gauge {name} failed: {e}")
+                continue
+            header(name, kind)
+            if not isinstance(value, list):
+                value = [] if value is None else [({}, value)]
+            for labels, v in value:
+                key = _label_key(labels)
+                if kind == "summary":
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(v['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(key)} {_format_value(v['count'])}")
+                else:
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(v)}")
+        return "\n".join(lines) + "\n"
+
+def process_memory_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+
+def register_process_gauges(reg):
+    started = time.time()
+    reg.gauge("process_resident_memory_bytes", process_memory_bytes, "Resident memory in bytes.")
+    reg.gauge("process_start_time_seconds", lambda: started, "Start time since the epoch in seconds.")
+    reg.gauge("process_threads", threading.active_count, "Live Python threads.")
+
+def register_upstream_gauges(reg, clients):
+    """
+    Export SupabaseClient/AsyncSupabaseClient per-table metrics ({name: client})
+    as a latency summary, error and retry counters, and the slowest request.
+    """
+    def series(read_stats):
+        def read():
+            out = []
+            for client_name, client in clients.items():
+                for table, stats in client.metrics().items():
+                    out.append(({"client": client_name, "table": table}, read_stats(stats)))
+            return out
+        return read
+
+    name = f"{reg.prefix}_upstream_request"
+    reg.gauge(f"{name}_seconds", series(lambda s: {"sum": s["total_ms"] * 0.001, "count": s["count"]}),
+              "Supabase request time per table.", kind="summary")
+    reg.gauge(f"{name}_seconds_max", series(lambda s: s["max_ms"] * 0.001), "Slowest Supabase request per table.")
+    reg.gauge(f"{name}_errors_total", series(lambda s: s["errors"]), "Failed Supabase requests per table.",
+              kind="counter")
+    reg.gauge(f"{name}_retries_total", series(lambda s: s["retries"]), "Supabase request retries per table.",
+              kind="counter")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency histogram labelled by method, route
+    template (not the raw path, to keep label cardinality bounded) and status.
+    """
+
+    def __init__(self, app, reg=None):
+        self.app = app
+        self.registry = reg or registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.registry.observe(f"{self.registry.prefix}_http_request_duration_seconds",
+                                  time.perf_counter() - start,
+                                  method=scope["method"], path=path, status=str(status["code"]))
+
+registry = MetricsRegistry()
+registry.describe("trustra_http_request_duration_seconds", "HTTP request latency by route template.")
+registry.describe("trustra_stage_seconds", "Time spent in each scoring or graph stage.")
+register_process_gauges(registry)
@@ -0,0 +1,167 @@
+"""
+TRUSTRA - Minimal in-memory PostgREST stand-in
+Serves /rest/v1/<table> for local runs and for exercising the shared clients
+without Supabase. Supports select, eq./in./gt./gte./lt./lte. filters, order,
+limit/offset on GET and (upsert) POST of JSON rows.
+
+Usage:
+    python shared/mock_postgrest.py --port 54321 --data data-simulation
+    SUPABASE_URL=http://127.0.0.1:54321 python -m uvicorn main:app --port 8000
+"""
+import argparse
+import csv
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+TABLES = ("sellers", "buyers", "transactions", "reviews", "trust_scores", "trust_events")
+NUMERIC = {"baseline_trust_score", "amount", "delivery_time_days", "rating", "score"}
+RESERVED = {"select", "limit", "offset", "order"}
+# Columns the database fills in on insert (docker/init.sql)
+INSERT_DEFAULTS = {"reviews": {"created_at": lambda: datetime.now(timezone.utc).isoformat()}}
+
+def _coerce(column, value):
+    if value in ("", None) or column not in NUMERIC:
+        return value
+    try:
+        number = float(value)
+        return int(number) if number.is_integer() and column != "amount" else number
+    except ValueError:
+        return value
+
+def _matches(row, column, expr):
+    op, _, raw = expr.partition(".")
+    value = row.get(column)
+    if op == "in":
+        return str(value) in raw.strip("()").split(",")
+    target = _coerce(column, raw)
+    if op == "eq":
+        return str(value) == str(target)
+    if value is None:
+        return False
+    if op == "gt":
+        return value > target
+    if op == "gte":
+        return value >= target
+    if op == "lt":
+        return value < target
+    if op == "lte":
+        return value <= target
+    return True
+
+class MockStore:
+    def __init__(self):
+        self.tables = {name: {} for name in TABLES}  # table -> {id: row}
+        self.lock = threading.Lock()
+        self.fail_next = 0  # respond 503 to this many requests (retry testing)
+        self.reject_ids = set()  # a POST containing any of these ids fails with 400 (bad-row testing)
+        self.posts = 0
+
+    def load_csv_dir(self, path):
+        for name in TABLES:
+            csv_path = os.path.join(path, f"{name}.csv")
+            if os.path.exists(csv_path):
+                with open(csv_path, "r", encoding="utf-8") as f:
+                    self.upsert(name, [{k: _coerce(k, v) for k, v in r.items()} for r in csv.DictReader(f)])
+
+    def upsert(self, table, rows):
+        with self.lock:
+            store = self.tables.setdefault(table, {})
+            defaults = INSERT_DEFAULTS.get(table, {})
+            for row in rows:
+                key = row.get("id", len(store) + 1)
+                if key not in store:
+                    row = {**{c: make() for c, make in defaults.items() if c not in row}, **row}
+                store[key] = {**store.get(key, {}), **row, "id": key}
+
+    def select(self, table, query):
+        with self.lock:
+            rows = list(self.tables.get(table, {}).values())
+        for column, expr in query.items():
+            if column not in RESERVED:
+                rows = [r for r in rows if _matches(r, column, expr)]
+        if "order" in query:
+            column, _, direction = query["order"].partition(".")
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction == "desc")
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", 1000))
+        rows = rows[offset : offset + limit]
+        select = query.get("select", "*")
+        if select != "*":
+            columns = select.split(",")
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+        def _table(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            return parts[2] if len(parts) >= 3 and parts[:2] == ["rest", "v1"] else None
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _should_fail(self):
+            with store.lock:
+                if store.fail_next > 0:
+                    store.fail_next -= 1
+                    return True
+            return False
+
+        def do_GET(self):
+            table = self._table()
+            if table is None:
+                return self._send(404, {"message": "not found"})
+            if self._should_fail():
+                return self._send(503, {"message": "injected failure"})
+            self._send(200, store.select(table, dict(parse_qsl(urlparse(self.path).query))))
+
+        def do_POST(self):
+            table = self._table()
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"[]")
+            if table is None:
+                return self._send(404, {"message": "not found"})
+            if self._should_fail():
+                return self._send(503, {"message": "injected failure"})
+            rows = payload if isinstance(payload, list) else [payload]
+            with store.lock:
+                store.posts += 1
+                rejected = [r.get("id") for r in rows if r.get("id") in store.reject_ids]
+            if rejected:
+                return self._send(400, {"message": f"invalid rows: {rejected[:5]}"})
+            store.upsert(table, rows)
+            self._send(201, [])
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(port=54321, data_path=None, host="127.0.0.1"):
+    """Start the mock server; returns (server, store). Call server.serve_forever()."""
+    store = MockStore()
+    if data_path:
+        store.load_csv_dir(data_path)
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    return server, store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory PostgREST stand-in")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--data", default=None, help="Directory with sellers/transactions/reviews CSVs")
+    args = parser.parse_args()
+    server, store = serve(args.port, args.data)
+    print(f"Mock PostgREST on http://127.0.0.1:{args.port}/rest/v1 "
+          f"({', '.join(f'{t}={len(rows)}' for t, rows in store.tables.items())})")
+    server.serve_forever()
@@ -0,0 +1,127 @@
+"""
+TRUSTRA - Opt-in sampling profiler
+Samples the stacks of every Python thread at a fixed rate (sys._current_frames)
+and aggregates them into collapsed stacks, the input format of flamegraph.pl
+and speedscope. Overhead is one stack walk per thread per sample, so it can run
+briefly against live traffic. Services only expose it when PROFILER_ENABLED=1,
+through register_routes(app).
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames of threads parked on a lock, selector or queue: idle, not hot
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+class SamplingProfiler:
+    def __init__(self, interval=0.01, max_depth=64, include_idle=False):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+        self._ignore = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _sample(self):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in self._ignore:
+                continue
+            if not self.include_idle and frame.f_code.co_filename.endswith(IDLE_FILES):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self._sample()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ignore.add(self._thread.ident)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def profile(self, seconds):
+        """Sample for `seconds` (blocking) and return the report."""
+        self._ignore.add(threading.get_ident())  # the caller only sleeps
+        self.start()
+        time.sleep(seconds)
+        self.stop()
+        return self.report()
+
+    def collapsed(self):
+        """'frame;frame;frame count' lines, one per distinct stack."""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def report(self, top=25):
+        """Hottest leaf frames (self time) and inclusive frames, as sample fractions."""
+        with self._lock:
+            stacks = dict(self.stacks)
+            samples = self.samples
+        leaf, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            leaf[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        total = sum(stacks.values()) or 1
+        return {
+            "samples": samples,
+            "interval_ms": self.interval * 1000,
+            "thread_samples": total,
+            "top_self": [{"frame": f, "fraction": round(c / total, 4)} for f, c in leaf.most_common(top)],
+            "top_inclusive": [{"frame": f, "fraction": round(c / total, 4)} for f, c in inclusive.most_common(top)],
+        }
+
+def register_routes(app):
+    """Add GET /debug/profile to a FastAPI app (404 unless PROFILER_ENABLED=1)."""
+    from typing import Literal
+    from fastapi import HTTPException
+    from fastapi.responses import PlainTextResponse
+
+    enabled = os.environ.get("PROFILER_ENABLED", "0") == "1"
+    lock = threading.Lock()
+
+    @app.get("/debug/profile")
+    def profile_endpoint(seconds: float = 10, hz: int = 100, format: Literal["json", "collapsed"] = "json"):
+        """
+        Sample every thread's stack for `seconds` while normal traffic runs.
+        Opt-in (PROFILER_ENABLED=1); format=collapsed feeds flamegraph tools.
+        """
+        if not enabled:
+            raise HTTPException(status_code=404, detail="Profiler disabled (set PROFILER_ENABLED=1)")
+        if not lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        try:
+            profiler = SamplingProfiler(interval=1.0 / max(1, min(hz, 1000)))
+            report = profiler.profile(max(0.1, min(seconds, 120)))
+        finally:
+            lock.release()
+        if format == "collapsed":
+            return PlainTextResponse(profiler.collapsed())
+        return report
@@ -0,0 +1,267 @@
+"""
+TRUSTRA - Shared Supabase/PostgREST data access
+Pooled keep-alive clients used by both the ML and graph services.
+
+SupabaseClient is a blocking client on a requests.Session; AsyncSupabaseClient is
+the httpx-based variant for FastAPI routes. Both retry transient failures with
+exponential backoff, can fetch pages concurrently and keep per-table latency
+metrics. query() returns [] on any failure; query_all() raises SupabaseError
+instead, so a failed page is never mistaken for the end of the table. Point base_url at a local PostgREST (or any mock HTTP server) to test.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_URL = "https://gpdhyiohcagqydhhjzrz.supabase.co"
+DEFAULT_KEY = "sb_publishable_DixO3g1pvbB4aRuaTXh4Mw_5miq-nXW"
+
+# Responses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class SupabaseError(Exception):
+    """A query that failed after its retries (HTTP error status or no connection)."""
+
+class _ClientBase:
+    retry_statuses = RETRY_STATUSES
+
+    def __init__(self, base_url=None, key=None, timeout=10, pool_size=16,
+                 max_retries=2, backoff=0.25, page_size=1000, concurrency=4):
+        base_url = base_url or os.environ.get("SUPABASE_URL", DEFAULT_URL)
+        key = key or os.environ.get("SUPABASE_KEY", DEFAULT_KEY)
+        self.rest_url = f"{base_url.rstrip('/')}/rest/v1"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+        }
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _record(self, table, elapsed, ok, retries):
+        with self._stats_lock:
+            stats = self._stats.setdefault(table, {
+                "count": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0,
+            })
+            stats["count"] += 1
+            stats["retries"] += retries
+            if not ok:
+                stats["errors"] += 1
+            ms = elapsed * 1000
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def metrics(self) -> dict:
+        """Per-table request counts, errors, retries and latency (ms)."""
+        with self._stats_lock:
+            return {
+                table: {
+                    **stats,
+                    "total_ms": round(stats["total_ms"], 2),
+                    "max_ms": round(stats["max_ms"], 2),
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0.0,
+                }
+                for table, stats in self._stats.items()
+            }
+
+    def _delay(self, attempt):
+        return self.backoff * (2 ** attempt)
+
+    def _page_params(self, params, offset, page_size):
+        return {**(params or {}), "limit": str(page_size), "offset": str(offset)}
+
+
+class SupabaseClient(_ClientBase):
+    """Blocking PostgREST client over a pooled keep-alive requests.Session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, table, retries=None, **kwargs):
+        retries = self.max_retries if retries is None else retries
+        url = f"{self.rest_url}/{table}"
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if resp.status_code in RETRY_STATUSES and attempt < retries:
+                    raise requests.HTTPError(f"{resp.status_code}", response=resp)
+                self._record(table, time.perf_counter() - start, resp.ok, attempt)
+                return resp
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt >= retries:
+                    self._record(table, time.perf_counter() - start, False, attempt)
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+
+    def _fetch(self, table, params=None, retries=None) -> list:
+        """JSON rows of one GET; raises SupabaseError on failure."""
+        try:
+            resp = self._request("GET", table, retries=retries, params=params or {})
+        except Exception as e:
+            raise SupabaseError(f"Supabase connection error ({table}): {e}") from e
+        if resp.status_code != 200:
+            raise SupabaseError(f"Supabase query error ({table}): {resp.status_code} {resp.text[:200]}")
+        return resp.json()
+
+    def query(self, table: str, params: dict = None, retries=None) -> list:
+        """Query Supabase REST API and return JSON rows ([] on failure)."""
+        try:
+            return self._fetch(table, params, retries)
+        except SupabaseError as e:
+            print(e)
+            return []
+
+    def query_all(self, table: str, params: dict = None, page_size=None, concurrency=None) -> list:
+        """
+        Page through a table, fetching up to `concurrency` pages at a time,
+        until a short or empty page is returned. Rows keep their page order.
+        Raises SupabaseError if any page fails.
+        """
+        page_size = page_size or self.page_size
+        concurrency = max(1, concurrency or self.concurrency)
+        rows = []
+        offset = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                offsets = [offset + i * page_size for i in range(concurrency)]
+                pages = list(pool.map(
+                    lambda o: self._fetch(table, self._page_params(params, o, page_size)), offsets
+                ))
+                for page in pages:
+                    rows.extend(page)
+                    if len(page) < page_size:
+                        return rows
+                offset += concurrency * page_size
+
+    def upsert(self, table: str, rows: list, prefer="resolution=merge-duplicates", retries=None) -> bool:
+        """POST rows to a table (UPSERT by default). Returns True on success."""
+        return self.upsert_status(table, rows, prefer, retries) in (200, 201, 204)
+
+    def upsert_status(self, table: str, rows: list, prefer="resolution=merge-duplicates", retries=None):
+        """
+        Like upsert, but returns the HTTP status (None if the server could not be
+        reached), so bulk loaders can tell rejected rows apart from an outage.
+        """
+        try:
+            resp = self._request(
+                "POST", table, retries=retries, json=rows,
+                headers={"Content-Type": "application/json", "Prefer": prefer},
+            )
+            if resp.status_code not in (200, 201, 204):
+                print(f"Supabase write error ({table}): {resp.status_code} {resp.text[:200]}")
+            return resp.status_code
+        except Exception as e:
+            print(f"Supabase connection error ({table}): {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncSupabaseClient(_ClientBase):
+    """Async PostgREST client over a pooled httpx.AsyncClient, for FastAPI routes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx  # optional dependency, only needed for async routes
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return self._client
+
+    async def _request(self, method, table, retries=None, **kwargs):
+        import httpx
+        retries = self.max_retries if retries is None else retries
+        url = f"{self.rest_url}/{table}"
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                resp = await self.client.request(method, url, **kwargs)
+                if resp.status_code in RETRY_STATUSES and attempt < retries:
+                    raise httpx.HTTPStatusError(f"{resp.status_code}", request=resp.request, response=resp)
+                self._record(table, time.perf_counter() - start, resp.is_success, attempt)
+                return resp
+            except httpx.HTTPError as e:
+                if attempt >= retries:
+                    self._record(table, time.perf_counter() - start, False, attempt)
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                attempt += 1
+
+    async def _fetch(self, table, params=None, retries=None) -> list:
+        try:
+            resp = await self._request("GET", table, retries=retries, params=params or {})
+        except Exception as e:
+            raise SupabaseError(f"Supabase connection error ({table}): {e}") from e
+        if resp.status_code != 200:
+            raise SupabaseError(f"Supabase query error ({table}): {resp.status_code} {resp.text[:200]}")
+        return resp.json()
+
+    async def query(self, table: str, params: dict = None, retries=None) -> list:
+        """Query Supabase REST API and return JSON rows ([] on failure)."""
+        try:
+            return await self._fetch(table, params, retries)
+        except SupabaseError as e:
+            print(e)
+            return []
+
+    async def query_all(self, table: str, params: dict = None, page_size=None, concurrency=None) -> list:
+        """Async counterpart of SupabaseClient.query_all."""
+        page_size = page_size or self.page_size
+        concurrency = max(1, concurrency or self.concurrency)
+        rows = []
+        offset = 0
+        while True:
+            pages = await asyncio.gather(*[
+                self._fetch(table, self._page_params(params, offset + i * page_size, page_size))
+                for i in range(concurrency)
+            ])
+            for page in pages:
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+            offset += concurrency * page_size
+
+    async def upsert(self, table: str, rows: list, prefer="resolution=merge-duplicates", retries=None) -> bool:
+        try:
+            resp = await self._request(
+                "POST", table, retries=retries, json=rows,
+                headers={"Content-Type": "application/json", "Prefer": prefer},
+            )
+            if resp.status_code in (200, 201, 204):
+                return True
+            print(f"Supabase write error ({table}): {resp.status_code} {resp.text[:200]}")
+            return False
+        except Exception as e:
+            print(f"Supabase connection error ({table}): {e}")
+            return False
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None